@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ApiAdditionalMaterialsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api_additional_materials'
+
+    def ready(self):
+        import api_additional_materials.signals  # noqa
+        super().ready()
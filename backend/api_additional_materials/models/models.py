@@ -40,9 +40,13 @@ class AdditionalLessonElement(models.Model):
     def __str__(self):
         return f'{self.pk} LessonPageElement'
 
-    def save(self, *args, **kwargs):
+    def before_save(self):
+        # Вызывается и при bulk_create (см. bulk_create_nested)
         if not self.audio_component and not self.image_component and not self.text_component and not self.video_component:
             raise ValidationError('At least one component must be filled')
+
+    def save(self, *args, **kwargs):
+        self.before_save()
         super().save(*args, **kwargs)
 
     lesson = models.ForeignKey(AdditionalLesson, on_delete=models.CASCADE, related_name='elements',
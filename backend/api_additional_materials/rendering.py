@@ -0,0 +1,51 @@
+"""
+Готовый ответ дополнительного урока одинаков для всех пользователей, поэтому он кэшируется целиком.
+Ключ содержит версии моделей доп. материалов (backend.versioning): сигналы post_save/post_delete
+и bulk_create_nested меняют версию, и старые записи больше не читаются. Время жизни меньше срока ссылок Vimeo.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from api_additional_materials.serializers import *
+from api_additional_materials.versions import ADDITIONAL_LESSON_CONTENT_MODELS
+from api_lessons.models import get_video_links_from_vimeo
+from backend.versioning import get_versions, version_key
+
+ADDITIONAL_LESSON_CACHE_TIMEOUT = 30 * 60
+ELEMENT_COMPONENT_FIELDS = ('audio_component', 'video_component', 'text_component', 'image_component')
+
+
+def additional_lessons():
+    # Элементы со всеми компонентами одним запросом
+    return AdditionalLesson.objects.select_related('lesson_batch').prefetch_related(Prefetch(
+        'elements', queryset=AdditionalLessonElement.objects.select_related(*ELEMENT_COMPONENT_FIELDS)))
+
+
+def serialize_additional_lesson(lesson: AdditionalLesson) -> dict:
+    video_links = get_video_links_from_vimeo(
+        element.video_component.video_url for element in lesson.elements.all() if element.video_component)
+    return AdditionalLessonSerializer(lesson, context={'video_links': video_links}).data
+
+
+def additional_lesson_cache_key(lesson_id) -> str:
+    keys = [version_key(model) for model in ADDITIONAL_LESSON_CONTENT_MODELS]
+    versions = get_versions(keys)
+    digest = hashlib.md5('|'.join(str(versions[key]) for key in keys).encode()).hexdigest()
+    return f'additional_lesson:{lesson_id}:{digest}'
+
+
+def rendered_additional_lesson(lesson_id):
+    """
+    None, если урока нет
+    """
+    key = additional_lesson_cache_key(lesson_id)
+    data = cache.get(key)
+    if data is None:
+        lesson = additional_lessons().filter(pk=lesson_id).first()
+        if lesson is None:
+            return None
+        data = serialize_additional_lesson(lesson)
+        cache.set(key, data, timeout=ADDITIONAL_LESSON_CACHE_TIMEOUT)
+    return data
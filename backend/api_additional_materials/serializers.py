@@ -20,6 +20,10 @@ class AdditionalVideoComponentSerializer(NestedSupportedModelSerializer):
         fields = '__all__'
 
     def get_video_url(self, obj):
+        # Ссылки урока загружаются одним запросом заранее (см. rendering.serialize_additional_lesson)
+        video_links = self.context.get('video_links', {})
+        if obj.video_url in video_links:
+            return video_links[obj.video_url]
         return get_video_link_from_vimeo(obj.video_url)
 
 
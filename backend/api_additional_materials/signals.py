@@ -0,0 +1,6 @@
+from api_additional_materials.versions import ADDITIONAL_LESSON_CONTENT_MODELS
+from api_lessons.change_log import track_changes
+from backend.versioning import track_model_versions
+
+track_model_versions(*ADDITIONAL_LESSON_CONTENT_MODELS)
+track_changes(*ADDITIONAL_LESSON_CONTENT_MODELS)
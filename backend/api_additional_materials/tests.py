@@ -1,3 +1,58 @@
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
 
-# Create your tests here.
+from api_additional_materials.models import *
+from api_additional_materials.views import GetAdditionalLessonView
+from api_lessons.models import VimeoUrlCacheModel
+from api_users.models import UserModel
+from lms.apps.reports.query_budget import ViewCallMixin
+
+
+class AdditionalLessonTest(ViewCallMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = UserModel.objects.create(username='reader', email='reader@example.com')
+        batch = AdditionalLessonBatch.objects.create(title='Batch', order=0)
+        self.lessons = [AdditionalLesson.objects.create(title=f'Lesson {size}', lesson_batch=batch, order=size)
+                        for size in (1, 10)]
+        for lesson, size in zip(self.lessons, (1, 10)):
+            for order in range(size):
+                video_url = f'https://vimeo.com/{lesson.pk}{order}'
+                VimeoUrlCacheModel.objects.create(vimeo_link=video_url, playable_video_link=f'{video_url}.mp4',
+                                                  expire_time=timezone.now() + timezone.timedelta(hours=2))
+                AdditionalLessonElement.objects.create(
+                    lesson=lesson, order=order * 2,
+                    video_component=AdditionalVideoComponent.objects.create(description='Video', video_url=video_url))
+                AdditionalLessonElement.objects.create(
+                    lesson=lesson, order=order * 2 + 1,
+                    text_component=AdditionalTextComponent.objects.create(title='Text', text='Text'),
+                    audio_component=AdditionalAudioComponent.objects.create(audio='audio.mp3'))
+
+    def get_lesson(self, lesson):
+        return self.call_view(GetAdditionalLessonView, 'post', {'lesson_id': lesson.pk}, self.user)
+
+    def test_queries_do_not_depend_on_elements_number(self):
+        for lesson in self.lessons:
+            cache.clear()
+            with self.assertNumQueries(3):
+                data = self.get_lesson(lesson).data['message']
+            self.assertEqual(data['elements'][0]['video_component']['video_url'],
+                             f'https://vimeo.com/{lesson.pk}0.mp4')
+
+    def test_rendered_lesson_is_cached_until_content_changes(self):
+        lesson = self.lessons[1]
+        self.get_lesson(lesson)
+        with self.assertNumQueries(0):
+            self.get_lesson(lesson)
+
+        text = AdditionalTextComponent.objects.filter(additional_lesson_element__lesson=lesson).first()
+        text.text = 'Changed'
+        text.save()
+        elements = self.get_lesson(lesson).data['message']['elements']
+        self.assertIn('Changed', [element['text_component']['text'] for element in elements
+                                  if element['text_component']])
+
+    def test_lesson_not_found(self):
+        self.assertEqual(self.call_view(GetAdditionalLessonView, 'post', {'lesson_id': 0}, self.user).status_code,
+                         400)
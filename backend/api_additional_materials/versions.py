@@ -0,0 +1,6 @@
+from api_additional_materials.models import *
+
+ADDITIONAL_LESSON_CONTENT_MODELS = (
+    AdditionalLessonBatch, AdditionalLesson, AdditionalLessonElement,
+    AdditionalAudioComponent, AdditionalImageComponent, AdditionalTextComponent, AdditionalVideoComponent,
+)
@@ -1,25 +1,32 @@
 from rest_framework.views import APIView
 from rest_framework.request import Request
 
+from api_additional_materials.rendering import rendered_additional_lesson
 from api_additional_materials.serializers import *
+from api_additional_materials.versions import ADDITIONAL_LESSON_CONTENT_MODELS
+from backend.conditional import ConditionalVersionMixin
 from backend.global_function import success_with_text, error_with_text
 
 
-class GetAdditionalLessonBatchWithoutComponentsView(APIView):
+class GetAdditionalLessonBatchWithoutComponentsView(ConditionalVersionMixin, APIView):
+    version_dependencies = (AdditionalLessonBatch, AdditionalLesson)
+
     def get(self, request: Request):
         all_lesson_batch = AdditionalLessonBatch.objects.all()
         serializer = AdditionalLessonBatchWithoutComponentsSerializer(all_lesson_batch, many=True)
         return success_with_text(serializer.data)
 
 
-class GetAdditionalLessonView(APIView):
+class GetAdditionalLessonView(ConditionalVersionMixin, APIView):
+    conditional_methods = ('POST',)
+    version_dependencies = ADDITIONAL_LESSON_CONTENT_MODELS
+    version_max_age = 30 * 60  # ссылки Vimeo истекают
+
     def post(self, request):
         lesson_id = request.data.get('lesson_id')
         if not isinstance(lesson_id, int):
             return error_with_text('lesson_id must be an integer')
-        try:
-            lesson = AdditionalLesson.objects.get(pk=lesson_id)
-            serializer = AdditionalLessonSerializer(lesson)
-            return success_with_text(serializer.data)
-        except AdditionalLesson.DoesNotExist:
+        data = rendered_additional_lesson(lesson_id)
+        if data is None:
             return error_with_text('Lesson not found')
+        return success_with_text(data)
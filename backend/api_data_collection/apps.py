@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ApiDCConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api_data_collection'
+
+    def ready(self):
+        import api_data_collection.signals  # noqa
+        super().ready()
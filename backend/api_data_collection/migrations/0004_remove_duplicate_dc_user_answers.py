@@ -0,0 +1,24 @@
+# Generated by Django 5.0.2 on 2026-10-19 12:10
+
+from django.db import migrations
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+
+def remove_duplicate_dc_user_answers(apps, schema_editor):
+    DCUserAnswer = apps.get_model('api_data_collection', 'DCUserAnswer')
+    duplicate_ids = DCUserAnswer.objects.annotate(
+        row_number=Window(RowNumber(), partition_by=[F('user'), F('answer')], order_by=['pk']),
+    ).filter(row_number__gt=1).values_list('pk', flat=True)
+    DCUserAnswer.objects.filter(pk__in=list(duplicate_ids)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_data_collection', '0003_alter_dcuseranswer_options'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_dc_user_answers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.2 on 2026-10-19 11:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_data_collection', '0004_remove_duplicate_dc_user_answers'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='dcuseranswer',
+            constraint=models.UniqueConstraint(fields=('user', 'answer'), name='unique_dc_user_answer'),
+        ),
+    ]
@@ -40,4 +40,7 @@ class DCUserAnswer(models.Model):
 
     class Meta:
         verbose_name = 'Ответ пользователя (Дата коллекция)'
-        verbose_name_plural = 'Ответы пользователей (Дата коллекция)'
\ No newline at end of file
+        verbose_name_plural = 'Ответы пользователей (Дата коллекция)'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'answer'], name='unique_dc_user_answer'),
+        ]
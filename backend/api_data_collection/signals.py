@@ -0,0 +1,5 @@
+from api_data_collection.models import DCQuestion, DCQuestionAnswer, DCUserAnswer
+from backend.versioning import track_model_versions, track_user_model_versions
+
+track_model_versions(DCQuestion, DCQuestionAnswer)
+track_user_model_versions(DCUserAnswer)
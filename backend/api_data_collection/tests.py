@@ -0,0 +1,12 @@
+from api_data_collection.models import DCQuestion, DCQuestionAnswer, DCUserAnswer
+from api_users.models import UserModel
+from lms.apps.reports.query_budget import QueryBudgetTestCase
+
+
+class DCUserAnswerIndexPlanTest(QueryBudgetTestCase):
+    def test_answer_lookup_uses_unique_index(self):
+        user = UserModel.objects.get(pk=self.small.user_ids[0])
+        question = DCQuestion.objects.create(question_text='question')
+        answer = DCQuestionAnswer.objects.create(question=question, answer_text='answer')
+
+        self.assertUsesIndex(DCUserAnswer.objects.filter(user=user, answer=answer), 'unique_dc_user_answer')
@@ -1,6 +1,7 @@
 from django.shortcuts import render
 from rest_framework.views import APIView
 
+from backend.conditional import ConditionalVersionMixin
 from backend.global_function import success_with_text
 from .models import *
 from api_users.models import UserModel
@@ -8,7 +9,10 @@ from .serializers import *
 
 
 # Create your views here.
-class GetDCQuestionsView(APIView):
+class GetDCQuestionsView(ConditionalVersionMixin, APIView):
+    version_dependencies = (DCQuestion, DCQuestionAnswer)
+    user_version_dependencies = (DCUserAnswer,)
+
     def get(self, request):
         user: UserModel = request.user
         answered_questions_ids = DCUserAnswer.objects.filter(user=user).values_list('answer__question', flat=True)
@@ -27,7 +31,7 @@ class AnswerToDCQuestionView(APIView):
         answer: DCQuestionAnswer = serializer.validated_data['answer_id']
         if answer.question.needs_answer is False:
             return success_with_text('this question does not need an answer')
-        if DCUserAnswer.objects.filter(user=user, answer=answer).exists():
+        _, created = DCUserAnswer.objects.get_or_create(user=user, answer=answer)
+        if not created:
             return success_with_text('already answered')
-        DCUserAnswer.objects.create(user=user, answer=answer)
         return success_with_text('ok')
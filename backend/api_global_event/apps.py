@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ApiGlobalEventConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api_global_event'
+
+    def ready(self):
+        import api_global_event.signals  # noqa
+        super().ready()
@@ -0,0 +1,40 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+
+from api_global_event.models import GlobalEventModel
+from api_global_event.serializers import GlobalEventModelSerializer
+
+ACTIVE_EVENT_CACHE_KEY = 'global_event:active'
+
+
+def render_active_event():
+    active_event = GlobalEventModel.objects.filter(active=True).prefetch_related('datas').last()
+    return GlobalEventModelSerializer(active_event).data if active_event else None
+
+
+def get_active_event_data():
+    cached = cache.get(ACTIVE_EVENT_CACHE_KEY)
+    if cached is None:
+        # Оборачиваем в словарь, чтобы отсутствие события тоже кэшировалось
+        cached = {'event': render_active_event()}
+        cache.set(ACTIVE_EVENT_CACHE_KEY, cached, timeout=None)
+    return cached['event']
+
+
+def invalidate_active_event():
+    cache.delete(ACTIVE_EVENT_CACHE_KEY)
+    # Повторно после коммита, чтобы не закэшировать состояние из незакоммиченной транзакции
+    transaction.on_commit(lambda: cache.delete(ACTIVE_EVENT_CACHE_KEY))
+
+
+async def aget_active_event_data():
+    cached = await cache.aget(ACTIVE_EVENT_CACHE_KEY)
+    if cached is None:
+        return await sync_to_async(get_active_event_data)()
+    return cached['event']
+
+
+def with_bars_number(data, registration_number):
+    # Не изменяем закэшированный словарь, номер у каждого пользователя свой
+    return {**data, 'datas': data['datas'] + [{'key': 'number', 'value': registration_number}]}
@@ -0,0 +1,22 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api_global_event.cache import invalidate_active_event, get_active_event_data
+from api_global_event.models import GlobalEventDataModel, GlobalEventModel
+from api_users.socket.push import broadcast_global_event
+from backend.versioning import track_model_versions
+
+track_model_versions(GlobalEventModel, GlobalEventDataModel)
+
+
+def broadcast_active_event():
+    broadcast_global_event(get_active_event_data())
+
+
+@receiver([post_save, post_delete], sender=GlobalEventModel)
+@receiver([post_save, post_delete], sender=GlobalEventDataModel)
+def global_event_changed(sender, **kwargs):
+    invalidate_active_event()
+    # Данные события сохраняются inline после самого события, поэтому рассылаем после коммита
+    transaction.on_commit(broadcast_active_event)
@@ -1,27 +1,26 @@
-from typing import Dict, Any
+from asgiref.sync import sync_to_async
 
-from django.shortcuts import render
-from rest_framework.views import APIView
-
-from api_global_event.serializers import GlobalEventModelSerializer
+from api_global_event.cache import aget_active_event_data, with_bars_number
 from api_users.models import UserModel
+from backend.async_api import AsyncAPIView
 from backend.global_function import *
 
 from api_global_event.models import *
 
 
 # Create your views here.
-class GetGlobalEventView(APIView):
-    def get(self, request):
-        active_event: GlobalEventModel = GlobalEventModel.objects.filter(active=True).last()
-        if not active_event:
+class GetGlobalEventView(AsyncAPIView):
+    version_dependencies = (GlobalEventModel, GlobalEventDataModel)
+
+    async def get(self, request):
+        data = await aget_active_event_data()
+        if data is None:
             return success_with_text(None)
 
-        data = GlobalEventModelSerializer(active_event).data
-        if active_event.type == GlobalEventTypes.bars:
-            bbb: dict[str, int | str | Any] = {
-                'key': 'number',
-                'value': UserModel.objects.filter(pk__lt=request.user.pk, is_staff=False).count() + 1
-            }
-            data['datas'].append(bbb)
+        if data['type'] == GlobalEventTypes.bars:
+            user: UserModel = request.user
+            registration_number = user.registration_number
+            if registration_number is None:
+                registration_number = await sync_to_async(user.assign_registration_number)()
+            data = with_bars_number(data, registration_number)
         return success_with_text(data)
@@ -1,8 +1,3 @@
-import importlib
-from pprint import pprint
-
-from django.contrib.admin.exceptions import AlreadyRegistered
-
 from api_lessons.models import *
 
 
@@ -60,6 +55,20 @@ class UserLessonModelAdmin(admin.ModelAdmin):
     list_filter = ('user', 'lesson')
 
 
+@admin.register(LessonPack)
+class LessonPackAdmin(admin.ModelAdmin):
+    list_display = ('id', 'lesson', 'version', 'size', 'created_at')
+    list_filter = ('lesson',)
+    readonly_fields = ('version', 'manifest', 'size', 'created_at')
+
+
+@admin.register(ContentChange)
+class ContentChangeAdmin(admin.ModelAdmin):
+    list_display = ('id', 'model', 'object_id', 'deleted', 'created_at')
+    list_filter = ('model', 'deleted')
+    readonly_fields = ('model', 'object_id', 'deleted', 'created_at')
+
+
 #
 #
 # -----------------------------------
@@ -67,66 +76,46 @@ class UserLessonModelAdmin(admin.ModelAdmin):
 # -----------------------------------
 
 
-# Below is code for auto importing and registering all models from lesson_components directory
-models_dir = os.path.dirname(os.path.realpath(__file__)) + '/models/lesson_components/'
-model_files = [f for f in os.listdir(models_dir) if os.path.isfile(os.path.join(models_dir, f)) and f.endswith('.py')]
-models_with_inlines = {}
-models_just_register = []
-
-for model_file in model_files:
-    module_name = model_file[:-3]  # Remove .py extension
-    module = importlib.import_module(f'api_lessons.models.lesson_components.{module_name}')
-    for attr_name in dir(module):
-        attr = getattr(module, attr_name)
-        if isinstance(attr, type) and issubclass(attr, models.Model) and attr not in admin.site._registry:
-            if attr._meta.abstract:
-                continue
-            just_model = True
-            for field in attr._meta.fields:
-                if issubclass(attr, UserMatchingComponentElementCouple):
-                    continue
-                if type(field) is models.ForeignKey:
-                    if field.related_model in models_with_inlines:
-                        continue
-                    models_with_inlines[field.related_model] = models_with_inlines.get(field.related_model, []) + [attr]
-                    just_model = False
-
-            if just_model:
-                models_just_register.append(attr)
-
-for model, inlines in models_with_inlines.items():
-    if model in admin.site._registry:
-        continue
-
-
-    def get_inline_class(inline_model):
-        class Inline(admin.TabularInline):
-            model = inline_model
-            extra = 0
-            show_change_link = True
-
-        return Inline
-
+# Компоненты с вложенными моделями: таблица всех полей и inline вложенных. Регистрация статическая,
+# без обхода models/lesson_components при каждом запуске
+COMPONENT_INLINES = {
+    PutInOrderComponent: [PutInOrderComponentElement],
+    PutInOrderComponentElement: [UserPutInOrderAnswer],
+    QuestionComponent: [QuestionAnswer],
+    QuestionAnswer: [UserQuestionAnswer],
+    FillTextComponent: [FillTextLine],
+    FillTextLine: [UserFillTextAnswer],
+    MatchingComponent: [MatchingComponentElementCouple],
+    RecordAudioComponent: [UserRecordAudioComponent],
+}
+
+COMPONENT_MODELS = [
+    VideoComponent, BlueCardComponent, AudioComponent, ImageComponent, TextComponent, LessonPageElement,
+    MatchingComponentElement, MatchingComponentElementCouple, UserMatchingComponentElementCouple,
+    UserPutInOrderAnswer, UserQuestionAnswer, UserFillTextAnswer, UserRecordAudioComponent,
+]
+
+
+def get_inline_class(inline_model):
+    class Inline(admin.TabularInline):
+        model = inline_model
+        extra = 0
+        show_change_link = True
 
-    class ModelAdmin(admin.ModelAdmin):
-        def __init__(self, *args, **kwargs):
-            self.list_display = [field.name for field in model._meta.fields]
-            self.search_fields = self.list_display
-            self.inlines = [get_inline_class(inline) for inline in inlines]
-            super().__init__(*args, **kwargs)
+    return Inline
 
 
-    if issubclass(model, UserModel):
-        continue
+def get_component_admin_class(component_model, inline_models):
+    class ComponentAdmin(admin.ModelAdmin):
+        list_display = [field.name for field in component_model._meta.fields]
+        search_fields = list_display
+        inlines = [get_inline_class(inline) for inline in inline_models]
 
-    admin.site.register(model, ModelAdmin)
+    return ComponentAdmin
 
-for model in models_just_register:
-    if model in admin.site._registry:
-        continue
-    if issubclass(model, UserModel):
-        continue
-    admin.site.register(model, admin.ModelAdmin)
 
+for model, inlines in COMPONENT_INLINES.items():
+    admin.site.register(model, get_component_admin_class(model, inlines))
 
-admin.site.register(VimeoUrlCacheModel)
\ No newline at end of file
+admin.site.register(COMPONENT_MODELS)
+admin.site.register(VimeoUrlCacheModel)
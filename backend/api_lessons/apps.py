@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ApiLessonsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api_lessons'
+
+    def ready(self):
+        import api_lessons.signals  # noqa
+        super().ready()
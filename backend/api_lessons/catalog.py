@@ -0,0 +1,55 @@
+from collections import Counter
+
+from django.db.models import Max, Q
+
+from api_lessons.models import LessonBatch, UserLessonModel
+from api_users.models import UserModel
+
+
+def get_lesson_progress(user: UserModel):
+    """
+    Завершенные уроки пользователя и количество друзей на каждом уроке (по последнему уроку друга)
+    """
+    friends_last_lessons = UserLessonModel.objects.filter(user__in=user.friends.all()).values('user').annotate(
+        last_id=Max('pk')).values('last_id')
+    progress = UserLessonModel.objects.filter(
+        Q(user=user, completed=True) | Q(pk__in=friends_last_lessons)
+    ).values_list('user_id', 'lesson_id', 'completed')
+
+    completed_lessons = set()
+    friends_count = Counter()
+    for user_id, lesson_id, completed in progress:
+        if user_id == user.pk:
+            completed_lessons.add(lesson_id)
+        else:
+            friends_count[lesson_id] += 1
+    return completed_lessons, friends_count
+
+
+def build_catalog(user: UserModel):
+    # Дерево коллекций и уроков одним запросом (LEFT JOIN, коллекции без уроков тоже попадают)
+    rows = LessonBatch.objects.order_by('pk', 'lessons__order').values_list(
+        'pk', 'title', 'parent_lesson_batch_id',
+        'lessons__pk', 'lessons__is_available_on_free', 'lessons__title', 'lessons__description',
+    )
+    completed_lessons, friends_count = get_lesson_progress(user)
+
+    batches = {}
+    for batch_id, title, parent_id, lesson_id, is_available_on_free, lesson_title, description in rows:
+        batch = batches.setdefault(batch_id, {
+            'id': batch_id,
+            'lessons': [],
+            'title': title,
+            'parent_lesson_batch': parent_id,
+        })
+        if lesson_id is None:
+            continue
+        batch['lessons'].append({
+            'id': lesson_id,
+            'is_available_on_free': is_available_on_free,
+            'completed': lesson_id in completed_lessons,
+            'friends_count': friends_count[lesson_id],
+            'title': lesson_title,
+            'description': description,
+        })
+    return list(batches.values())
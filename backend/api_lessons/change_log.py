@@ -0,0 +1,229 @@
+"""
+Журнал изменений для синхронизации: приложение хранит локальную копию уроков и доп. материалов
+и запрашивает только изменения с курсора (id последней полученной записи журнала).
+Записи добавляются сигналами post_save/post_delete/bulk_created после коммита, остальные bulk-операции пишут их
+сами (log_changes).
+Ответ колоночный: для каждой модели список полей и строки текущих значений, удаленные объекты - списком id.
+Видимость содержимого зависит от типа пользователя, поэтому курсор - "<id записи>:<user_type>":
+после смены типа или изменения Lesson.is_available_on_free клиент получает недостающие или лишние строки.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_save
+from rest_framework.exceptions import ValidationError
+from django.utils import timezone
+
+from api_lessons.models import ContentChange, Lesson, MatchingComponentElement
+from api_lessons.versions import LESSON_ID_PATHS, MATCHING_ELEMENT_LESSON_PATHS
+from backend.global_function import bulk_created
+
+CHANGE_LOG_PAGE_SIZE = getattr(settings, 'CHANGE_LOG_PAGE_SIZE', 1000)
+CHANGE_LOG_KEEP_DAYS = getattr(settings, 'CHANGE_LOG_KEEP_DAYS', 30)
+# Параллельные транзакции могут стать видимыми не в порядке id записей. Последние секунды журнала
+# не отдаются, чтобы клиент не сдвинул курсор за запись, которая еще не видна
+CHANGE_LOG_SETTLE_SECONDS = getattr(settings, 'CHANGE_LOG_SETTLE_SECONDS', 2)
+
+# label_lower -> модель
+tracked_models = {}
+# Служебные поля, которые не отдаются клиенту: render_url платного урока раздается без авторизации
+INTERNAL_FIELDS = {Lesson: ('author', 'meta', 'post_type', 'render_url')}
+
+
+def track_changes(*models):
+    for model in models:
+        label = model._meta.label_lower
+        tracked_models[label] = model
+        post_save.connect(model_saved, sender=model, dispatch_uid=f'change_log_{label}')
+        post_delete.connect(model_deleted, sender=model, dispatch_uid=f'change_log_{label}')
+        bulk_created.connect(models_bulk_created, sender=model, dispatch_uid=f'change_log_{label}')
+
+
+def model_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        log_changes(sender, [instance.pk])
+
+
+def model_deleted(sender, instance, **kwargs):
+    log_changes(sender, [instance.pk], deleted=True)
+
+
+def models_bulk_created(sender, objects, **kwargs):
+    log_changes(sender, [obj.pk for obj in objects])
+
+
+def log_changes(model, pks, deleted=False):
+    """
+    Нужно вызывать вручную после bulk_create/bulk_update/update(), т.к. они не отправляют сигналы
+    """
+    label = model._meta.label_lower
+    if label not in tracked_models:
+        return
+    entries = [ContentChange(model=label, object_id=pk, deleted=deleted) for pk in pks if pk is not None]
+    if entries:
+        transaction.on_commit(lambda: ContentChange.objects.bulk_create(entries))
+
+
+def log_lesson_tree(lesson_ids):
+    """
+    Записи для урока и всего его содержимого: видимость содержимого зависит от Lesson.is_available_on_free
+    """
+    lesson_ids = list(lesson_ids)
+    for model, path in LESSON_ID_PATHS.items():
+        log_changes(model, model.objects.filter(**{f'{path}__in': lesson_ids}).values_list('pk', flat=True))
+    condition = Q()
+    for path in MATCHING_ELEMENT_LESSON_PATHS:
+        condition |= Q(**{f'{path}__in': lesson_ids})
+    log_changes(MatchingComponentElement, MatchingComponentElement.objects.filter(condition).distinct().values_list(
+        'pk', flat=True))
+
+
+def lesson_saving(sender, instance: Lesson, raw=False, update_fields=None, **kwargs):
+    instance._free_access_changed = False
+    if raw or instance.pk is None or (update_fields is not None and 'is_available_on_free' not in update_fields):
+        return
+    was_free = Lesson.objects.filter(pk=instance.pk).values_list('is_available_on_free', flat=True).first()
+    instance._free_access_changed = was_free is not None and was_free != instance.is_available_on_free
+
+
+def lesson_saved(sender, instance: Lesson, raw=False, **kwargs):
+    if getattr(instance, '_free_access_changed', False):
+        log_lesson_tree([instance.pk])
+
+
+def track_free_access():
+    """
+    После смены Lesson.is_available_on_free бесплатные пользователи должны получить или удалить содержимое урока.
+    Lesson.objects.update() сигналы не отправляет, после него нужно вызвать log_lesson_tree
+    """
+    pre_save.connect(lesson_saving, sender=Lesson, dispatch_uid='change_log_lesson_free_access')
+    post_save.connect(lesson_saved, sender=Lesson, dispatch_uid='change_log_lesson_free_access')
+
+
+def make_cursor(change_id, user) -> str:
+    return f'{change_id}:{user.user_type}'
+
+
+def parse_cursor(cursor: str) -> tuple:
+    """
+    (id записи, user_type). Курсор без типа пользователя считается устаревшим
+    """
+    change_id, _, user_type = cursor.partition(':')
+    if not change_id.isdigit():
+        raise ValidationError('Invalid cursor')
+    return int(change_id), user_type or None
+
+
+def free_lesson_filter(model):
+    """
+    Содержимое урока (страницы, элементы, компоненты) бесплатному пользователю доступно только для бесплатных уроков
+    """
+    if model is MatchingComponentElement:
+        paths = MATCHING_ELEMENT_LESSON_PATHS
+    elif model in LESSON_ID_PATHS and model is not Lesson:
+        paths = (LESSON_ID_PATHS[model],)
+    else:
+        return None
+    condition = Q()
+    for path in paths:
+        condition |= Q(**{f'{path.removesuffix("_id")}__is_available_on_free': True})
+    return condition
+
+
+def visible_objects(model, user):
+    queryset = model.objects.all()
+    condition = None if user.is_paid() else free_lesson_filter(model)
+    return queryset if condition is None else queryset.filter(condition)
+
+
+def sync_fields(model):
+    internal = INTERNAL_FIELDS.get(model, ())
+    return [model._meta.pk.attname, *[
+        field.attname for field in model._meta.concrete_fields
+        if not field.primary_key and field.name not in internal]]
+
+
+def table(model, queryset) -> dict:
+    fields = sync_fields(model)
+    rows = [list(row) for row in queryset.order_by('pk').values_list(*fields)]
+    return {'fields': fields, 'rows': rows}
+
+
+def settled_changes():
+    return ContentChange.objects.filter(
+        created_at__lte=timezone.now() - timezone.timedelta(seconds=CHANGE_LOG_SETTLE_SECONDS))
+
+
+def cursor_expired(cursor) -> bool:
+    # Записи старше первой оставшейся удалены prune_changes, клиент мог их пропустить
+    oldest = ContentChange.objects.order_by('pk').values_list('pk', flat=True).first()
+    return oldest is not None and cursor < oldest - 1
+
+
+def full_sync(user) -> dict:
+    # Курсор берется до чтения строк: изменения во время чтения придут еще раз при следующей синхронизации
+    cursor = settled_changes().order_by('-pk').values_list('pk', flat=True).first() or 0
+    upserts = {label: table(model, visible_objects(model, user)) for label, model in tracked_models.items()}
+    return {'cursor': make_cursor(cursor, user), 'reset': True, 'has_more': False, 'upserts': upserts, 'deleted': {}}
+
+
+def changes_since(cursor, user, limit=CHANGE_LOG_PAGE_SIZE) -> dict:
+    """
+    Изменения после курсора (parse_cursor): по каждому объекту берется последнее состояние. Без курсора,
+    если журнал с курсора уже очищен или курсор получен с другим типом пользователя, возвращается все содержимое
+    (reset) - клиент заменяет им локальную копию
+    """
+    if cursor is None:
+        return full_sync(user)
+    cursor, user_type = cursor
+    if user_type != user.user_type or cursor_expired(cursor):
+        return full_sync(user)
+
+    entries = list(settled_changes().filter(pk__gt=cursor).order_by('pk').values_list(
+        'pk', 'model', 'object_id', 'deleted')[:limit + 1])
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    latest = {}
+    for _, label, object_id, deleted in entries:
+        latest[label, object_id] = deleted
+    changed = defaultdict(list)
+    deleted = defaultdict(set)
+    for (label, object_id), is_deleted in latest.items():
+        if label not in tracked_models:
+            continue
+        if is_deleted:
+            deleted[label].add(object_id)
+        else:
+            changed[label].append(object_id)
+
+    upserts = {}
+    for label, object_ids in changed.items():
+        model = tracked_models[label]
+        data = table(model, visible_objects(model, user).filter(pk__in=object_ids))
+        # Строки нет: удалена без сигнала или недоступна пользователю
+        deleted[label].update(set(object_ids) - {row[0] for row in data['rows']})
+        if data['rows']:
+            upserts[label] = data
+
+    return {
+        'cursor': make_cursor(entries[-1][0] if entries else cursor, user),
+        'reset': False,
+        'has_more': has_more,
+        'upserts': upserts,
+        'deleted': {label: sorted(object_ids) for label, object_ids in deleted.items() if object_ids},
+    }
+
+
+def prune_changes(keep_days=CHANGE_LOG_KEEP_DAYS) -> int:
+    """
+    Удаляет старые записи. Последняя запись остается всегда, по ней видно, что старые курсоры устарели
+    """
+    latest = ContentChange.objects.order_by('-pk').values_list('pk', flat=True).first()
+    if latest is None:
+        return 0
+    deleted, _ = ContentChange.objects.filter(
+        pk__lt=latest, created_at__lt=timezone.now() - timezone.timedelta(days=keep_days)).delete()
+    return deleted
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from api_lessons.models import Lesson
+from api_lessons.snapshot import SNAPSHOT_FORMATS, dumps_snapshot, export_lessons
+
+
+class Command(BaseCommand):
+    help = 'Export lessons with pages, elements and components to a JSON or msgpack snapshot'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Snapshot file')
+        parser.add_argument('lesson_ids', nargs='*', type=int, help='Lessons to export (default: all)')
+        parser.add_argument('--format', choices=SNAPSHOT_FORMATS, help='Default: by the output file extension')
+
+    def handle(self, *args, **options):
+        lesson_ids = options['lesson_ids'] or list(Lesson.objects.values_list('pk', flat=True))
+        snapshot_format = options['format'] or ('msgpack' if options['output'].endswith('.msgpack') else 'json')
+        try:
+            snapshot = export_lessons(lesson_ids)
+        except ValidationError as e:
+            raise CommandError(e.detail)
+
+        with open(options['output'], 'wb') as f:
+            f.write(dumps_snapshot(snapshot, snapshot_format))
+        self.stdout.write(f'Exported {len(lesson_ids)} lessons, {len(snapshot["media"])} media files referenced')
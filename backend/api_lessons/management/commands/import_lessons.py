@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from api_lessons.models import LessonBatch
+from api_lessons.snapshot import import_lessons, loads_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Import lessons from a JSON or msgpack snapshot next to the existing lessons'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Snapshot file')
+        parser.add_argument('--lesson-batch', type=int, help='Put all lessons into this batch '
+                                                             '(default: top-level batch with the same title)')
+
+    def handle(self, *args, **options):
+        lesson_batch = None
+        if options['lesson_batch']:
+            lesson_batch = LessonBatch.objects.filter(pk=options['lesson_batch']).first()
+            if lesson_batch is None:
+                raise CommandError('Lesson batch does not exist')
+
+        with open(options['input'], 'rb') as f:
+            data = f.read()
+        try:
+            lessons = import_lessons(loads_snapshot(data), lesson_batch=lesson_batch)
+        except ValidationError as e:
+            raise CommandError(e.detail)
+        self.stdout.write(f'Imported lessons: {", ".join(str(lesson.pk) for lesson in lessons)}')
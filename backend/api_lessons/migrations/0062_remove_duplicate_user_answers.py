@@ -0,0 +1,39 @@
+# Generated by Django 5.0.2 on 2026-10-19 12:10
+
+from django.db import migrations
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+# Какую запись оставить из дубликатов: ту, которую раньше показывало чтение (последний ответ строки/пары,
+# первый ответ порядка и записи), у урока - завершенную
+KEEP_ORDER = {
+    'UserFillTextAnswer': (('user', 'line'), ['-pk']),
+    'UserMatchingComponentElementCouple': (('user', 'couple'), ['-pk']),
+    'UserPutInOrderAnswer': (('user', 'element'), ['pk']),
+    'UserQuestionAnswer': (('user', 'answer'), ['pk']),
+    'UserRecordAudioComponent': (('user', 'component'), ['pk']),
+    'UserLessonModel': (('user', 'lesson'), ['-completed', 'pk']),
+}
+
+
+def delete_duplicates(model, fields, keep_order):
+    duplicate_ids = model.objects.annotate(
+        row_number=Window(RowNumber(), partition_by=[F(field) for field in fields], order_by=keep_order),
+    ).filter(row_number__gt=1).values_list('pk', flat=True)
+    model.objects.filter(pk__in=list(duplicate_ids)).delete()
+
+
+def remove_duplicate_user_answers(apps, schema_editor):
+    for model_name, (fields, keep_order) in KEEP_ORDER.items():
+        delete_duplicates(apps.get_model('api_lessons', model_name), fields, keep_order)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_lessons', '0061_lessonbatch_parent_lesson_batch'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_user_answers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.2 on 2026-10-19 11:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_lessons', '0062_remove_duplicate_user_answers'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='userfilltextanswer',
+            constraint=models.UniqueConstraint(fields=('user', 'line'), name='unique_user_fill_text_answer'),
+        ),
+        migrations.AddConstraint(
+            model_name='userlessonmodel',
+            constraint=models.UniqueConstraint(fields=('user', 'lesson'), name='unique_user_lesson'),
+        ),
+        migrations.AddConstraint(
+            model_name='usermatchingcomponentelementcouple',
+            constraint=models.UniqueConstraint(fields=('user', 'couple'), name='unique_user_matching_couple'),
+        ),
+        migrations.AddConstraint(
+            model_name='userputinorderanswer',
+            constraint=models.UniqueConstraint(fields=('user', 'element'), name='unique_user_put_in_order_answer'),
+        ),
+        migrations.AddConstraint(
+            model_name='userquestionanswer',
+            constraint=models.UniqueConstraint(fields=('user', 'answer'), name='unique_user_question_answer'),
+        ),
+        migrations.AddConstraint(
+            model_name='userrecordaudiocomponent',
+            constraint=models.UniqueConstraint(fields=('user', 'component'), name='unique_user_record_audio'),
+        ),
+    ]
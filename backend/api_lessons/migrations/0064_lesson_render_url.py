@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-19 11:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_lessons', '0063_user_answer_unique_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='render_url',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='Статический файл урока'),
+        ),
+    ]
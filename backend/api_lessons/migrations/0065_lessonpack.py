@@ -0,0 +1,37 @@
+# Generated by Django 5.0.2 on 2026-10-19 11:35
+
+import api_lessons.models.lesson_pack
+import django.db.models.deletion
+import protected_media.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_lessons', '0064_lesson_render_url'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LessonPack',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(max_length=64, verbose_name='Версия (хеш содержимого)')),
+                ('manifest', models.JSONField(verbose_name='Манифест')),
+                ('archive', protected_media.models.ProtectedFileField(storage=protected_media.models.ProtectedFileSystemStorage(), upload_to=api_lessons.models.lesson_pack.lesson_pack_path, verbose_name='Архив')),
+                ('size', models.PositiveBigIntegerField(default=0, verbose_name='Размер архива')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создан')),
+                ('lesson', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='packs', to='api_lessons.lesson', verbose_name='Урок')),
+            ],
+            options={
+                'verbose_name': 'Офлайн-пакет урока',
+                'verbose_name_plural': 'Офлайн-пакеты уроков',
+                'ordering': ['-created_at', '-pk'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='lessonpack',
+            constraint=models.UniqueConstraint(fields=('lesson', 'version'), name='unique_lesson_pack_version'),
+        ),
+    ]
@@ -1,4 +1,6 @@
 from .lesson import *
 from .user_lesson import *
 from .lesson_components import *
-from .vimeo_url_cache import *
\ No newline at end of file
+from .vimeo_url_cache import *
+from .lesson_pack import *
+from .content_change import *
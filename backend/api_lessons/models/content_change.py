@@ -0,0 +1,19 @@
+from django.db import models
+
+
+class ContentChange(models.Model):
+    """
+    Запись журнала изменений уроков и доп. материалов, id записи - курсор синхронизации (см. api_lessons.change_log)
+    """
+    model = models.CharField(max_length=100, verbose_name='Модель')
+    object_id = models.PositiveBigIntegerField(verbose_name='ID объекта')
+    deleted = models.BooleanField(default=False, verbose_name='Удален')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Создано')
+
+    class Meta:
+        verbose_name = 'Изменение содержимого'
+        verbose_name_plural = 'Журнал изменений содержимого'
+        ordering = ['pk']
+
+    def __str__(self):
+        return f'{self.pk} ContentChange: {self.model} {self.object_id}{" deleted" if self.deleted else ""}'
@@ -135,3 +135,6 @@ class Lesson(models.Model):
         default="", blank=True, max_length=20, verbose_name="Мета-данные"
     )
     post_type = models.CharField(max_length=20, default="", verbose_name="Тип контента")
+    render_url = models.CharField(
+        default="", blank=True, max_length=255, verbose_name="Статический файл урока"
+    )
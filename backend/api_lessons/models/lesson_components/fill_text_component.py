@@ -56,6 +56,9 @@ class UserFillTextAnswer(models.Model):
     class Meta:
         verbose_name = '[Ответ] Строка компонента заполните текст'
         verbose_name_plural = '[Ответы] Строки компонента заполните текст'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'line'], name='unique_user_fill_text_answer'),
+        ]
 
     def __str__(self):
         return f'{self.pk} UserFillTextAnswer: "{self.answer}"'
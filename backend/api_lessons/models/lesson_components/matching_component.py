@@ -50,9 +50,13 @@ class MatchingComponentElement(models.Model):
     def __str__(self):
         return f'{self.pk} MatchingComponentElement: "{self.text}"'
 
-    def save(self, *args, **kwargs):
+    def before_save(self):
+        # Вызывается и при bulk_create (см. bulk_create_nested)
         if self.image:
             self.text = ''
+
+    def save(self, *args, **kwargs):
+        self.before_save()
         super().save(*args, **kwargs)
 
 
@@ -68,6 +72,9 @@ class UserMatchingComponentElementCouple(models.Model):
     class Meta:
         verbose_name = '[Ответ] Пара элементов соединения'
         verbose_name_plural = '[Ответ] Пары элементов соединения'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'couple'], name='unique_user_matching_couple'),
+        ]
 
     def __str__(self):
         return f'{self.pk} UserMatchingComponentElementCouple'
@@ -48,6 +48,9 @@ class UserPutInOrderAnswer(models.Model):
         verbose_name = '[Ответ] Элемент компонента поставьте в правильном порядке'
         verbose_name_plural = '[Ответы] Элементы компонента поставьте в правильном порядке'
         ordering = ['order']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'element'], name='unique_user_put_in_order_answer'),
+        ]
 
     def __str__(self):
         return f'{self.pk} UserPutInOrderAnswer: "{self.order}"'
@@ -44,6 +44,9 @@ class UserQuestionAnswer(models.Model):
     class Meta:
         verbose_name = '[Ответ] Вопрос компонент'
         verbose_name_plural = '[Ответы] Вопросы компонент'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'answer'], name='unique_user_question_answer'),
+        ]
 
     def __str__(self):
         return f'{self.pk} UserQuestionAnswer: '
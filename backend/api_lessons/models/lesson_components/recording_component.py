@@ -34,6 +34,9 @@ class UserRecordAudioComponent(models.Model):
     class Meta:
         verbose_name = '[Ответ] Аудио компонент'
         verbose_name_plural = '[Ответ] Аудио компоненты'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'component'], name='unique_user_record_audio'),
+        ]
 
     def __str__(self):
         return f'{self.pk} UserRecordAudioComponent'
@@ -0,0 +1,31 @@
+from django.db import models
+from protected_media.models import ProtectedFileField
+
+from api_lessons.models import Lesson
+
+
+def lesson_pack_path(instance, filename):
+    return f'lesson_packs/{instance.lesson_id}/{instance.version}.zip'
+
+
+class LessonPack(models.Model):
+    """
+    Архив урока для офлайн-режима: lesson.json, manifest.json и медиафайлы (см. api_lessons.packs)
+    """
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='packs', verbose_name='Урок')
+    version = models.CharField(max_length=64, verbose_name='Версия (хеш содержимого)')
+    manifest = models.JSONField(verbose_name='Манифест')
+    archive = ProtectedFileField(upload_to=lesson_pack_path, verbose_name='Архив')
+    size = models.PositiveBigIntegerField(default=0, verbose_name='Размер архива')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создан')
+
+    class Meta:
+        verbose_name = 'Офлайн-пакет урока'
+        verbose_name_plural = 'Офлайн-пакеты уроков'
+        ordering = ['-created_at', '-pk']
+        constraints = [
+            models.UniqueConstraint(fields=['lesson', 'version'], name='unique_lesson_pack_version'),
+        ]
+
+    def __str__(self):
+        return f'{self.pk} LessonPack: lesson {self.lesson_id} v{self.version}'
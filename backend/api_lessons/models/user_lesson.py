@@ -15,3 +15,8 @@ class UserLessonModel(models.Model):
     completed = models.BooleanField(default=False, verbose_name='Урок завершен')
     review_mark = models.IntegerField(null=True, blank=True, verbose_name='Оценка урока')
     review_comment = models.CharField(max_length=4096, null=False, blank=True, verbose_name='Комментарий к уроку')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'lesson'], name='unique_user_lesson'),
+        ]
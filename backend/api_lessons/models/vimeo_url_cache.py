@@ -1,3 +1,6 @@
+import asyncio
+
+import aiohttp
 import requests
 from django.db import models
 from django.utils import timezone
@@ -16,22 +19,90 @@ class VimeoUrlCacheModel(models.Model):
         verbose_name_plural = 'Кэш ссылок Vimeo'
 
 
-def get_video_link_from_vimeo(vimeo_link):
-    now = timezone.now() - timezone.timedelta(hours=1)
-    cached_video = VimeoUrlCacheModel.objects.filter(vimeo_link=vimeo_link, expire_time__gt=now).first()
-    if cached_video:
-        return cached_video.playable_video_link
+def _vimeo_request_data(vimeo_link):
     video_id = vimeo_link.split('/')[-1]
     url = f'https://api.vimeo.com/videos/{video_id}?fields=play'
     headers = {'Authorization': 'Bearer ' + VIMEO_ACCESS_TOKEN}
-    response = requests.get(url, headers=headers)
-    response_json = response.json()
+    return url, headers
+
+
+def _parse_vimeo_play_response(response_json):
     if not response_json.get('play', False):
-        return 'https://dummylink.dummy'
+        return None
     progressive = response_json['play']['progressive']
     video = [video for video in progressive if video['rendition'] == '1080p'][0]
+    return video['link'], parse_datetime(video['link_expiration_time'])
+
+
+def _cache_valid_after():
+    return timezone.now() - timezone.timedelta(hours=1)
+
+
+def _cached_video_links(vimeo_links):
+    return VimeoUrlCacheModel.objects.filter(vimeo_link__in=vimeo_links,
+                                             expire_time__gt=_cache_valid_after()).values_list('vimeo_link',
+                                                                                               'playable_video_link')
+
+
+def get_video_link_from_vimeo(vimeo_link):
+    cached_video = VimeoUrlCacheModel.objects.filter(vimeo_link=vimeo_link, expire_time__gt=_cache_valid_after()).first()
+    if cached_video:
+        return cached_video.playable_video_link
+    return _fetch_video_link(vimeo_link)
 
-    expire_time = parse_datetime(video['link_expiration_time'])
-    video_link = video['link']
+
+def _fetch_video_link(vimeo_link):
+    url, headers = _vimeo_request_data(vimeo_link)
+    response = requests.get(url, headers=headers)
+    parsed = _parse_vimeo_play_response(response.json())
+    if parsed is None:
+        return 'https://dummylink.dummy'
+
+    video_link, expire_time = parsed
     VimeoUrlCacheModel.objects.create(vimeo_link=vimeo_link, playable_video_link=video_link, expire_time=expire_time)
     return video_link
+
+
+def get_video_links_from_vimeo(vimeo_links) -> dict:
+    # Кэш проверяется одним запросом, в Vimeo идут только отсутствующие ссылки
+    vimeo_links = set(vimeo_links)
+    video_links = dict(_cached_video_links(vimeo_links)) if vimeo_links else {}
+    for vimeo_link in vimeo_links - video_links.keys():
+        video_links[vimeo_link] = _fetch_video_link(vimeo_link)
+    return video_links
+
+
+async def aget_video_link_from_vimeo(vimeo_link, session: aiohttp.ClientSession):
+    cached_video = await VimeoUrlCacheModel.objects.filter(vimeo_link=vimeo_link,
+                                                           expire_time__gt=_cache_valid_after()).afirst()
+    if cached_video:
+        return cached_video.playable_video_link
+    return await _afetch_video_link(vimeo_link, session)
+
+
+async def _afetch_video_link(vimeo_link, session: aiohttp.ClientSession):
+    url, headers = _vimeo_request_data(vimeo_link)
+    async with session.get(url, headers=headers) as response:
+        response_json = await response.json()
+    parsed = _parse_vimeo_play_response(response_json)
+    if parsed is None:
+        return 'https://dummylink.dummy'
+
+    video_link, expire_time = parsed
+    await VimeoUrlCacheModel.objects.acreate(vimeo_link=vimeo_link, playable_video_link=video_link,
+                                             expire_time=expire_time)
+    return video_link
+
+
+async def aget_video_links_from_vimeo(vimeo_links) -> dict:
+    # Кэш проверяется одним запросом, отсутствующие ссылки запрашиваются параллельно в одной HTTP-сессии
+    vimeo_links = set(vimeo_links)
+    if not vimeo_links:
+        return {}
+    video_links = {link: playable async for link, playable in _cached_video_links(vimeo_links)}
+    missing = list(vimeo_links - video_links.keys())
+    if missing:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=15)) as session:
+            fetched = await asyncio.gather(*[_afetch_video_link(link, session) for link in missing])
+        video_links.update(zip(missing, fetched))
+    return video_links
@@ -0,0 +1,186 @@
+"""
+Офлайн-пакеты уроков: архив с lesson.json, manifest.json и медиафайлами урока (аудио, изображения).
+Манифест хранит sha256 и размер каждого файла, версия пакета - хеш манифеста. Клиент сообщает свою версию
+и скачивает только изменившиеся файлы (см. lesson_pack_delta) или весь архив.
+Пакеты собираются задачей django-q после изменения урока (см. schedule_lesson_packs).
+"""
+import hashlib
+import io
+import json
+import logging
+import zipfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+from api_lessons.models import *
+from api_lessons.static_render import write_lesson_static
+from api_lessons.versions import LESSON_ID_PATHS, MATCHING_ELEMENT_LESSON_PATHS
+from backend.task_queues import enqueue
+
+logger = logging.getLogger(__name__)
+
+LESSON_PACK_FORMAT = 'vector-edu.lesson-pack'
+LESSON_PACK_CONTENT = 'lesson.json'
+LESSON_PACK_MANIFEST = 'manifest.json'
+LESSON_PACK_MEDIA_PREFIX = 'media/'
+# Старые пакеты нужны, чтобы считать разницу с версией клиента
+LESSON_PACK_KEEP_VERSIONS = getattr(settings, 'LESSON_PACK_KEEP_VERSIONS', 5)
+# Пока сборка в очереди, повторные изменения урока новую задачу не ставят
+LESSON_PACK_PENDING_TIMEOUT = getattr(settings, 'LESSON_PACK_PENDING_TIMEOUT', 10 * 60)
+
+
+def lesson_ids_of(model, pks) -> set:
+    if model is MatchingComponentElement:
+        paths = MATCHING_ELEMENT_LESSON_PATHS
+    elif model in LESSON_ID_PATHS:
+        paths = (LESSON_ID_PATHS[model],)
+    else:
+        return set()
+    lesson_ids = set()
+    for path in paths:
+        lesson_ids.update(model.objects.filter(pk__in=pks).values_list(path, flat=True))
+    lesson_ids.discard(None)
+    return lesson_ids
+
+
+def deleted_parent(instance):
+    """
+    Удаленной строки уже нет в БД, урок ищется через ее родителя (внешний ключ): (модель, id) или None
+    """
+    for field in instance._meta.concrete_fields:
+        if field.is_relation and field.related_model in LESSON_ID_PATHS:
+            parent_id = getattr(instance, field.attname)
+            if parent_id is not None:
+                return field.related_model, parent_id
+    return None
+
+
+def pack_pending_key(lesson_id) -> str:
+    return f'lesson_pack:pending:{lesson_id}'
+
+
+def schedule_lesson_packs(lesson_ids):
+    for lesson_id in set(lesson_ids):
+        if cache.add(pack_pending_key(lesson_id), True, timeout=LESSON_PACK_PENDING_TIMEOUT):
+            enqueue('api_lessons.tasks.build_lesson_pack', lesson_id, task_name=f'lesson_pack_{lesson_id}')
+
+
+def schedule_lesson_packs_on_commit(model, pks):
+    """
+    Урок ищется после коммита: при каскадном удалении урока его уже нет и сборка не ставится
+    """
+    pks = list(pks)
+    transaction.on_commit(lambda: schedule_lesson_packs(lesson_ids_of(model, pks)))
+
+
+def file_entry(data: bytes) -> dict:
+    return {'sha256': hashlib.sha256(data).hexdigest(), 'size': len(data)}
+
+
+def lesson_media_names(lesson: Lesson) -> list:
+    in_lesson = {'page_element__page__lesson': lesson}
+    names = set(AudioComponent.objects.filter(**in_lesson).values_list('audio', flat=True))
+    names.update(ImageComponent.objects.filter(**in_lesson).values_list('image', flat=True))
+    names.update(MatchingComponentElement.objects.filter(
+        first_element__component__page_element__page__lesson=lesson).values_list('image', flat=True))
+    names.update(MatchingComponentElement.objects.filter(
+        second_element__component__page_element__page__lesson=lesson).values_list('image', flat=True))
+    names.discard('')
+    names.discard(None)
+    return sorted(names)
+
+
+def media_storage():
+    return AudioComponent._meta.get_field('audio').storage
+
+
+def build_lesson_pack(lesson: Lesson) -> LessonPack:
+    """
+    Собирает пакет, если содержимое урока изменилось с последней сборки, иначе возвращает существующий
+    """
+    render_url, content = write_lesson_static(lesson)
+    storage = media_storage()
+
+    previous = lesson.packs.first()
+    # Имена медиафайлов уникальны (PathAndRename), поэтому хеш из прошлой сборки остается верным
+    known = previous.manifest['files'] if previous else {}
+    files = {LESSON_PACK_CONTENT: {**file_entry(content), 'url': render_url}}
+    media = {}
+    for name in lesson_media_names(lesson):
+        path = f'{LESSON_PACK_MEDIA_PREFIX}{name}'
+        if path in known:
+            entry, data = {'sha256': known[path]['sha256'], 'size': known[path]['size']}, None
+        else:
+            try:
+                with storage.open(name, 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                logger.warning('Lesson %s media file "%s" is missing, not packed', lesson.pk, name)
+                continue
+            entry = file_entry(data)
+        files[path] = {**entry, 'url': storage.url(name)}
+        media[path] = (name, data)
+
+    version = hashlib.sha256(json.dumps(
+        {path: entry['sha256'] for path, entry in files.items()}, sort_keys=True).encode()).hexdigest()[:16]
+    existing = lesson.packs.filter(version=version).first()
+    if existing is not None:
+        if existing != previous:
+            # Урок вернулся к одной из прошлых версий, она снова текущая
+            existing.created_at = timezone.now()
+            LessonPack.objects.filter(pk=existing.pk).update(created_at=existing.created_at)
+        return existing
+
+    manifest = {'format': LESSON_PACK_FORMAT, 'lesson_id': lesson.pk, 'version': version, 'files': files}
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr(LESSON_PACK_MANIFEST, json.dumps(manifest, ensure_ascii=False), zipfile.ZIP_DEFLATED)
+        archive.writestr(LESSON_PACK_CONTENT, content, zipfile.ZIP_DEFLATED)
+        for path, (name, data) in media.items():
+            if data is None:
+                with storage.open(name, 'rb') as f:
+                    data = f.read()
+            # Аудио и изображения уже сжаты
+            archive.writestr(path, data, zipfile.ZIP_STORED)
+
+    pack = LessonPack(lesson=lesson, version=version, manifest=manifest, size=buffer.tell())
+    pack.archive.save(f'{version}.zip', ContentFile(buffer.getvalue()), save=False)
+    pack.save()
+    remove_old_packs(lesson)
+    return pack
+
+
+def remove_old_packs(lesson: Lesson):
+    for pack in lesson.packs.all()[LESSON_PACK_KEEP_VERSIONS:]:
+        pack.archive.delete(save=False)
+        pack.delete()
+
+
+def lesson_pack_delta(pack: LessonPack, client_version=None) -> dict:
+    """
+    Что скачать клиенту с пакетом client_version: измененные и удаленные файлы.
+    Если версия клиента неизвестна (старый пакет удален), изменены все файлы
+    """
+    files = pack.manifest['files']
+    client_pack = pack.lesson.packs.filter(version=client_version).first() if client_version else None
+    if client_pack is None:
+        changed, removed = sorted(files), []
+    else:
+        client_files = client_pack.manifest['files']
+        changed = sorted(path for path, entry in files.items()
+                         if client_files.get(path, {}).get('sha256') != entry['sha256'])
+        removed = sorted(client_files.keys() - files.keys())
+    return {
+        'lesson_id': pack.lesson_id,
+        'version': pack.version,
+        'client_version': client_pack.version if client_pack else None,
+        'archive_url': pack.archive.url,
+        'archive_size': pack.size,
+        'files': files,
+        'changed': changed,
+        'removed': removed,
+    }
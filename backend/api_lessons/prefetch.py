@@ -0,0 +1,73 @@
+from django.db.models import Prefetch
+
+from api_lessons.models import *
+
+# Поля компонентов в LessonPageElement (OneToOne, загружаются через select_related)
+PAGE_ELEMENT_COMPONENT_FIELDS = (
+    'matching_component', 'audio_component', 'blue_card_component', 'fill_text_component', 'image_component',
+    'put_in_order_component', 'question_component', 'record_audio_component', 'text_component', 'video_component',
+)
+
+
+def component_prefetches(field_name, prefix=''):
+    """
+    Вложенные данные компонента (строки, ответы, пары элементов) относительно самого компонента или через prefix
+    """
+    if field_name == 'matching_component':
+        couples = MatchingComponentElementCouple.objects.select_related('first_element', 'second_element')
+        return [Prefetch(f'{prefix}element_couples', queryset=couples)]
+    if field_name == 'fill_text_component':
+        return [f'{prefix}lines']
+    if field_name == 'put_in_order_component':
+        return [f'{prefix}elements']
+    if field_name == 'question_component':
+        return [f'{prefix}answers']
+    return []
+
+
+def page_elements_queryset():
+    return LessonPageElement.objects.select_related(*PAGE_ELEMENT_COMPONENT_FIELDS)
+
+
+def lesson_prefetches():
+    # Весь урок (страницы, элементы, компоненты и их вложенные данные) за постоянное число запросов
+    lookups = [Prefetch('pages__elements', queryset=page_elements_queryset())]
+    for field_name in PAGE_ELEMENT_COMPONENT_FIELDS:
+        lookups += component_prefetches(field_name, prefix=f'pages__elements__{field_name}__')
+    return lookups
+
+
+class UserLessonAnswers:
+    """
+    Ответы пользователя на все компоненты урока, по одному запросу на тип ответа
+    """
+
+    def __init__(self, user, lesson):
+        in_lesson = {'component__page_element__page__lesson': lesson}
+
+        # При дубликатах берется последний ответ, как в прежних .last()
+        self.fill_text = dict(UserFillTextAnswer.objects.filter(
+            user=user, line__in=FillTextLine.objects.filter(**in_lesson)).order_by('pk').values_list('line_id', 'answer'))
+        self.matching = dict(UserMatchingComponentElementCouple.objects.filter(
+            user=user, couple__in=MatchingComponentElementCouple.objects.filter(**in_lesson),
+        ).order_by('pk').values_list('couple_id', 'first_element_id'))
+        # ... а здесь первый, как в прежних .first()
+        self.put_in_order = dict(UserPutInOrderAnswer.objects.filter(
+            user=user, element__in=PutInOrderComponentElement.objects.filter(**in_lesson),
+        ).order_by('-pk').values_list('element_id', 'order'))
+        self.records = {record.component_id: record for record in UserRecordAudioComponent.objects.filter(
+            user=user, component__page_element__page__lesson=lesson).order_by('-pk')}
+        self.questions = set(UserQuestionAnswer.objects.filter(
+            user=user, answer__in=QuestionAnswer.objects.filter(**in_lesson)).values_list('answer_id', flat=True))
+        self.user_lesson = UserLessonModel.objects.filter(user=user, lesson=lesson).first()
+
+    @classmethod
+    def empty(cls):
+        """
+        Без ответов: урок в статическом файле одинаков для всех пользователей
+        """
+        answers = cls.__new__(cls)
+        answers.fill_text, answers.matching, answers.put_in_order, answers.records = {}, {}, {}, {}
+        answers.questions = set()
+        answers.user_lesson = None
+        return answers
@@ -3,12 +3,24 @@ from api_lessons.models import *
 from api_lessons.serializers import GetLessonById
 
 
+# Компонент с элементом страницы, страницей и уроком, чтобы get_lesson() не делал запросов
+COMPONENT_LESSON_PATH = 'component__page_element__page__lesson'
+
+
+def get_objects_or_error(queryset, ids, message):
+    # Все объекты ответа загружаются одним запросом
+    objects = queryset.in_bulk(set(ids))
+    if len(objects) < len(set(ids)):
+        raise serializers.ValidationError(message)
+    return objects
+
+
 class AnswerToQuestionSerializer(serializers.Serializer):
     answer_id = serializers.IntegerField()
 
     def validate_answer_id(self, answer_id):
         try:
-            answer = QuestionAnswer.objects.get(id=answer_id)
+            answer = QuestionAnswer.objects.select_related(COMPONENT_LESSON_PATH).get(id=answer_id)
         except QuestionAnswer.DoesNotExist:
             raise serializers.ValidationError('Answer does not exist')
         return answer
@@ -19,54 +31,43 @@ class AnswerToFillTextSerializer(serializers.Serializer):
         line_id = serializers.IntegerField()
         answer = serializers.CharField(allow_blank=True)
 
-        def validate_line_id(self, line_id):
-            try:
-                line = FillTextLine.objects.get(id=line_id)
-            except FillTextLine.DoesNotExist:
-                raise serializers.ValidationError('Line does not exist')
-            return line
-
     lines = Temp(many=True)
 
+    def validate_lines(self, lines):
+        queryset = FillTextLine.objects.select_related(COMPONENT_LESSON_PATH)
+        found = get_objects_or_error(queryset, [item['line_id'] for item in lines], 'Line does not exist')
+        for item in lines:
+            item['line_id'] = found[item['line_id']]
+        return lines
+
 
 class AnswerToMatchingComponentSerializer(serializers.Serializer):
     class Temp(serializers.Serializer):
         first_element_id = serializers.IntegerField()
         second_element_id = serializers.IntegerField()
 
-        def validate_first_element_id(self, first_element_id):
-            try:
-                element = MatchingComponentElement.objects.get(id=first_element_id)
-                if not hasattr(element, 'first_element'):
-                    raise serializers.ValidationError('Element is not first element')
-            except MatchingComponentElement.DoesNotExist:
-                raise serializers.ValidationError('Element does not exist')
-            return element
-
-        def validate_second_element_id(self, second_element_id):
-            try:
-                element = MatchingComponentElement.objects.get(id=second_element_id)
-                if not hasattr(element, 'second_element'):
-                    raise serializers.ValidationError('Element is not second element')
-            except MatchingComponentElement.DoesNotExist:
-                raise serializers.ValidationError('Element does not exist')
-            return element
-
     elements = Temp(many=True)
 
+    def validate_elements(self, elements):
+        queryset = MatchingComponentElement.objects.select_related(
+            'first_element', f'second_element__{COMPONENT_LESSON_PATH}')
+        ids = [item[key] for item in elements for key in ('first_element_id', 'second_element_id')]
+        found = get_objects_or_error(queryset, ids, 'Element does not exist')
+        for item in elements:
+            item['first_element_id'] = found[item['first_element_id']]
+            item['second_element_id'] = found[item['second_element_id']]
+            if not hasattr(item['first_element_id'], 'first_element'):
+                raise serializers.ValidationError('Element is not first element')
+            if not hasattr(item['second_element_id'], 'second_element'):
+                raise serializers.ValidationError('Element is not second element')
+        return elements
+
 
 class AnswerToPutInOrderComponentSerializer(serializers.Serializer):
     class Temp(serializers.Serializer):
         element_id = serializers.IntegerField()
         order = serializers.IntegerField()
 
-        def validate_element_id(self, element_id):
-            try:
-                element = PutInOrderComponentElement.objects.get(id=element_id)
-            except PutInOrderComponentElement.DoesNotExist:
-                raise serializers.ValidationError('Element does not exist')
-            return element
-
         def validate_order(self, order):
             if order < 0:
                 raise serializers.ValidationError('Order must be positive')
@@ -74,6 +75,13 @@ class AnswerToPutInOrderComponentSerializer(serializers.Serializer):
 
     elements = Temp(many=True)
 
+    def validate_elements(self, elements):
+        queryset = PutInOrderComponentElement.objects.select_related(COMPONENT_LESSON_PATH)
+        found = get_objects_or_error(queryset, [item['element_id'] for item in elements], 'Element does not exist')
+        for item in elements:
+            item['element_id'] = found[item['element_id']]
+        return elements
+
 
 class LeaveReviewOnLessonSerializer(GetLessonById):
     mark = serializers.IntegerField(min_value=1, max_value=5)
@@ -13,8 +13,7 @@ class FillTextLineSerializer(NestedSupportedModelSerializer):
         fields = '__all__'
 
     def get_user_answer(self, obj):
-        user_answer = UserFillTextAnswer.objects.filter(user=self.context['user'], line=obj).last()
-        return user_answer.answer if user_answer else None
+        return self.context['answers'].fill_text.get(obj.id)
 
 
 class AudioComponentSerializer(NestedSupportedModelSerializer):
@@ -37,7 +36,7 @@ class RecordAudioComponentSerializer(NestedSupportedModelSerializer):
         fields = '__all__'
 
     def get_user_answer(self, obj):
-        user_answer = UserRecordAudioComponent.objects.filter(user=self.context['user'], component=obj).first()
+        user_answer = self.context['answers'].records.get(obj.id)
         return UserRecordAnswerSerializer(user_answer).data if user_answer else None
 
 
@@ -50,8 +49,7 @@ class PutInOrderComponentElementSerializer(NestedSupportedModelSerializer):
         fields = '__all__'
 
     def get_user_answer(self, obj):
-        user_answer = UserPutInOrderAnswer.objects.filter(user=self.context['user'], element=obj).first()
-        return user_answer.order if user_answer else None
+        return self.context['answers'].put_in_order.get(obj.id)
 
 
 class MatchingComponentElementSerializer(NestedSupportedModelSerializer):
@@ -74,11 +72,18 @@ class VideoComponentSerializer(NestedSupportedModelSerializer):
         fields = '__all__'
 
     def get_video_url(self, obj):
+        # Ссылки могут быть заранее получены асинхронно (см. GetLessonView)
+        video_links = self.context.get('video_links', {})
+        if obj.video_url in video_links:
+            return video_links[obj.video_url]
+        if self.context.get('keep_vimeo_urls'):
+            # Статический файл урока: прямые ссылки истекают, клиент получает их из overlay
+            return obj.video_url
         return get_video_link_from_vimeo(obj.video_url)
 
 
 class QuestionAnswerSerializer(NestedSupportedModelSerializer):
-    question = ModelIntegerField(source='question.id', model=QuestionComponent)
+    component = ModelIntegerField(source='component.id', model=QuestionComponent)
     pressed = serializers.SerializerMethodField()
 
     class Meta:
@@ -86,8 +91,7 @@ class QuestionAnswerSerializer(NestedSupportedModelSerializer):
         fields = '__all__'
 
     def get_pressed(self, obj):
-        user_answer = UserQuestionAnswer.objects.filter(user=self.context['user'], answer=obj).first()
-        return user_answer is not None
+        return obj.id in self.context['answers'].questions
 
 
 class BlueCardComponentSerializer(NestedSupportedModelSerializer):
@@ -113,8 +117,7 @@ class MatchingComponentElementCoupleSerializer(NestedSupportedModelSerializer):
         fields = '__all__'
 
     def get_user_first_element_id(self, obj):
-        user_answer = UserMatchingComponentElementCouple.objects.filter(user=self.context['user'], couple=obj).last()
-        return user_answer.first_element.id if user_answer else None
+        return self.context['answers'].matching.get(obj.id)
 
 
 class MatchingComponentSerializer(NestedSupportedModelSerializer):
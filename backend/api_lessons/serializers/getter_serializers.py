@@ -1,5 +1,6 @@
 from rest_framework import serializers
 
+from api_lessons.change_log import parse_cursor
 from api_lessons.models import *
 
 
@@ -12,3 +13,15 @@ class GetLessonById(serializers.Serializer):
         except Lesson.DoesNotExist:
             raise serializers.ValidationError('Lesson does not exist')
         return lesson
+
+
+class GetLessonPack(GetLessonById):
+    version = serializers.CharField(required=False, allow_blank=True, help_text='Версия пакета на устройстве')
+
+
+class SyncContent(serializers.Serializer):
+    cursor = serializers.CharField(required=False, help_text='Курсор прошлой синхронизации')
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=5000)
+
+    def validate_cursor(self, cursor):
+        return parse_cursor(cursor)
@@ -1,9 +1,12 @@
+from django.db.models import prefetch_related_objects
 from rest_framework import serializers
 from rest_framework.fields import SkipField
 
+from api_lessons.catalog import get_lesson_progress
 from api_lessons.models import *
+from api_lessons.prefetch import UserLessonAnswers, lesson_prefetches
 from backend.global_function import UserContextNeededSerializer, NestedSupportedModelSerializer
-from .components_serializers import LessonPageSerializer
+from .components_serializers import LessonPageSerializer, UserRecordAnswerSerializer
 
 
 class LessonMinimalDataSerializer(UserContextNeededSerializer, serializers.ModelSerializer):
@@ -14,20 +17,20 @@ class LessonMinimalDataSerializer(UserContextNeededSerializer, serializers.Model
         model = Lesson
         fields = ['id', 'is_available_on_free', 'completed', 'friends_count', 'title', 'description']
 
+    @property
+    def progress(self):
+        # Прогресс считается один раз на весь список уроков (см. LessonBatchSerializer)
+        if 'lesson_progress' not in self.context:
+            self.context['lesson_progress'] = get_lesson_progress(self.user)
+        return self.context['lesson_progress']
+
     def get_completed(self, obj):
-        user_data = UserLessonModel.objects.filter(user=self.user, lesson=obj).first()
-        if user_data:
-            return user_data.completed
-        return False
+        completed_lessons, friends_count = self.progress
+        return obj.id in completed_lessons
 
     def get_friends_count(self, obj: Lesson):
-        counter = 0
-        for i in self.user.friends.all():
-            last_lesson = i.lessons.last()
-            if last_lesson:
-                if last_lesson.lesson == obj:
-                    counter += 1
-        return counter
+        completed_lessons, friends_count = self.progress
+        return friends_count[obj.id]
 
 
 class LessonBatchSerializer(UserContextNeededSerializer, serializers.ModelSerializer):
@@ -38,7 +41,7 @@ class LessonBatchSerializer(UserContextNeededSerializer, serializers.ModelSerial
         fields = '__all__'
 
     def get_lessons(self, obj):
-        return LessonMinimalDataSerializer(obj.lessons.all(), user=self.user, many=True).data
+        return LessonMinimalDataSerializer(obj.lessons.all(), user=self.user, many=True, context=self.context).data
 
 
 class LessonSerializer(NestedSupportedModelSerializer, UserContextNeededSerializer):
@@ -50,14 +53,55 @@ class LessonSerializer(NestedSupportedModelSerializer, UserContextNeededSerializ
         model = Lesson
         fields = '__all__'
 
+    def to_representation(self, instance):
+        # Вложенные сериализаторы берут данные из кэша prefetch и ответов пользователя, без запросов на строку
+        prefetch_related_objects([instance], *lesson_prefetches())
+        if 'answers' not in self.context:
+            self.context['answers'] = UserLessonAnswers(self.user, instance)
+        return super().to_representation(instance)
+
     def get_review_mark(self, obj: Lesson):
-        user_lesson = UserLessonModel.objects.filter(user=self.user, lesson=obj).first()
+        user_lesson = self.context['answers'].user_lesson
         if user_lesson:
             return user_lesson.review_mark
         return None
 
     def get_review_comment(self, obj: Lesson):
-        user_lesson = UserLessonModel.objects.filter(user=self.user, lesson=obj).first()
+        user_lesson = self.context['answers'].user_lesson
         if user_lesson:
             return user_lesson.review_comment
         return ''
+
+
+class LessonContentSerializer(NestedSupportedModelSerializer):
+    """
+    Урок без данных пользователя для статического файла (см. static_render), ответы накладываются из lesson_overlay
+    """
+    pages = LessonPageSerializer(many=True)
+
+    class Meta:
+        model = Lesson
+        exclude = ['render_url']
+
+    def to_representation(self, instance):
+        prefetch_related_objects([instance], *lesson_prefetches())
+        self.context.setdefault('answers', UserLessonAnswers.empty())
+        self.context.setdefault('keep_vimeo_urls', True)
+        return super().to_representation(instance)
+
+
+def lesson_overlay(lesson: Lesson, answers: UserLessonAnswers, video_links: dict) -> dict:
+    user_lesson = answers.user_lesson
+    return {
+        'lesson_id': lesson.pk,
+        'render_url': lesson.render_url or None,
+        'fill_text': answers.fill_text,
+        'matching': answers.matching,
+        'put_in_order': answers.put_in_order,
+        'questions': sorted(answers.questions),
+        'records': {component_id: UserRecordAnswerSerializer(record).data
+                    for component_id, record in answers.records.items()},
+        'review_mark': user_lesson.review_mark if user_lesson else None,
+        'review_comment': user_lesson.review_comment if user_lesson else '',
+        'video_links': video_links,
+    }
@@ -0,0 +1,50 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from api_lessons.change_log import track_changes, track_free_access
+from api_lessons.models import UserLessonModel
+from api_lessons.packs import deleted_parent, schedule_lesson_packs_on_commit
+from api_lessons.versions import *
+from api_users.models import UserModel
+from backend.versioning import bump_user_versions, track_model_versions, track_user_model_versions
+
+track_model_versions(LessonBatch, *LESSON_CONTENT_MODELS)
+track_user_model_versions(*LESSON_USER_ANSWER_MODELS)
+# Журнал изменений для синхронизации клиентов (sync_content)
+track_changes(LessonBatch, *LESSON_CONTENT_MODELS)
+track_free_access()
+
+
+@receiver([post_save, post_delete], sender=UserLessonModel)
+def user_lesson_changed(sender, instance: UserLessonModel, **kwargs):
+    # friends_count в каталоге друзей зависит от последнего урока пользователя
+    friend_ids = list(UserModel.objects.filter(friends=instance.user_id).values_list('pk', flat=True))
+    bump_user_versions(LESSON_PROGRESS_VERSION, [instance.user_id, *friend_ids])
+
+
+@receiver(m2m_changed, sender=UserModel.friends.through)
+def friends_changed(sender, instance, action, pk_set, **kwargs):
+    if action == 'pre_clear':
+        instance._cleared_friend_ids = list(instance.friends.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        bump_user_versions(LESSON_PROGRESS_VERSION, [instance.pk, *getattr(instance, '_cleared_friend_ids', [])])
+    elif action in ('post_add', 'post_remove'):
+        bump_user_versions(LESSON_PROGRESS_VERSION, [instance.pk, *pk_set])
+
+
+def lesson_content_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_lesson_packs_on_commit(sender, [instance.pk])
+
+
+def lesson_content_deleted(sender, instance, **kwargs):
+    parent = deleted_parent(instance)
+    if parent is not None:
+        parent_model, parent_id = parent
+        schedule_lesson_packs_on_commit(parent_model, [parent_id])
+
+
+# Офлайн-пакет урока пересобирается после изменения его содержимого
+for model in (*LESSON_ID_PATHS, MatchingComponentElement):
+    post_save.connect(lesson_content_saved, sender=model, dispatch_uid=f'lesson_pack_{model._meta.label_lower}')
+    post_delete.connect(lesson_content_deleted, sender=model, dispatch_uid=f'lesson_pack_{model._meta.label_lower}')
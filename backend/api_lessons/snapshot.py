@@ -0,0 +1,192 @@
+"""
+Снимок уроков (страницы, элементы, компоненты и их вложенные данные) для переноса между окружениями.
+Формат колоночный: для каждой модели список полей и строки значений, внешние ключи - старые id,
+файлы - пути в хранилище (список всех путей в media, сами файлы переносятся отдельно).
+Импорт создает каждую модель одним bulk_create в порядке зависимостей внутри одной транзакции и переназначает id.
+"""
+import json
+
+import msgpack
+from django.db import models, transaction
+from django.db.models import Max, Q
+from rest_framework.exceptions import ValidationError
+
+from api_lessons.change_log import log_changes
+from api_lessons.models import *
+from api_lessons.packs import schedule_lesson_packs_on_commit
+from api_lessons.versions import LESSON_CATALOG_MODELS, LESSON_CONTENT_MODELS
+from backend.versioning import bump_versions
+
+SNAPSHOT_FORMAT = 'vector-edu.lesson-snapshot'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_FORMATS = ('json', 'msgpack')
+
+LESSON_PATH = 'page_element__page__lesson__in'
+COMPONENT_LESSON_PATH = 'component__page_element__page__lesson__in'
+
+# Порядок зависимостей и путь от модели до урока
+SNAPSHOT_MODELS = (
+    (Lesson, 'pk__in'),
+    (LessonPage, 'lesson__in'),
+    (AudioComponent, LESSON_PATH),
+    (BlueCardComponent, LESSON_PATH),
+    (ImageComponent, LESSON_PATH),
+    (TextComponent, LESSON_PATH),
+    (VideoComponent, LESSON_PATH),
+    (RecordAudioComponent, LESSON_PATH),
+    (FillTextComponent, LESSON_PATH),
+    (PutInOrderComponent, LESSON_PATH),
+    (QuestionComponent, LESSON_PATH),
+    (MatchingComponent, LESSON_PATH),
+    (MatchingComponentElement, None),
+    (FillTextLine, COMPONENT_LESSON_PATH),
+    (PutInOrderComponentElement, COMPONENT_LESSON_PATH),
+    (QuestionAnswer, COMPONENT_LESSON_PATH),
+    (MatchingComponentElementCouple, COMPONENT_LESSON_PATH),
+    (LessonPageElement, 'page__lesson__in'),
+)
+
+# Поля за пределами снимка: коллекция и автор задаются при импорте, статический файл относится к окружению
+EXTERNAL_FIELDS = {Lesson: ('lesson_batch', 'author', 'render_url')}
+
+
+def snapshot_fields(model):
+    external = EXTERNAL_FIELDS.get(model, ())
+    return [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key and field.name not in external
+        and not getattr(field, 'auto_now', False) and not getattr(field, 'auto_now_add', False)
+    ]
+
+
+def snapshot_queryset(model, lookup, lesson_ids):
+    if model is MatchingComponentElement:
+        # Элементы не ссылаются на компонент, они связаны с ним через пары
+        return model.objects.filter(
+            Q(**{f'first_element__{COMPONENT_LESSON_PATH}': lesson_ids})
+            | Q(**{f'second_element__{COMPONENT_LESSON_PATH}': lesson_ids})
+        )
+    return model.objects.filter(**{lookup: lesson_ids})
+
+
+def export_lessons(lesson_ids) -> dict:
+    lessons = Lesson.objects.filter(pk__in=lesson_ids).select_related('lesson_batch')
+    missing = set(lesson_ids) - {lesson.pk for lesson in lessons}
+    if missing:
+        raise ValidationError(f'Lessons not found: {sorted(missing)}')
+
+    tables = {}
+    media = set()
+    for model, lookup in SNAPSHOT_MODELS:
+        fields = snapshot_fields(model)
+        rows = [list(row) for row in snapshot_queryset(model, lookup, lesson_ids).order_by('pk').values_list(
+            'pk', *[field.attname for field in fields])]
+        tables[model._meta.label] = {'fields': ['id', *[field.attname for field in fields]], 'rows': rows}
+        for index, field in enumerate(fields, start=1):
+            if isinstance(field, models.FileField):
+                media.update(row[index] for row in rows if row[index])
+
+    return {
+        'format': SNAPSHOT_FORMAT,
+        'version': SNAPSHOT_VERSION,
+        'lesson_batches': {lesson.pk: lesson.lesson_batch.title for lesson in lessons},
+        'tables': tables,
+        'media': sorted(media),
+    }
+
+
+def dumps_snapshot(snapshot: dict, snapshot_format='json') -> bytes:
+    if snapshot_format == 'msgpack':
+        return msgpack.packb(snapshot, use_bin_type=True)
+    if snapshot_format == 'json':
+        return json.dumps(snapshot, ensure_ascii=False, separators=(',', ':')).encode()
+    raise ValidationError(f'Unknown snapshot format: {snapshot_format}')
+
+
+def loads_snapshot(data: bytes, snapshot_format=None) -> dict:
+    if snapshot_format is None:
+        snapshot_format = 'json' if data.lstrip()[:1] == b'{' else 'msgpack'
+    try:
+        if snapshot_format == 'msgpack':
+            # Ключи lesson_batches - целые числа, msgpack сохраняет их как есть
+            return msgpack.unpackb(data, raw=False, strict_map_key=False)
+        if snapshot_format == 'json':
+            return json.loads(data)
+    except (ValueError, msgpack.exceptions.UnpackException) as e:
+        raise ValidationError(f'Invalid snapshot: {e}')
+    raise ValidationError(f'Unknown snapshot format: {snapshot_format}')
+
+
+def resolve_lesson_batches(titles, lesson_batch):
+    if lesson_batch is not None:
+        return {title: lesson_batch for title in titles}
+    batches = {}
+    for batch in LessonBatch.objects.filter(title__in=titles, parent_lesson_batch__isnull=True).order_by('pk'):
+        batches.setdefault(batch.title, batch)
+    for title in set(titles) - batches.keys():
+        batches[title] = LessonBatch.objects.create(title=title)
+    return batches
+
+
+def append_to_batches(lessons):
+    """
+    Уроки ставятся в конец коллекции с сохранением порядка из снимка, номера идут подряд:
+    open_lesson ищет предыдущий урок по order - 1
+    """
+    next_orders = {
+        item['lesson_batch_id']: item['max_order'] + 1
+        for item in Lesson.objects.filter(lesson_batch_id__in={lesson.lesson_batch_id for lesson in lessons})
+        .order_by().values('lesson_batch_id').annotate(max_order=Max('order'))
+    }
+    # sorted устойчив: при равном order остается порядок id из снимка
+    for lesson in sorted(lessons, key=lambda lesson: lesson.order):
+        lesson.order = next_orders.get(lesson.lesson_batch_id, 0)
+        next_orders[lesson.lesson_batch_id] = lesson.order + 1
+
+
+@transaction.atomic
+def import_lessons(snapshot: dict, lesson_batch: LessonBatch = None, author=None) -> list:
+    """
+    Уроки добавляются в конец существующих. Без lesson_batch урок попадает в коллекцию с тем же названием.
+    """
+    if snapshot.get('format') != SNAPSHOT_FORMAT or snapshot.get('version') != SNAPSHOT_VERSION:
+        raise ValidationError('Unsupported snapshot format or version')
+
+    lesson_batch_titles = {int(lesson_id): title for lesson_id, title in snapshot['lesson_batches'].items()}
+    batches = resolve_lesson_batches(set(lesson_batch_titles.values()), lesson_batch)
+
+    id_maps = {}
+    for model, _ in SNAPSHOT_MODELS:
+        table = snapshot['tables'].get(model._meta.label, {'fields': ['id'], 'rows': []})
+        expected = ['id', *[field.attname for field in snapshot_fields(model)]]
+        if table['fields'] != expected:
+            raise ValidationError(f'Snapshot fields of {model._meta.label} do not match: {table["fields"]}')
+
+        foreign_keys = [
+            (index, field.related_model._meta.label)
+            for index, field in enumerate(snapshot_fields(model), start=1) if field.is_relation
+        ]
+        old_ids, objects = [], []
+        for row in table['rows']:
+            for index, related_label in foreign_keys:
+                if row[index] is not None:
+                    try:
+                        row[index] = id_maps[related_label][row[index]]
+                    except KeyError:
+                        raise ValidationError(f'{model._meta.label} {row[0]} references missing {related_label}')
+            instance = model(**dict(zip(expected[1:], row[1:])))
+            if model is Lesson:
+                instance.lesson_batch = batches[lesson_batch_titles[row[0]]]
+                instance.author = author
+            old_ids.append(row[0])
+            objects.append(instance)
+        if model is Lesson:
+            append_to_batches(objects)
+
+        model.objects.bulk_create(objects, batch_size=1000)
+        id_maps[model._meta.label] = {old_id: instance.pk for old_id, instance in zip(old_ids, objects)}
+        log_changes(model, id_maps[model._meta.label].values())
+
+    transaction.on_commit(lambda: bump_versions(*LESSON_CATALOG_MODELS, *LESSON_CONTENT_MODELS))
+    schedule_lesson_packs_on_commit(Lesson, id_maps[Lesson._meta.label].values())
+    return list(Lesson.objects.filter(pk__in=id_maps[Lesson._meta.label].values()))
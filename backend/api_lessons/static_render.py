@@ -0,0 +1,101 @@
+"""
+Статические файлы уроков: при сборке пакета урока (build_lesson_pack, после коммита публикации) урок без данных
+пользователя записывается в LESSON_STATIC_ROOT как <LESSON_STATIC_URL><id>/<хеш содержимого>.json вместе со сжатыми
+.json.gz и .json.br (если установлен brotli). Каталог вне STATIC_ROOT, чтобы collectstatic --clear его не очищал.
+nginx отдает их сам (gzip_static/brotli_static), клиент берет адрес из Lesson.render_url, а ответы
+пользователя и ссылки на видео - из get_lesson_overlay.
+
+Файлы отдаются без авторизации, в том числе платные уроки. Защита только в адресе: render_url выдается
+после проверки доступа (open_lesson), а имя файла - 64 бита хеша содержимого, которые нельзя подобрать.
+Список файлов каталога nginx не отдает (autoindex выключен). Утекший адрес работает, пока версия не удалена
+(см. LESSON_STATIC_KEEP_VERSIONS).
+"""
+import gzip
+import hashlib
+import json
+import os
+
+from django.conf import settings
+
+from api_lessons.change_log import log_changes
+from api_lessons.models import Lesson
+from api_lessons.serializers import LessonContentSerializer
+from backend.versioning import bump_versions
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Предыдущие версии остаются, пока клиенты с закешированным render_url могут их запросить
+LESSON_STATIC_KEEP_VERSIONS = getattr(settings, 'LESSON_STATIC_KEEP_VERSIONS', 3)
+
+
+def render_lesson_content(lesson: Lesson) -> bytes:
+    # Свежий экземпляр: у переданного могут остаться данные prefetch до изменения урока
+    data = LessonContentSerializer(Lesson.objects.get(pk=lesson.pk)).data
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode()
+
+
+def compressed_variants(content: bytes) -> dict:
+    # mtime=0: одинаковое содержимое дает одинаковый .gz
+    variants = {'.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(content, quality=11)
+    return variants
+
+
+def write_file(path, data: bytes):
+    # Запись через временный файл: nginx не должен отдать наполовину записанный файл
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def remove_old_versions(directory, keep):
+    versions = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.endswith('.json')),
+        key=lambda entry: entry.stat().st_mtime, reverse=True,
+    )
+    for entry in versions[keep:]:
+        for suffix in ('', '.gz', '.br'):
+            try:
+                os.remove(entry.path + suffix)
+            except FileNotFoundError:
+                pass
+
+
+def render_lesson_static(lesson: Lesson) -> str:
+    """
+    Записывает файлы урока и сохраняет их адрес в Lesson.render_url. Возвращает адрес
+    """
+    return write_lesson_static(lesson)[0]
+
+
+def write_lesson_static(lesson: Lesson) -> tuple:
+    """
+    То же, что render_lesson_static, но возвращает и содержимое файла
+    """
+    content = render_lesson_content(lesson)
+    version = hashlib.sha256(content).hexdigest()[:16]
+    directory = os.path.join(settings.LESSON_STATIC_ROOT, str(lesson.pk))
+    path = os.path.join(directory, f'{version}.json')
+    os.makedirs(directory, exist_ok=True)
+
+    if os.path.exists(path):
+        # Содержимое не изменилось: адрес тот же, файл становится самым новым
+        os.utime(path)
+    else:
+        for suffix, data in compressed_variants(content).items():
+            write_file(path + suffix, data)
+        write_file(path, content)
+    remove_old_versions(directory, LESSON_STATIC_KEEP_VERSIONS)
+
+    render_url = f'{settings.LESSON_STATIC_URL}{lesson.pk}/{version}.json'
+    if lesson.render_url != render_url:
+        Lesson.objects.filter(pk=lesson.pk).update(render_url=render_url)
+        lesson.render_url = render_url
+        bump_versions(Lesson)
+        log_changes(Lesson, [lesson.pk])
+    return render_url, content
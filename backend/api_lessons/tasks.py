@@ -0,0 +1,18 @@
+from django.core.cache import cache
+
+from api_lessons import change_log, packs
+from api_lessons.models import Lesson
+
+
+def build_lesson_pack(lesson_id):
+    # Изменения урока после этой точки ставят новую сборку
+    cache.delete(packs.pack_pending_key(lesson_id))
+    lesson = Lesson.objects.filter(pk=lesson_id).first()
+    if lesson is None:
+        return None
+    return packs.build_lesson_pack(lesson).version
+
+
+def prune_content_changes():
+    # Ставится расписанием django-q (Schedule), например раз в сутки
+    return change_log.prune_changes()
@@ -0,0 +1,620 @@
+import gzip
+import io
+import json
+import os
+import tempfile
+import zipfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import force_authenticate
+
+from api_lessons import change_log
+from api_lessons.models import *
+from api_lessons.packs import build_lesson_pack, pack_pending_key
+from api_lessons.static_render import render_lesson_static
+from api_lessons.views import *
+from api_users.models import UserModel
+from lms.apps.reports.dataset import DatasetGenerator, DatasetScale
+from lms.apps.reports.query_budget import QueryBudgetTestCase, ViewCallMixin
+
+LESSON_TREE_SCALE = DatasetScale(batches=1, lessons_per_batch=2, pages_per_lesson=1, elements_per_page=10,
+                                 lines_per_component=2)
+
+
+def first_lesson(dataset) -> Lesson:
+    return Lesson.objects.filter(pk__in=dataset.lesson_ids, order=0).first()
+
+
+def new_user(lesson: Lesson) -> UserModel:
+    return UserModel.objects.create(username=f'budget_{lesson.pk}', email=f'budget_{lesson.pk}@example.com')
+
+
+def answer_whole_lesson(user: UserModel, lesson: Lesson):
+    in_lesson = {'component__page_element__page__lesson': lesson}
+    UserFillTextAnswer.objects.bulk_create([
+        UserFillTextAnswer(user=user, line=line, answer=line.answer) for line in FillTextLine.objects.filter(**in_lesson)
+    ])
+    UserPutInOrderAnswer.objects.bulk_create([
+        UserPutInOrderAnswer(user=user, element=element, order=element.order)
+        for element in PutInOrderComponentElement.objects.filter(**in_lesson)
+    ])
+    UserQuestionAnswer.objects.bulk_create([
+        UserQuestionAnswer(user=user, answer=answer) for answer in QuestionAnswer.objects.filter(**in_lesson,
+                                                                                                 is_correct=True)
+    ])
+    UserMatchingComponentElementCouple.objects.bulk_create([
+        UserMatchingComponentElementCouple(user=user, couple=couple, first_element_id=couple.first_element_id)
+        for couple in MatchingComponentElementCouple.objects.filter(**in_lesson)
+    ])
+    UserRecordAudioComponent.objects.bulk_create([
+        UserRecordAudioComponent(user=user, component=component, file='record_component_answer/test.m4a')
+        for component in RecordAudioComponent.objects.filter(page_element__page__lesson=lesson)
+    ])
+
+
+def lesson_payload(lesson: Lesson) -> dict:
+    """
+    Урок в формате AddLessonToBatchView: все страницы, компоненты без файлов
+    """
+    in_lesson = {'component__page_element__page__lesson': lesson}
+    lines, elements, answers, couples = {}, {}, {}, {}
+    for line in FillTextLine.objects.filter(**in_lesson):
+        lines.setdefault(line.component_id, []).append({'text_before': line.text_before, 'answer': line.answer,
+                                                        'order': line.order})
+    for element in PutInOrderComponentElement.objects.filter(**in_lesson):
+        elements.setdefault(element.component_id, []).append({'text': element.text, 'order': element.order})
+    for answer in QuestionAnswer.objects.filter(**in_lesson):
+        answers.setdefault(answer.component_id, []).append({'text': answer.text, 'is_correct': answer.is_correct})
+    for couple in MatchingComponentElementCouple.objects.filter(**in_lesson).select_related('first_element',
+                                                                                            'second_element'):
+        couples.setdefault(couple.component_id, []).append({'first_element': {'text': couple.first_element.text},
+                                                            'second_element': {'text': couple.second_element.text}})
+
+    components = {
+        'text_component': lambda component: {'title': component.title, 'text': component.text},
+        'blue_card_component': lambda component: {'text': component.text},
+        'fill_text_component': lambda component: {'lines': lines.get(component.pk, [])},
+        'put_in_order_component': lambda component: {'elements': elements.get(component.pk, [])},
+        'question_component': lambda component: {'text': component.text, 'answers': answers.get(component.pk, [])},
+        'matching_component': lambda component: {'element_couples': couples.get(component.pk, [])},
+    }
+    pages = []
+    for page in lesson.pages.prefetch_related(*[f'elements__{name}' for name in components]):
+        page_elements = []
+        for element in page.elements.all():
+            for name, to_data in components.items():
+                component = getattr(element, name)
+                if component is not None:
+                    page_elements.append({'order': element.order, name: to_data(component)})
+        pages.append({'order': page.order, 'elements': page_elements})
+    return {'lesson_batch': lesson.lesson_batch_id, 'title': lesson.title, 'description': lesson.description,
+            'order': lesson.order, 'pages': pages}
+
+
+class LessonTreeTestCase(ViewCallMixin, TestCase):
+    """
+    Два урока одного раздела со всеми типами компонентов, без пользователей и ответов
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        generator = DatasetGenerator(LESSON_TREE_SCALE)
+        generator.create_lessons()
+        cls.lessons = list(Lesson.objects.filter(pk__in=generator.dataset.lesson_ids).order_by('order'))
+        cls.lesson = cls.lessons[0]
+
+
+class LessonQueryBudgetTest(QueryBudgetTestCase):
+    def test_get_lesson(self):
+        def request_for(dataset):
+            lesson = first_lesson(dataset)
+            user = new_user(lesson)
+            answer_whole_lesson(user, lesson)
+            return GetLessonView, 'post', {'lesson_id': lesson.pk}, user
+
+        self.assertQueryBudget(17, request_for)
+
+    def test_get_lessons_batch(self):
+        def request_for(dataset):
+            return GetLessonsBatchView, 'get', None, UserModel.objects.get(pk=dataset.user_ids[0])
+
+        self.assertQueryBudget(3, request_for)
+
+    def test_check_lesson_for_ending(self):
+        def request_for(dataset):
+            lesson = first_lesson(dataset)
+            user = new_user(lesson)
+            answer_whole_lesson(user, lesson)
+            return CheckLessonForEnding, 'post', {'lesson_id': lesson.pk}, user
+
+        self.assertQueryBudget(17, request_for)
+
+    def test_get_friends_on_lesson(self):
+        def request_for(dataset):
+            lesson = first_lesson(dataset)
+            user = new_user(lesson)
+            friends = list(UserModel.objects.filter(pk__in=dataset.user_ids))
+            user.friends.add(*friends)
+            other = Lesson.objects.exclude(pk=lesson.pk).first()
+            # Половина друзей сейчас на уроке, у остальных последний урок другой
+            UserLessonModel.objects.filter(user__in=friends).delete()
+            UserLessonModel.objects.bulk_create(
+                [UserLessonModel(user=friend, lesson=lesson) for friend in friends]
+                + [UserLessonModel(user=friend, lesson=other) for friend in friends[::2]]
+            )
+            return GetFriendsOnLessonView, 'post', {'lesson_id': lesson.pk}, user
+
+        self.assertQueryBudget(3, request_for)
+        lesson = first_lesson(self.small)
+        user = UserModel.objects.get(username=f'budget_{lesson.pk}')
+        data = self.call_view(GetFriendsOnLessonView, 'post', {'lesson_id': lesson.pk}, user).data['message']
+        self.assertEqual(sorted(item['id'] for item in data), sorted(self.small.user_ids)[1::2])
+
+    def test_overlay_budget(self):
+        def request_for(dataset):
+            lesson = first_lesson(dataset)
+            user = new_user(lesson)
+            answer_whole_lesson(user, lesson)
+            return GetLessonOverlayView, 'post', {'lesson_id': lesson.pk}, user
+
+        self.assertQueryBudget(11, request_for)
+
+
+class AddLessonQueryBudgetTest(QueryBudgetTestCase):
+    def test_add_lesson(self):
+        def request_for(dataset):
+            lesson = first_lesson(dataset)
+            return AddLessonToBatchView, 'post', lesson_payload(lesson), new_user(lesson)
+
+        self.assertQueryBudget(30, request_for)
+
+    def test_add_lesson_copies_tree(self):
+        lesson = first_lesson(self.small)
+        response = self.call_view(AddLessonToBatchView, 'post', lesson_payload(lesson), new_user(lesson))
+
+        self.assertEqual(response.status_code, 200, response.data)
+        created = Lesson.objects.get(pk=response.data['message']['id'])
+        self.assertEqual(lesson_payload(created), lesson_payload(lesson))
+        self.assertTrue(Lesson.objects.filter(pk=lesson.pk).exists())
+
+
+class LessonSnapshotTest(LessonTreeTestCase):
+    def setUp(self):
+        self.admin = UserModel.objects.create(username='snapshot_admin', email='snapshot@example.com', is_staff=True)
+        self.batch = self.lessons[0].lesson_batch
+
+    def export(self, snapshot_format):
+        lesson_ids = ','.join(str(lesson.pk) for lesson in self.lessons)
+        response = self.call_view(ExportLessonsSnapshotView, 'get',
+                                  {'lesson_ids': lesson_ids, 'snapshot_format': snapshot_format}, self.admin)
+        self.assertEqual(response.status_code, 200)
+        return response.content
+
+    def import_file(self, content, snapshot_format, path='/'):
+        request = self.factory.post(path, {'file': SimpleUploadedFile(f'lessons.{snapshot_format}', content)},
+                                    format='multipart')
+        force_authenticate(request, user=self.admin)
+        response = ImportLessonsSnapshotView.as_view()(request)
+        self.assertEqual(response.status_code, 200, response.data)
+        return Lesson.objects.filter(pk__in=[lesson['id'] for lesson in response.data['message']]).order_by('pk')
+
+    def assertSameTree(self, imported, original):
+        for new, old in zip(imported, original, strict=True):
+            self.assertEqual({**lesson_payload(new), 'order': None, 'lesson_batch': None},
+                             {**lesson_payload(old), 'order': None, 'lesson_batch': None})
+
+    def test_round_trip_appends_lessons_to_batch(self):
+        orders = [lesson.order for lesson in self.lessons]
+        for snapshot_format in ('json', 'msgpack'):
+            with self.subTest(snapshot_format=snapshot_format):
+                last_order = Lesson.objects.filter(lesson_batch=self.batch).order_by('-order').first().order
+                imported = self.import_file(self.export(snapshot_format), snapshot_format)
+
+                self.assertSameTree(imported, self.lessons)
+                self.assertEqual({lesson.lesson_batch_id for lesson in imported}, {self.batch.pk})
+                self.assertEqual([lesson.order for lesson in imported],
+                                 [last_order + 1 + order - orders[0] for order in orders])
+                batch_orders = list(Lesson.objects.filter(lesson_batch=self.batch).values_list('order', flat=True))
+                self.assertEqual(len(batch_orders), len(set(batch_orders)))
+
+    def test_import_into_empty_batch(self):
+        batch = LessonBatch.objects.create(title='Imported')
+        imported = self.import_file(self.export('msgpack'), 'msgpack', f'/?lesson_batch_id={batch.pk}')
+        self.assertSameTree(imported, self.lessons)
+        self.assertEqual([(lesson.lesson_batch_id, lesson.order) for lesson in imported],
+                         [(batch.pk, order) for order in range(len(self.lessons))])
+
+
+class StaticLessonRenderTest(LessonTreeTestCase):
+    def setUp(self):
+        static_root = tempfile.TemporaryDirectory()
+        self.addCleanup(static_root.cleanup)
+        settings_override = override_settings(LESSON_STATIC_ROOT=static_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    @staticmethod
+    def static_path(render_url):
+        return os.path.join(settings.LESSON_STATIC_ROOT, render_url.removeprefix(settings.LESSON_STATIC_URL))
+
+    def test_render_is_versioned_and_precompressed(self):
+        lesson = self.lesson
+        render_url = render_lesson_static(lesson)
+
+        path = self.static_path(render_url)
+        with open(path, 'rb') as f:
+            content = f.read()
+        with open(f'{path}.gz', 'rb') as f:
+            self.assertEqual(gzip.decompress(f.read()), content)
+        data = json.loads(content)
+        self.assertEqual(data['id'], lesson.pk)
+        self.assertNotIn('review_mark', data)
+        self.assertEqual(Lesson.objects.get(pk=lesson.pk).render_url, render_url)
+
+        # Тот же урок - тот же файл, измененный - новый
+        self.assertEqual(render_lesson_static(lesson), render_url)
+        TextComponent.objects.filter(page_element__page__lesson=lesson).update(text='changed')
+        self.assertNotEqual(render_lesson_static(lesson), render_url)
+
+    def test_overlay(self):
+        lesson = self.lesson
+        render_url = render_lesson_static(lesson)
+        user = new_user(lesson)
+        answer_whole_lesson(user, lesson)
+
+        response = self.call_view(GetLessonOverlayView, 'post', {'lesson_id': lesson.pk}, user)
+
+        self.assertEqual(response.status_code, 200, response.data)
+        overlay = response.data['message']
+        self.assertEqual(overlay['render_url'], render_url)
+        self.assertEqual(len(overlay['fill_text']), FillTextLine.objects.filter(
+            component__page_element__page__lesson=lesson).count())
+        self.assertTrue(overlay['questions'])
+
+
+class LessonPackTest(LessonTreeTestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        settings_override = override_settings(LESSON_STATIC_ROOT=os.path.join(root.name, 'lessons'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # Защищенное хранилище берет путь из настроек при импорте
+        storage = FileSystemStorage(location=os.path.join(root.name, 'protected'), base_url='/protected/')
+        for model, field_name in ((AudioComponent, 'audio'), (LessonPack, 'archive')):
+            patcher = mock.patch.object(model._meta.get_field(field_name), 'storage', storage)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        page = self.lesson.pages.first()
+        audio = AudioComponent(title='audio')
+        audio.audio.save('sound.mp3', ContentFile(b'ID3 sound'), save=True)
+        LessonPageElement.objects.create(page=page, order=100, audio_component=audio)
+        self.audio_path = f'media/{audio.audio.name}'
+
+    def test_pack_contains_lesson_and_media(self):
+        pack = build_lesson_pack(self.lesson)
+
+        with pack.archive.open('rb') as f:
+            archive = zipfile.ZipFile(io.BytesIO(f.read()))
+        manifest = json.loads(archive.read('manifest.json'))
+        self.assertEqual(manifest['version'], pack.version)
+        self.assertEqual(archive.read(self.audio_path), b'ID3 sound')
+        self.assertEqual(json.loads(archive.read('lesson.json'))['id'], self.lesson.pk)
+        self.assertEqual(manifest['files'][self.audio_path]['size'], len(b'ID3 sound'))
+        self.assertEqual(build_lesson_pack(self.lesson), pack)
+
+    def test_delta_lists_only_changed_files(self):
+        old_pack = build_lesson_pack(self.lesson)
+        TextComponent.objects.filter(page_element__page__lesson=self.lesson).update(text='changed')
+        new_pack = build_lesson_pack(self.lesson)
+        self.assertNotEqual(new_pack.version, old_pack.version)
+
+        user = new_user(self.lesson)
+        response = self.call_view(GetLessonPackView, 'post', {'lesson_id': self.lesson.pk,
+                                                              'version': old_pack.version}, user)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['message']['changed'], ['lesson.json'])
+        self.assertEqual(response.data['message']['removed'], [])
+
+        response = self.call_view(GetLessonPackView, 'post', {'lesson_id': self.lesson.pk, 'version': 'unknown'}, user)
+        self.assertIn(self.audio_path, response.data['message']['changed'])
+
+    def test_previous_lesson_must_be_completed(self):
+        next_lesson = Lesson.objects.get(lesson_batch=self.lesson.lesson_batch, order=self.lesson.order + 1)
+        build_lesson_pack(next_lesson)
+        user = new_user(self.lesson)
+
+        response = self.call_view(GetLessonPackView, 'post', {'lesson_id': next_lesson.pk}, user)
+        self.assertEqual((response.status_code, response.data['message']), (400, 'unlock_prev_lesson'))
+
+        UserLessonModel.objects.create(user=user, lesson=self.lesson, completed=True)
+        response = self.call_view(GetLessonPackView, 'post', {'lesson_id': next_lesson.pk}, user)
+        self.assertEqual(response.status_code, 200, response.data)
+        # Загрузка пакета не отмечает урок начатым
+        self.assertFalse(UserLessonModel.objects.filter(user=user, lesson=next_lesson).exists())
+
+    def test_content_change_schedules_build(self):
+        cache.delete(pack_pending_key(self.lesson.pk))
+        line = FillTextLine.objects.filter(component__page_element__page__lesson=self.lesson).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            line.answer = 'changed'
+            line.save()
+        self.assertTrue(cache.get(pack_pending_key(self.lesson.pk)))
+
+
+class ContentSyncTest(LessonTreeTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(change_log, 'CHANGE_LOG_SETTLE_SECONDS', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = new_user(self.lesson)
+        self.user.user_type = 'paid'
+        self.user.save()
+
+    def sync(self, **params):
+        response = self.call_view(SyncContentView, 'get', params, self.user)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data['message']
+
+    def cursor(self, change_id):
+        return f'{change_id}:{self.user.user_type}'
+
+    def test_full_sync_without_cursor(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lesson.save()
+        data = self.sync()
+        self.assertTrue(data['reset'])
+        self.assertEqual(data['cursor'], self.cursor(ContentChange.objects.latest('pk').pk))
+        lessons = data['upserts']['api_lessons.lesson']
+        self.assertEqual(lessons['fields'][0], 'id')
+        self.assertEqual(len(lessons['rows']), Lesson.objects.count())
+        self.assertIn('api_additional_materials.additionallesson', data['upserts'])
+
+    def test_changes_since_cursor(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lesson.save()
+        cursor = self.sync()['cursor']
+
+        page = self.lesson.pages.first()
+        page_id = page.pk
+        element_ids = sorted(page.elements.values_list('pk', flat=True))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lesson.title = 'synced'
+            self.lesson.save()
+            self.lesson.save()
+            page.delete()
+
+        data = self.sync(cursor=cursor)
+        self.assertFalse(data['reset'])
+        lessons = data['upserts']['api_lessons.lesson']
+        self.assertEqual(len(lessons['rows']), 1)
+        self.assertEqual(lessons['rows'][0][lessons['fields'].index('title')], 'synced')
+        self.assertEqual(data['deleted']['api_lessons.lessonpage'], [page_id])
+        self.assertEqual(data['deleted']['api_lessons.lessonpageelement'], element_ids)
+
+        data = self.sync(cursor=data['cursor'])
+        self.assertEqual((data['upserts'], data['deleted']), ({}, {}))
+
+    def test_pages_with_has_more(self):
+        cursor = ContentChange.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        elements = list(LessonPageElement.objects.filter(page__lesson=self.lesson)[:3])
+        with self.captureOnCommitCallbacks(execute=True):
+            for element in elements:
+                element.save()
+
+        data = self.sync(cursor=self.cursor(cursor), limit=2)
+        self.assertTrue(data['has_more'])
+        self.assertEqual(len(data['upserts']['api_lessons.lessonpageelement']['rows']), 2)
+        data = self.sync(cursor=data['cursor'], limit=2)
+        self.assertFalse(data['has_more'])
+        self.assertEqual(len(data['upserts']['api_lessons.lessonpageelement']['rows']), 1)
+
+    def test_paid_lesson_content_hidden_from_free_user(self):
+        self.lesson.is_available_on_free = False
+        self.user.user_type = 'free'
+        self.user.save()
+        page = self.lesson.pages.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lesson.save()
+            page.save()
+
+        data = self.sync(cursor=self.cursor(0))
+        self.assertIn('api_lessons.lesson', data['upserts'])
+        self.assertNotIn('api_lessons.lessonpage', data['upserts'])
+        self.assertEqual(data['deleted']['api_lessons.lessonpage'], [page.pk])
+
+    def test_internal_lesson_fields_not_synced(self):
+        self.lesson.is_available_on_free = False
+        self.lesson.render_url = '/static/lessons/paid.html'
+        self.user.user_type = 'free'
+        self.user.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lesson.save()
+
+        for data in (self.sync(), self.sync(cursor=self.cursor(0))):
+            lessons = data['upserts']['api_lessons.lesson']
+            self.assertIn(self.lesson.pk, {row[0] for row in lessons['rows']})
+            self.assertNotIn('render_url', lessons['fields'])
+            self.assertNotIn('author_id', lessons['fields'])
+            self.assertNotIn(self.lesson.render_url, [value for row in lessons['rows'] for value in row])
+
+    def test_pruned_cursor_resets(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lesson.save()
+            self.lesson.save()
+        first, last = ContentChange.objects.order_by('pk').values_list('pk', flat=True)
+        ContentChange.objects.filter(pk=first).update(created_at=timezone.now() - timezone.timedelta(days=60))
+        self.assertEqual(change_log.prune_changes(), 1)
+        self.assertTrue(self.sync(cursor=self.cursor(first - 1))['reset'])
+        self.assertFalse(self.sync(cursor=self.cursor(first))['reset'])
+
+    def test_user_type_change_resets(self):
+        cursor = self.sync()['cursor']
+        self.assertFalse(self.sync(cursor=cursor)['reset'])
+        self.user.user_type = 'free'
+        self.user.save()
+
+        data = self.sync(cursor=cursor)
+        self.assertTrue(data['reset'])
+        self.assertEqual(data['cursor'].split(':')[1], 'free')
+        self.assertFalse(self.sync(cursor=data['cursor'])['reset'])
+        # Курсор без типа пользователя
+        self.assertTrue(self.sync(cursor=data['cursor'].split(':')[0])['reset'])
+        self.assertEqual(self.call_view(SyncContentView, 'get', {'cursor': 'x:free'}, self.user).status_code, 400)
+
+    def test_free_access_change_logs_lesson_tree(self):
+        self.user.user_type = 'free'
+        self.user.save()
+        self.assertTrue(self.lesson.is_available_on_free)
+        page_ids = set(LessonPage.objects.filter(lesson=self.lesson).values_list('pk', flat=True))
+        line_ids = set(FillTextLine.objects.filter(
+            component__page_element__page__lesson=self.lesson).values_list('pk', flat=True))
+        cursor = self.sync()['cursor']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lesson.is_available_on_free = False
+            self.lesson.save()
+        data = self.sync(cursor=cursor)
+        self.assertFalse(data['reset'])
+        self.assertIn('api_lessons.lesson', data['upserts'])
+        self.assertEqual(set(data['deleted']['api_lessons.lessonpage']), page_ids)
+        self.assertEqual(set(data['deleted']['api_lessons.filltextline']), line_ids)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lesson.is_available_on_free = True
+            self.lesson.save()
+        data = self.sync(cursor=data['cursor'])
+        self.assertEqual({row[0] for row in data['upserts']['api_lessons.lessonpage']['rows']}, page_ids)
+        self.assertEqual(data['deleted'], {})
+
+        # Сохранение без изменения доступа дерево не пишет
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lesson.save()
+        self.assertNotIn('api_lessons.lessonpage', self.sync(cursor=data['cursor'])['upserts'])
+
+    def test_bulk_created_tree_is_logged(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.call_view(AddLessonToBatchView, 'post', lesson_payload(self.lesson), self.user)
+        lines = FillTextLine.objects.filter(
+            component__page_element__page__lesson=response.data['message']['id']).values_list('pk', flat=True)
+        self.assertTrue(lines)
+        logged = ContentChange.objects.filter(model='api_lessons.filltextline').values_list('object_id', flat=True)
+        self.assertLessEqual(set(lines), set(logged))
+
+
+class AnswerQueryBudgetTest(QueryBudgetTestCase):
+    def test_answer_fill_text(self):
+        def request_for(dataset):
+            lesson = first_lesson(dataset)
+            lines = FillTextLine.objects.filter(component__page_element__page__lesson=lesson)
+            data = {'lines': [{'line_id': line.pk, 'answer': 'answer'} for line in lines]}
+            return AnswerFillTextComponentView, 'post', data, new_user(lesson)
+
+        self.assertQueryBudget(6, request_for)
+
+    def test_answer_matching(self):
+        def request_for(dataset):
+            lesson = first_lesson(dataset)
+            couples = MatchingComponentElementCouple.objects.filter(component__page_element__page__lesson=lesson)
+            data = {'elements': [{'first_element_id': couple.first_element_id,
+                                  'second_element_id': couple.second_element_id} for couple in couples]}
+            return AnswerMatchingComponentView, 'post', data, new_user(lesson)
+
+        self.assertQueryBudget(6, request_for)
+
+    def test_answer_put_in_order(self):
+        def request_for(dataset):
+            lesson = first_lesson(dataset)
+            elements = PutInOrderComponentElement.objects.filter(component__page_element__page__lesson=lesson)
+            data = {'elements': [{'element_id': element.pk, 'order': element.order} for element in elements]}
+            return AnswerPutInOrderComponentView, 'post', data, new_user(lesson)
+
+        self.assertQueryBudget(6, request_for)
+
+    def test_answer_question(self):
+        def request_for(dataset):
+            lesson = first_lesson(dataset)
+            answer = QuestionAnswer.objects.filter(component__page_element__page__lesson=lesson).first()
+            return AnswerQuestionComponentView, 'post', {'answer_id': answer.pk}, new_user(lesson)
+
+        self.assertQueryBudget(4, request_for)
+
+
+class RecordAudioAnswerTest(ViewCallMixin, TestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.storage = FileSystemStorage(location=root.name, base_url='/protected/')
+        patcher = mock.patch.object(UserRecordAudioComponent._meta.get_field('file'), 'storage', self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        lesson = Lesson.objects.create(lesson_batch=LessonBatch.objects.create(title='batch'), title='lesson',
+                                       order=0, is_available_on_free=True)
+        page = LessonPage.objects.create(lesson=lesson, order=0)
+        self.component = RecordAudioComponent.objects.create(title='record')
+        LessonPageElement.objects.create(page=page, order=0, record_audio_component=self.component)
+        self.user = UserModel.objects.create(username='record', email='record@example.com')
+
+    def upload(self, content):
+        request = self.factory.post('/', {'component_id': self.component.pk,
+                                          'file': SimpleUploadedFile('answer.m4a', content)}, format='multipart')
+        force_authenticate(request, user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = AnswerRecordAudioComponentView.as_view()(request)
+        self.assertEqual(response.status_code, 200, response.data)
+        return UserRecordAudioComponent.objects.get(user=self.user, component=self.component)
+
+    def test_new_recording_replaces_previous(self):
+        first = self.upload(b'first')
+        first.teacher_comment = 'good'
+        first.save()
+
+        second = self.upload(b'second')
+        self.assertEqual(second.pk, first.pk)
+        self.assertIsNone(second.teacher_comment)
+        self.assertFalse(self.storage.exists(first.file.name))
+        with second.file.open('rb') as f:
+            self.assertEqual(f.read(), b'second')
+
+    def test_concurrent_create_replaces_file(self):
+        first = self.upload(b'first')
+        # Параллельная загрузка вставила ответ после проверки: первая выборка ничего не находит
+        queryset = UserRecordAudioComponent.objects.none()
+        with mock.patch.object(UserRecordAudioComponent.objects, 'select_for_update', side_effect=[
+                queryset, UserRecordAudioComponent.objects.select_for_update()]):
+            second = self.upload(b'second')
+        self.assertEqual(second.pk, first.pk)
+        self.assertFalse(self.storage.exists(first.file.name))
+        self.assertEqual(sorted(self.storage.listdir('record_component_answer')[1]),
+                         [os.path.basename(second.file.name)])
+
+
+class AnswerIndexPlanTest(QueryBudgetTestCase):
+    def test_user_answer_lookups_use_unique_indexes(self):
+        lesson = first_lesson(self.small)
+        user = new_user(lesson)
+        answer_whole_lesson(user, lesson)
+        in_lesson = {'component__page_element__page__lesson': lesson}
+
+        self.assertUsesIndex(UserFillTextAnswer.objects.filter(user=user, line=FillTextLine.objects.filter(
+            **in_lesson).first()), 'unique_user_fill_text_answer')
+        self.assertUsesIndex(UserMatchingComponentElementCouple.objects.filter(
+            user=user, couple=MatchingComponentElementCouple.objects.filter(**in_lesson).first()),
+            'unique_user_matching_couple')
+        self.assertUsesIndex(UserPutInOrderAnswer.objects.filter(user=user, element=PutInOrderComponentElement.objects.filter(
+            **in_lesson).first()), 'unique_user_put_in_order_answer')
+        self.assertUsesIndex(UserQuestionAnswer.objects.filter(user=user, answer=QuestionAnswer.objects.filter(
+            **in_lesson).first()), 'unique_user_question_answer')
+        self.assertUsesIndex(UserRecordAudioComponent.objects.filter(user=user, component=RecordAudioComponent.objects.filter(
+            page_element__page__lesson=lesson).first()), 'unique_user_record_audio')
+        self.assertUsesIndex(UserLessonModel.objects.filter(user=user, lesson=lesson, completed=True),
+                             'unique_user_lesson')
@@ -3,13 +3,19 @@ from .views import *
 
 urlpatterns = [
     path('get_lesson_batch/', GetLessonsBatchView.as_view()),
+    path('get_lesson_catalog/', GetLessonCatalogView.as_view()),
     path('get_lesson/', GetLessonView.as_view()),
+    path('get_lesson_overlay/', GetLessonOverlayView.as_view()),
+    path('get_lesson_pack/', GetLessonPackView.as_view()),
+    path('sync_content/', SyncContentView.as_view()),
     path('check_lesson_for_ending/', CheckLessonForEnding.as_view()),
     path('get_friends_on_lesson/', GetFriendsOnLessonView.as_view()),
     path('review_lesson/', LeaveReviewOnLessonView.as_view()),
 
     #
     path('add_lesson/', AddLessonToBatchView.as_view()),
+    path('export_lessons/', ExportLessonsSnapshotView.as_view()),
+    path('import_lessons/', ImportLessonsSnapshotView.as_view()),
 
     # answer to components
     path('answer_to_fill_text/', AnswerFillTextComponentView.as_view()),
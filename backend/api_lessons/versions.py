@@ -0,0 +1,47 @@
+from api_lessons.models import *
+
+# Прогресс пользователя и его друзей (completed, friends_count в каталоге)
+LESSON_PROGRESS_VERSION = 'api_lessons.progress'
+
+LESSON_CATALOG_MODELS = (LessonBatch, Lesson)
+
+LESSON_CONTENT_MODELS = (
+    Lesson, LessonPage, LessonPageElement,
+    AudioComponent, BlueCardComponent, ImageComponent, TextComponent, VideoComponent, RecordAudioComponent,
+    FillTextComponent, FillTextLine,
+    MatchingComponent, MatchingComponentElementCouple, MatchingComponentElement,
+    PutInOrderComponent, PutInOrderComponentElement,
+    QuestionComponent, QuestionAnswer,
+)
+
+LESSON_USER_ANSWER_MODELS = (
+    UserLessonModel, UserFillTextAnswer, UserMatchingComponentElementCouple, UserPutInOrderAnswer,
+    UserQuestionAnswer, UserRecordAudioComponent,
+)
+
+COMPONENT_LESSON_PATH = 'page_element__page__lesson_id'
+
+# Путь от модели содержимого урока до id урока
+LESSON_ID_PATHS = {
+    Lesson: 'pk',
+    LessonPage: 'lesson_id',
+    LessonPageElement: 'page__lesson_id',
+    AudioComponent: COMPONENT_LESSON_PATH,
+    BlueCardComponent: COMPONENT_LESSON_PATH,
+    ImageComponent: COMPONENT_LESSON_PATH,
+    TextComponent: COMPONENT_LESSON_PATH,
+    VideoComponent: COMPONENT_LESSON_PATH,
+    RecordAudioComponent: COMPONENT_LESSON_PATH,
+    FillTextComponent: COMPONENT_LESSON_PATH,
+    PutInOrderComponent: COMPONENT_LESSON_PATH,
+    QuestionComponent: COMPONENT_LESSON_PATH,
+    MatchingComponent: COMPONENT_LESSON_PATH,
+    FillTextLine: f'component__{COMPONENT_LESSON_PATH}',
+    PutInOrderComponentElement: f'component__{COMPONENT_LESSON_PATH}',
+    QuestionAnswer: f'component__{COMPONENT_LESSON_PATH}',
+    MatchingComponentElementCouple: f'component__{COMPONENT_LESSON_PATH}',
+}
+MATCHING_ELEMENT_LESSON_PATHS = (
+    f'first_element__component__{COMPONENT_LESSON_PATH}',
+    f'second_element__component__{COMPONENT_LESSON_PATH}',
+)
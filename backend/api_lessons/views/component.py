@@ -1,3 +1,4 @@
+from django.db import IntegrityError, transaction
 from rest_framework.request import Request
 from rest_framework.views import APIView
 from api_lessons.models import *
@@ -5,6 +6,7 @@ from api_lessons.serializers import *
 from api_lessons.serializers import *
 from api_lessons.serializers.components_serializers import UserRecordAnswerSerializer
 from backend.global_function import *
+from backend.versioning import bump_user_versions
 
 
 class BaseAnswerComponentView(APIView):
@@ -21,17 +23,19 @@ class AnswerFillTextComponentView(BaseAnswerComponentView):
         serializer = AnswerToFillTextSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = request.user
+        # one answer per line, the last one wins like before
+        answers = {}
         for item in serializer.validated_data['lines']:
             line: FillTextLine = item['line_id']
             answer: str = item['answer']
             lesson = line.component.get_lesson()
             self.check_lesson(lesson=lesson, user=user)
+            answers[line.id] = UserFillTextAnswer(user=user, line=line, answer=answer)
 
-            # delete previous answer if exists
-            UserFillTextAnswer.objects.filter(user=user, line=line).delete()
-
-            # create new answer
-            UserFillTextAnswer.objects.create(user=user, line=line, answer=answer)
+        # replace previous answers in one upsert by the (user, line) unique constraint
+        UserFillTextAnswer.objects.bulk_create(answers.values(), update_conflicts=True, unique_fields=['user', 'line'],
+                                               update_fields=['answer', 'created_at'])
+        bump_user_versions(UserFillTextAnswer, [user.id])
 
         return success_with_text('Answers added')
 
@@ -41,22 +45,25 @@ class AnswerMatchingComponentView(BaseAnswerComponentView):
         serializer = AnswerToMatchingComponentSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = request.user
+        answers = {}
         for item in serializer.validated_data['elements']:
             first_element = item['first_element_id']
             second_element = item['second_element_id']
             couple = second_element.second_element
             lesson = couple.component.get_lesson()
             # check if first_element belongs to same Component as second element
-            if first_element.first_element.component != couple.component:
+            if first_element.first_element.component_id != couple.component_id:
                 return error_with_text('Not in same component, please use our app, instead of trying to call API omg')
 
             self.check_lesson(lesson=lesson, user=user)
+            answers[couple.id] = UserMatchingComponentElementCouple(user=user, couple=couple,
+                                                                    first_element=first_element)
 
-            # delete previous answer if exists
-            UserMatchingComponentElementCouple.objects.filter(user=user, couple=couple).delete()
-
-            # create new answer
-            UserMatchingComponentElementCouple.objects.create(user=user, couple=couple, first_element=first_element)
+        # replace previous answers in one upsert by the (user, couple) unique constraint
+        UserMatchingComponentElementCouple.objects.bulk_create(answers.values(), update_conflicts=True,
+                                                               unique_fields=['user', 'couple'],
+                                                               update_fields=['first_element', 'created_at'])
+        bump_user_versions(UserMatchingComponentElementCouple, [user.id])
 
         return success_with_text('Answer added')
 
@@ -68,15 +75,17 @@ class AnswerPutInOrderComponentView(BaseAnswerComponentView):
         user = request.user
         elements = serializer.validated_data['elements']
 
+        answers = {}
         for element in elements:
             lesson = element['element_id'].component.get_lesson()
             self.check_lesson(lesson=lesson, user=user)
+            answers[element['element_id'].id] = UserPutInOrderAnswer(
+                user=user, element=element['element_id'], order=element['order'])
 
-            # delete previous answer if exists
-            UserPutInOrderAnswer.objects.filter(user=user, element=element['element_id']).delete()
-
-            # create new answer
-            UserPutInOrderAnswer.objects.create(user=user, element=element['element_id'], order=element['order'])
+        # replace previous answers in one upsert by the (user, element) unique constraint
+        UserPutInOrderAnswer.objects.bulk_create(answers.values(), update_conflicts=True,
+                                                 unique_fields=['user', 'element'], update_fields=['order', 'created_at'])
+        bump_user_versions(UserPutInOrderAnswer, [user.id])
 
         return success_with_text('Answer added')
 
@@ -91,10 +100,9 @@ class AnswerQuestionComponentView(BaseAnswerComponentView):
 
         self.check_lesson(lesson=lesson, user=user)
 
-        # delete previous answer if exists
-        UserQuestionAnswer.objects.filter(user=user, answer=answer).delete()
-        # create new answer
-        UserQuestionAnswer.objects.create(user=user, answer=answer)
+        # create answer unless it already exists
+        UserQuestionAnswer.objects.bulk_create([UserQuestionAnswer(user=user, answer=answer)], ignore_conflicts=True)
+        bump_user_versions(UserQuestionAnswer, [user.id])
 
         return success_with_text('Answer added')
 
@@ -114,7 +122,8 @@ class AnswerRecordAudioComponentView(APIView):
         if file is None:
             return error_with_text('No file provided')
 
-        component: RecordAudioComponent = RecordAudioComponent.objects.filter(id=component).first()
+        component: RecordAudioComponent = RecordAudioComponent.objects.select_related(
+            'page_element__page__lesson').filter(id=component).first()
         if component is None:
             return error_with_text('Component does not exist')
         lesson = component.get_lesson()
@@ -124,10 +133,26 @@ class AnswerRecordAudioComponentView(APIView):
         if not lesson.is_available_for_user(user):
             return error_with_text('Lesson is not available for user')
 
-        previous_ans = UserRecordAudioComponent.objects.filter(user=user, component=component).first()
-        if previous_ans:
-            previous_ans.file.delete()
-            previous_ans.delete()
-
-        curr_ans = UserRecordAudioComponent.objects.create(user=user, component=component, file=file)
+        with transaction.atomic():
+            # the lock makes concurrent uploads replace the previous answer one after another
+            curr_ans = UserRecordAudioComponent.objects.select_for_update().filter(
+                user=user, component=component).first()
+            if curr_ans is None:
+                new_ans = UserRecordAudioComponent(user=user, component=component, file=file)
+                try:
+                    with transaction.atomic():
+                        new_ans.save()
+                    return success_with_text(UserRecordAnswerSerializer(new_ans).data)
+                except IntegrityError:
+                    # another upload created the answer first, replace its file with the one already stored
+                    curr_ans = UserRecordAudioComponent.objects.select_for_update().get(user=user, component=component)
+                    file = new_ans.file.name
+
+            previous_file = curr_ans.file.name
+            curr_ans.file = file
+            curr_ans.teacher_comment = None
+            curr_ans.save(update_fields=['file', 'teacher_comment'])
+            # the old file is removed only when the new one is committed
+            storage = curr_ans.file.storage
+            transaction.on_commit(lambda: storage.delete(previous_file))
         return success_with_text(UserRecordAnswerSerializer(curr_ans).data)
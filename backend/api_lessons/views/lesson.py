@@ -1,36 +1,162 @@
 from pprint import pprint
 
+from django.db.models import OuterRef, Subquery
+from django.http import HttpResponse
+from rest_framework.permissions import IsAdminUser
 from rest_framework.request import Request
 from rest_framework.views import APIView
 from api_lessons.models import *
 from api_lessons.serializers import *
 from api_lessons.serializers import *
-from api_users.serializers import UserModelSerializer, UserModelAsFriendSerializer
+from api_users.serializers import UserModelSerializer, UserModelAsFriendSerializer, with_friend_data
+from asgiref.sync import sync_to_async
+
+from api_lessons.catalog import build_catalog
+from api_lessons.change_log import CHANGE_LOG_PAGE_SIZE, changes_since
+from api_lessons.packs import lesson_pack_delta, schedule_lesson_packs, schedule_lesson_packs_on_commit
+from api_lessons.prefetch import UserLessonAnswers
+from api_lessons.snapshot import SNAPSHOT_FORMATS, dumps_snapshot, export_lessons, import_lessons, loads_snapshot
+from api_lessons.versions import *
+from backend.async_api import AsyncAPIView, aserialize
+from backend.db_router import read_only
 from backend.global_function import *
 
 
-class GetLessonsBatchView(APIView):
-    def get(self, request):
-        lessons_batch = LessonBatch.objects.all()
-        return success_with_text(LessonBatchSerializer(lessons_batch, user=request.user, many=True).data)
+@read_only
+class GetLessonsBatchView(AsyncAPIView):
+    version_dependencies = LESSON_CATALOG_MODELS
+    user_version_dependencies = (LESSON_PROGRESS_VERSION,)
 
+    async def get(self, request):
+        lessons_batch = [batch async for batch in LessonBatch.objects.prefetch_related('lessons')]
+        data = await aserialize(LessonBatchSerializer, lessons_batch, user=request.user, many=True)
+        return success_with_text(data)
 
-class GetLessonView(APIView):
-    def post(self, request):
+
+@read_only
+class GetLessonCatalogView(AsyncAPIView):
+    version_dependencies = LESSON_CATALOG_MODELS
+    user_version_dependencies = (LESSON_PROGRESS_VERSION,)
+
+    async def get(self, request):
+        return success_with_text(await sync_to_async(build_catalog)(request.user))
+
+
+@read_only
+class GetLessonView(AsyncAPIView):
+    conditional_methods = ('POST',)
+    version_dependencies = LESSON_CONTENT_MODELS
+    user_version_dependencies = LESSON_USER_ANSWER_MODELS
+    version_max_age = 30 * 60  # ссылки Vimeo истекают
+
+    async def post(self, request):
         serializer = GetLessonById(data=request.data)
-        serializer.is_valid(raise_exception=True)
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
         lesson: Lesson = serializer.validated_data['lesson_id']
         user: UserModel = request.user
-        if not lesson.is_available_for_user(user):
-            return error_with_text('lesson_not_available')
+        error = await open_lesson(lesson, user)
+        if error:
+            return error_with_text(error)
+
+        video_links = await lesson_video_links(lesson)
+        data = await aserialize(LessonSerializer, lesson, user=user, context={'user': user, 'video_links': video_links})
+        return success_with_text(data)
+
+
+def lesson_access_error(lesson: Lesson, user: UserModel):
+    """
+    Проверяет доступ к уроку без изменений: тариф пользователя и пройденный предыдущий урок.
+    Возвращает текст ошибки или None
+    """
+    if not lesson.is_available_for_user(user):
+        return 'lesson_not_available'
 
-        lesson_before = Lesson.objects.filter(lesson_batch=lesson.lesson_batch, order=lesson.order - 1).first()
-        if lesson_before:
-            if not UserLessonModel.objects.filter(user=user, lesson=lesson_before, completed=True).exists():
-                return error_with_text('unlock_prev_lesson')
+    lesson_before = Lesson.objects.filter(lesson_batch_id=lesson.lesson_batch_id, order=lesson.order - 1).first()
+    if lesson_before:
+        if not UserLessonModel.objects.filter(user=user, lesson=lesson_before, completed=True).exists():
+            return 'unlock_prev_lesson'
+    return None
 
-        UserLessonModel.objects.get_or_create(user=user, lesson=lesson)
-        return success_with_text(LessonSerializer(lesson, user=request.user, context={'user': request.user}, ).data)
+
+async def open_lesson(lesson: Lesson, user: UserModel):
+    """
+    Проверяет доступ к уроку и отмечает его начатым. Возвращает текст ошибки или None
+    """
+    error = await sync_to_async(lesson_access_error)(lesson, user)
+    if error:
+        return error
+
+    await UserLessonModel.objects.aget_or_create(user=user, lesson=lesson)
+    return None
+
+
+async def lesson_video_links(lesson: Lesson) -> dict:
+    vimeo_links = [video_url async for video_url in VideoComponent.objects.filter(
+        page_element__page__lesson=lesson).values_list('video_url', flat=True)]
+    return await aget_video_links_from_vimeo(vimeo_links)
+
+
+@read_only
+class GetLessonPackView(APIView):
+    """
+    Манифест офлайн-пакета урока и список файлов, изменившихся с версии на устройстве (version)
+    """
+
+    def post(self, request: Request):
+        serializer = GetLessonPack(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        lesson: Lesson = serializer.validated_data['lesson_id']
+        # Пакет содержит весь урок, поэтому проверка та же, что в open_lesson, но урок не отмечается начатым
+        error = lesson_access_error(lesson, request.user)
+        if error:
+            return error_with_text(error)
+
+        pack = lesson.packs.first()
+        if pack is None:
+            schedule_lesson_packs([lesson.pk])
+            return error_with_text('lesson_pack_not_ready')
+        return success_with_text(lesson_pack_delta(pack, serializer.validated_data.get('version')))
+
+
+@read_only
+class SyncContentView(APIView):
+    """
+    Изменения уроков и доп. материалов с курсора (cursor): upserts - текущие строки по моделям,
+    deleted - id удаленных. Без курсора или с устаревшим курсором - все содержимое (reset).
+    Клиент сохраняет cursor из ответа и повторяет запрос, пока has_more
+    """
+
+    def get(self, request: Request):
+        serializer = SyncContent(data=request.GET)
+        serializer.is_valid(raise_exception=True)
+        return success_with_text(changes_since(
+            serializer.validated_data.get('cursor'), request.user,
+            serializer.validated_data.get('limit', CHANGE_LOG_PAGE_SIZE),
+        ))
+
+
+@read_only
+class GetLessonOverlayView(AsyncAPIView):
+    """
+    Данные пользователя поверх статического файла урока (Lesson.render_url): ответы, оценка и ссылки на видео
+    """
+    conditional_methods = ('POST',)
+    version_dependencies = (Lesson, VideoComponent)
+    user_version_dependencies = LESSON_USER_ANSWER_MODELS
+    version_max_age = 30 * 60  # ссылки Vimeo истекают
+
+    async def post(self, request):
+        serializer = GetLessonById(data=request.data)
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
+        lesson: Lesson = serializer.validated_data['lesson_id']
+        user: UserModel = request.user
+        error = await open_lesson(lesson, user)
+        if error:
+            return error_with_text(error)
+
+        video_links = await lesson_video_links(lesson)
+        answers = await sync_to_async(UserLessonAnswers)(user, lesson)
+        return success_with_text(await sync_to_async(lesson_overlay)(lesson, answers, video_links))
 
 
 class CheckLessonForEnding(APIView):
@@ -52,12 +178,10 @@ class GetFriendsOnLessonView(APIView):
         serializer = GetLessonById(data=request.data)
         serializer.is_valid(raise_exception=True)
         lesson: Lesson = serializer.validated_data['lesson_id']
-        friends = []
-        for i in request.user.friends.all():
-            last_lesson = i.lessons.last()
-            if last_lesson:
-                if last_lesson.lesson == lesson:
-                    friends.append(i)
+        # Друзья, у которых последний начатый урок - этот
+        last_lesson = UserLessonModel.objects.filter(user=OuterRef('pk')).order_by('-pk').values('lesson')[:1]
+        friends = with_friend_data(request.user.friends.annotate(last_lesson_id=Subquery(last_lesson)).filter(
+            last_lesson_id=lesson.pk), request.user)
         return success_with_text(UserModelAsFriendSerializer(friends, many=True, user=request.user).data)
 
 
@@ -75,10 +199,55 @@ class LeaveReviewOnLessonView(APIView):
 
 class AddLessonToBatchView(APIView):
     def post(self, request: Request):
-        # delete all lessons
-        Lesson.objects.all().delete()
-
         lesson_serializer = LessonSerializer(data=request.data, user=request.user)
         lesson_serializer.is_valid(raise_exception=True)
         lesson: Lesson = lesson_serializer.save()
+        # bulk_create не отправляет сигналы
+        schedule_lesson_packs_on_commit(Lesson, [lesson.pk])
         return success_with_text(LessonSerializer(lesson, user=request.user).data)
+
+
+SNAPSHOT_CONTENT_TYPES = {'json': 'application/json', 'msgpack': 'application/msgpack'}
+
+
+class ExportLessonsSnapshotView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request: Request):
+        snapshot_format = request.GET.get('snapshot_format', 'json')
+        if snapshot_format not in SNAPSHOT_FORMATS:
+            return error_with_text(f'snapshot_format must be one of {SNAPSHOT_FORMATS}')
+        try:
+            lesson_ids = [int(lesson_id) for lesson_id in request.GET.get('lesson_ids', '').split(',') if lesson_id]
+        except ValueError:
+            return error_with_text('lesson_ids must be comma separated integers')
+        if not lesson_ids:
+            return error_with_text('lesson_ids is required')
+
+        response = HttpResponse(dumps_snapshot(export_lessons(lesson_ids), snapshot_format),
+                                content_type=SNAPSHOT_CONTENT_TYPES[snapshot_format])
+        response['Content-Disposition'] = f'attachment; filename="lessons.{snapshot_format}"'
+        return response
+
+
+class ImportLessonsSnapshotView(APIView):
+    """
+    Снимок - файл в поле file (json или msgpack) или сам JSON в теле запроса, уроки добавляются к существующим
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request: Request):
+        file = request.FILES.get('file')
+        snapshot = loads_snapshot(file.read()) if file is not None else request.data
+
+        lesson_batch = None
+        lesson_batch_id = request.query_params.get('lesson_batch_id')
+        if lesson_batch_id:
+            lesson_batch = LessonBatch.objects.filter(pk=lesson_batch_id).first()
+            if lesson_batch is None:
+                return error_with_text('Lesson batch does not exist')
+
+        lessons = import_lessons(snapshot, lesson_batch=lesson_batch, author=request.user)
+        return success_with_text([
+            {'id': lesson.pk, 'title': lesson.title, 'lesson_batch_id': lesson.lesson_batch_id} for lesson in lessons
+        ])
@@ -0,0 +1,35 @@
+"""
+Дни активности пользователя: битовая маска на год (UserActivityYear) и время последней активности
+на самом пользователе, поэтому проверки серии и "активен сегодня" не обращаются к БД.
+Время последнего открытия приложения (last_login) пишется в БД задачей flush_last_login, а не каждым get_user.
+"""
+from django.utils import timezone
+
+from api_users.models import UserActivityYear, UserModel
+from backend.write_behind import WriteBehindField
+
+LAST_LOGIN = WriteBehindField(UserModel, 'last_login')
+
+
+def record_activity(user: UserModel, moment: timezone.datetime):
+    day = user.local_date(moment)
+    activities = UserActivityYear.objects.select_for_update().filter(user=user, year=day.year)
+    activity = activities.first()
+    if activity is None:
+        # Первая запись года: параллельная вставка той же строки пропускается (ON CONFLICT DO NOTHING),
+        # а не падает на unique_user_activity_year
+        UserActivityYear.objects.bulk_create([UserActivityYear(user=user, year=day.year)], ignore_conflicts=True)
+        activity = activities.get()
+    activity.add_day(day)
+    activity.save(update_fields=['days'])
+
+
+def activity_heatmap(user: UserModel, year: int) -> dict:
+    activity = user.activity_years.filter(year=year).first()
+    return {
+        'year': year,
+        'days': [day.isoformat() for day in activity.dates()] if activity else [],
+        'day_streak': user.day_streak,
+        'max_day_streak': user.max_day_streak,
+        'active_today': user.is_active_today(),
+    }
@@ -23,6 +23,18 @@ class UserActivityDateModelAdmin(UniversalAdmin):
     list_filter = ('user', 'datetime')
 
 
+@admin.register(UserActivityYear)
+class UserActivityYearAdmin(UniversalAdmin):
+    list_display = ('user', 'year')
+    list_filter = ('year',)
+
+
+@admin.register(FriendSuggestion)
+class FriendSuggestionAdmin(UniversalAdmin):
+    list_display = ('user', 'suggested_user', 'mutual_friends', 'updated_at')
+    raw_id_fields = ('user', 'suggested_user')
+
+
 @admin.register(UserPointAddHistory)
 class UserPointAddHistoryAdmin(UniversalAdmin):
     list_display = ('user', 'points', 'description')
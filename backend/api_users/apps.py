@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ApiUsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api_users'
+
+    def ready(self):
+        import api_users.signals  # noqa
+        post_migrate.connect(route_task_schedules, sender=self)
+        super().ready()
+
+
+def route_task_schedules(sender, **kwargs):
+    # Расписания следуют за включенными очередями (TASK_QUEUES_ENABLED) после каждого migrate
+    from backend.task_queues import route_schedules
+    route_schedules()
@@ -4,7 +4,10 @@ import concurrent.futures
 from django.utils import timezone
 
 from api_users.models import UserModel, NotificationSettings
-from firebase_admin import messaging
+from backend.firebase import get_firebase_app
+
+# Общий пул для отправки уведомлений, чтобы не ждать ответа FCM в обработчике запроса
+_fcm_executor = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix='fcm')
 
 
 def send_notification_to_user(user: UserModel, title, body, payload):
@@ -21,6 +24,9 @@ def send_notification_to_user(user: UserModel, title, body, payload):
     print('payload:', payload)
     print('-' * 100)
 
+    # SDK загружается при первой отправке, а не при импорте модуля
+    from firebase_admin import messaging
+
     message = messaging.Message(
         notification=messaging.Notification(
             title=title,
@@ -31,8 +37,7 @@ def send_notification_to_user(user: UserModel, title, body, payload):
     )
 
     # sending in async mode as we do not want to wait for response
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        executor.submit(messaging.send, message)
+    _fcm_executor.submit(messaging.send, message, app=get_firebase_app())
 
 
 def send_streak_notification(user: UserModel, minutes_remaining: int):
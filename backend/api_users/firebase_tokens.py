@@ -0,0 +1,128 @@
+"""
+Проверка Firebase ID токенов на месте через PyJWT, без запросов к Google на каждый вход.
+Открытые ключи берет провайдер (settings.FIREBASE_KEY_PROVIDER): по умолчанию сертификаты Google
+кэшируются в памяти процесса на время из Cache-Control ответа, LocalKeyProvider берет ключи из настроек
+(локальная разработка и тесты без сети).
+"""
+import re
+import threading
+import time
+
+import jwt
+import requests
+from cryptography.x509 import load_pem_x509_certificate
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from backend.firebase import firebase_project_id
+
+GOOGLE_CERTS_URL = 'https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com'
+GOOGLE_CERTS_TIMEOUT = 5
+# Если Cache-Control нет, сертификаты перезапрашиваются через час
+GOOGLE_CERTS_DEFAULT_MAX_AGE = 3600
+# Неизвестный kid (ключи сменились раньше срока) перезапрашивает сертификаты не чаще раза в минуту
+GOOGLE_CERTS_MIN_REFRESH_INTERVAL = 60
+FIREBASE_TOKEN_LEEWAY = getattr(settings, 'FIREBASE_TOKEN_LEEWAY', 10)
+
+
+class InvalidFirebaseToken(ValueError):
+    pass
+
+
+def cache_max_age(cache_control: str):
+    if re.search(r'\b(no-store|no-cache)\b', cache_control):
+        return 0
+    match = re.search(r'\bmax-age=(\d+)', cache_control)
+    return int(match.group(1)) if match else None
+
+
+def load_public_key(pem: str):
+    if 'CERTIFICATE' in pem:
+        return load_pem_x509_certificate(pem.encode()).public_key()
+    return pem
+
+
+class GoogleCertsProvider:
+    def __init__(self, url=GOOGLE_CERTS_URL):
+        self.url = url
+        self.keys = {}
+        self.expires_at = 0
+        self.fetched_at = 0
+        self.lock = threading.Lock()
+
+    def fetch(self):
+        response = requests.get(self.url, timeout=GOOGLE_CERTS_TIMEOUT)
+        response.raise_for_status()
+        max_age = cache_max_age(response.headers.get('Cache-Control', ''))
+        now = time.monotonic()
+        self.keys = {kid: load_public_key(pem) for kid, pem in response.json().items()}
+        self.fetched_at = now
+        self.expires_at = now + (GOOGLE_CERTS_DEFAULT_MAX_AGE if max_age is None else max_age)
+
+    def get_key(self, kid: str):
+        now = time.monotonic()
+        if now < self.expires_at and kid in self.keys:
+            return self.keys[kid]
+        with self.lock:
+            # Пока ждали блокировку, сертификаты мог обновить другой поток
+            stale = time.monotonic() >= self.expires_at
+            unknown = kid not in self.keys and time.monotonic() - self.fetched_at >= GOOGLE_CERTS_MIN_REFRESH_INTERVAL
+            if stale or unknown:
+                try:
+                    self.fetch()
+                except (requests.RequestException, ValueError) as e:
+                    if not self.keys:
+                        raise InvalidFirebaseToken(f'Could not fetch Firebase public keys: {e}')
+            return self.keys.get(kid)
+
+
+class LocalKeyProvider:
+    """
+    Ключи из settings.FIREBASE_LOCAL_PUBLIC_KEYS: {kid: PEM открытого ключа или сертификата}
+    """
+
+    def get_key(self, kid: str):
+        pem = getattr(settings, 'FIREBASE_LOCAL_PUBLIC_KEYS', {}).get(kid)
+        return None if pem is None else load_public_key(pem)
+
+
+providers = {}
+
+
+def get_key_provider():
+    path = getattr(settings, 'FIREBASE_KEY_PROVIDER', 'api_users.firebase_tokens.GoogleCertsProvider')
+    if path not in providers:
+        providers[path] = import_string(path)()
+    return providers[path]
+
+
+def verify_id_token(token: str) -> dict:
+    """
+    Проверяет подпись и стандартные поля Firebase ID токена, возвращает claims с uid (= sub)
+    """
+    project_id = firebase_project_id()
+    try:
+        header = jwt.get_unverified_header(token)
+    except jwt.InvalidTokenError as e:
+        raise InvalidFirebaseToken(str(e))
+    if header.get('alg') != 'RS256':
+        raise InvalidFirebaseToken('Firebase ID token has incorrect algorithm')
+    key = get_key_provider().get_key(header.get('kid'))
+    if key is None:
+        raise InvalidFirebaseToken('Firebase ID token has unknown key id')
+
+    try:
+        claims = jwt.decode(
+            token, key, algorithms=['RS256'], audience=project_id,
+            issuer=f'https://securetoken.google.com/{project_id}', leeway=FIREBASE_TOKEN_LEEWAY,
+            options={'require': ['exp', 'iat', 'sub', 'aud', 'iss']},
+        )
+    except jwt.InvalidTokenError as e:
+        raise InvalidFirebaseToken(str(e))
+
+    if not claims['sub'] or len(claims['sub']) > 128:
+        raise InvalidFirebaseToken('Firebase ID token has invalid subject')
+    if claims.get('auth_time', 0) > time.time() + FIREBASE_TOKEN_LEEWAY:
+        raise InvalidFirebaseToken('Firebase ID token has auth_time in the future')
+    claims['uid'] = claims['sub']
+    return claims
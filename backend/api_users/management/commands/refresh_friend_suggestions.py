@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from api_users.suggestions import refresh_all_suggestions
+
+
+class Command(BaseCommand):
+    help = 'Recompute friend suggestions for all users (they are refreshed incrementally afterwards)'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Friend suggestions: {refresh_all_suggestions()}')
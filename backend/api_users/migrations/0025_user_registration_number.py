@@ -0,0 +1,34 @@
+# Generated by Django 5.0.2 on 2026-10-19 10:59
+
+from django.db import migrations, models
+
+
+def fill_registration_numbers(apps, schema_editor):
+    UserModel = apps.get_model('api_users', 'UserModel')
+    non_staff_before = 0
+    batch = []
+    for user in UserModel.objects.order_by('pk').only('pk', 'is_staff').iterator(chunk_size=2000):
+        user.registration_number = non_staff_before + 1
+        if not user.is_staff:
+            non_staff_before += 1
+        batch.append(user)
+        if len(batch) >= 2000:
+            UserModel.objects.bulk_update(batch, ['registration_number'])
+            batch = []
+    UserModel.objects.bulk_update(batch, ['registration_number'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_users', '0024_alter_notificationsettings_last_lesson_reminder_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usermodel',
+            name='registration_number',
+            field=models.IntegerField(blank=True, editable=False, null=True, verbose_name='Порядковый номер'),
+        ),
+        migrations.RunPython(fill_registration_numbers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.2 on 2026-10-19 12:10
+
+from django.db import migrations
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+
+def remove_duplicate_activity_dates(apps, schema_editor):
+    UserActivityDateModel = apps.get_model('api_users', 'UserActivityDateModel')
+    duplicate_ids = UserActivityDateModel.objects.annotate(
+        row_number=Window(RowNumber(), partition_by=[F('user'), F('datetime')], order_by=['pk']),
+    ).filter(row_number__gt=1).values_list('pk', flat=True)
+    UserActivityDateModel.objects.filter(pk__in=list(duplicate_ids)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_users', '0025_user_registration_number'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_activity_dates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.2 on 2026-10-19 11:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_users', '0026_remove_duplicate_activity_dates'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='useractivitydatemodel',
+            constraint=models.UniqueConstraint(fields=('user', 'datetime'), name='unique_user_activity_datetime'),
+        ),
+    ]
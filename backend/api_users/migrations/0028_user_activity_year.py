@@ -0,0 +1,37 @@
+# Generated by Django 5.0.2 on 2026-10-19 11:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_users', '0027_useractivitydatemodel_unique_user_activity_datetime'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usermodel',
+            name='last_activity_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Последняя активность'),
+        ),
+        migrations.CreateModel(
+            name='UserActivityYear',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField(verbose_name='Год')),
+                ('days', models.BinaryField(default=b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00', max_length=46, verbose_name='Дни активности (битовая маска)')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_years', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Активность пользователя за год',
+                'verbose_name_plural': 'Активность пользователей по годам',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='useractivityyear',
+            constraint=models.UniqueConstraint(fields=('user', 'year'), name='unique_user_activity_year'),
+        ),
+    ]
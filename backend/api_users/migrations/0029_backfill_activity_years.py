@@ -0,0 +1,47 @@
+# Generated by Django 5.0.2 on 2026-10-19 11:46
+
+from itertools import groupby
+
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+ACTIVITY_YEAR_BYTES = 46
+BATCH_SIZE = 1000
+
+
+def backfill_activity_years(apps, schema_editor):
+    UserModel = apps.get_model('api_users', 'UserModel')
+    UserActivityDateModel = apps.get_model('api_users', 'UserActivityDateModel')
+    UserActivityYear = apps.get_model('api_users', 'UserActivityYear')
+
+    rows = UserActivityDateModel.objects.order_by('user_id').values_list(
+        'user_id', 'datetime', 'user__timezone_difference').iterator(chunk_size=10000)
+    batch = []
+    # Строки одного пользователя идут подряд, в памяти только его годы
+    for user_id, user_rows in groupby(rows, key=lambda row: row[0]):
+        years = {}
+        for _, moment, timezone_difference in user_rows:
+            day = (moment + timezone.timedelta(hours=timezone_difference)).date()
+            index = day.timetuple().tm_yday - 1
+            days = years.setdefault(day.year, bytearray(ACTIVITY_YEAR_BYTES))
+            days[index // 8] |= 1 << (index % 8)
+        batch.extend(UserActivityYear(user_id=user_id, year=year, days=bytes(days)) for year, days in years.items())
+        if len(batch) >= BATCH_SIZE:
+            UserActivityYear.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    UserActivityYear.objects.bulk_create(batch, ignore_conflicts=True)
+
+    UserModel.objects.update(last_activity_at=Subquery(
+        UserActivityDateModel.objects.filter(user=OuterRef('pk')).order_by('-datetime').values('datetime')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_users', '0028_user_activity_year'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_activity_years, migrations.RunPython.noop),
+    ]
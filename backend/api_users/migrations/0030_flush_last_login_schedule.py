@@ -0,0 +1,31 @@
+# Generated by Django 5.0.2 on 2026-10-19 11:48
+
+from django.db import migrations
+
+FLUSH_LAST_LOGIN = 'flush_last_login'
+
+
+def create_schedule(apps, schema_editor):
+    Schedule = apps.get_model('django_q', 'Schedule')
+    Schedule.objects.get_or_create(name=FLUSH_LAST_LOGIN, defaults={
+        'func': 'api_users.tasks.flush_last_login',
+        'schedule_type': 'I',  # Schedule.MINUTES
+        'minutes': 1,
+        'repeats': -1,
+    })
+
+
+def delete_schedule(apps, schema_editor):
+    apps.get_model('django_q', 'Schedule').objects.filter(name=FLUSH_LAST_LOGIN).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_users', '0029_backfill_activity_years'),
+        ('django_q', '0017_task_cluster_alter'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_schedule, delete_schedule),
+    ]
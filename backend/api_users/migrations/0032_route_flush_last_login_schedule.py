@@ -0,0 +1,27 @@
+# Generated by Django 5.0.2 on 2026-10-19 15:20
+
+from django.db import migrations
+
+FLUSH_LAST_LOGIN = 'flush_last_login'
+
+
+def route_to_interactive(apps, schema_editor):
+    # Очередь interactive (backend.task_queues): сброс каждую минуту не ждет за массовыми задачами.
+    # Только если очередь включена, иначе расписание остается основному кластеру
+    from backend.task_queues import route_schedules
+    route_schedules(apps.get_model('django_q', 'Schedule'))
+
+
+def route_to_default(apps, schema_editor):
+    apps.get_model('django_q', 'Schedule').objects.filter(name=FLUSH_LAST_LOGIN).update(cluster=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_users', '0031_friendsuggestion'),
+    ]
+
+    operations = [
+        migrations.RunPython(route_to_interactive, route_to_default),
+    ]
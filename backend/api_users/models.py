@@ -5,6 +5,8 @@ from django.utils import timezone
 from protected_media.models import ProtectedImageField
 from rest_framework.authtoken.models import Token
 
+from api_users.socket.consumer_actions import ActionTypes
+from api_users.socket.push import push_to_user
 from backend.global_function import PathAndRename
 
 
@@ -46,20 +48,31 @@ class UserModel(AbstractUser):
     points = models.IntegerField(default=0, verbose_name='Баллы')
     day_streak = models.IntegerField(default=0, verbose_name='Дневная серия')
     max_day_streak = models.IntegerField(default=0, verbose_name='Максимальная дневная серия')
+    # Последнее продление дневной серии (UTC), дни активности хранятся в UserActivityYear
+    last_activity_at = models.DateTimeField(null=True, blank=True, verbose_name='Последняя активность')
+
+    # Порядковый номер среди не-staff пользователей (для глобального события bars), не меняется после регистрации
+    registration_number = models.IntegerField(null=True, blank=True, editable=False,
+                                              verbose_name='Порядковый номер')
 
     REQUIRED_FIELDS = ['email']
 
     def __str__(self):
         return f'{self.pk} Profile of {self.email}'
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if self.registration_number is None:
+            self.assign_registration_number()
+
+    def assign_registration_number(self):
+        self.registration_number = UserModel.objects.filter(pk__lt=self.pk, is_staff=False).count() + 1
+        UserModel.objects.filter(pk=self.pk).update(registration_number=self.registration_number)
+        return self.registration_number
+
     def add_points(self, points: int, description: str):
-        if points < 0:
-            raise ValueError('Points must be positive')
-        if description == '':
-            raise ValueError('Description must be filled')
-        self.points += points
-        self.save()
-        UserPointAddHistory.objects.create(user=self, points=points, description=description)
+        from api_users.points import add_points
+        add_points(self, points, description)
 
     def is_paid(self):
         return self.user_type in (UserTypes.paid, UserTypes.premium_paid)
@@ -67,13 +80,28 @@ class UserModel(AbstractUser):
     def current_datetime(self) -> timezone.datetime:
         return timezone.now() + timezone.timedelta(hours=self.timezone_difference)
 
+    def local_date(self, moment: timezone.datetime = None):
+        return ((moment or timezone.now()) + timezone.timedelta(hours=self.timezone_difference)).date()
+
+    def local_day_start(self, moment: timezone.datetime = None) -> timezone.datetime:
+        """
+        Начало местного дня пользователя (UTC), в который попадает moment
+        """
+        local = (moment or timezone.now()) + timezone.timedelta(hours=self.timezone_difference)
+        return local.replace(hour=0, minute=0, second=0, microsecond=0) - timezone.timedelta(
+            hours=self.timezone_difference)
+
+    def is_active_today(self) -> bool:
+        return self.last_activity_at is not None and self.local_date(self.last_activity_at) == self.local_date()
+
     def remaining_hours_till_streak_reset(self) -> int:
-        last_active_date = self.activity_dates.first()
-        if last_active_date is None:
+        if self.last_activity_at is None:
             return -1
+        return self.remaining_hours_since(self.last_activity_at)
 
+    def remaining_hours_since(self, last_activity_at: timezone.datetime) -> int:
         # прибавляем разницу часов потому что ласт актив дейттайм в UTC
-        last_datetime = last_active_date.datetime + timezone.timedelta(hours=self.timezone_difference)
+        last_datetime = last_activity_at + timezone.timedelta(hours=self.timezone_difference)
 
         # разница в часах до след дня КОГДА пользователь получил +1 к страйку
         hours_till_tomorrow = 24 - last_datetime.hour
@@ -82,21 +110,48 @@ class UserModel(AbstractUser):
         return hours_till_tomorrow + 24 - difference
 
     def send_friend_request(self, to_user):
-        if (to_user != self) and (to_user not in self.friends.all()):
+        if to_user != self and not self.friends.filter(pk=to_user.pk).exists():
             if self.friendship_requests.filter(pk=to_user.pk).exists():
                 self.accept_friend_request(to_user)
             else:
                 to_user.friendship_requests.add(self)
+                push_to_user(to_user.pk, ActionTypes.FRIEND_REQUEST, {'user_id': self.pk, 'name': self.name})
 
     def accept_friend_request(self, from_user):
-        if from_user in self.friendship_requests.all():
-            self.friendship_requests.remove(from_user)
+        # Проверка и удаление заявки одним DELETE, friends симметричное - add пишет обе строки одним INSERT
+        deleted, _ = UserModel.friendship_requests.through.objects.filter(
+            from_usermodel=self, to_usermodel=from_user).delete()
+        if deleted:
             self.friends.add(from_user)
-            from_user.friends.add(self)
+            push_to_user(from_user.pk, ActionTypes.FRIEND_REQUEST_ACCEPTED, {'user_id': self.pk, 'name': self.name})
 
     def decline_friend_request(self, from_user):
-        if from_user in self.friendship_requests.all():
-            self.friendship_requests.remove(from_user)
+        self.friendship_requests.remove(from_user)
+
+
+class FriendSuggestion(models.Model):
+    """
+    Предложение дружбы: друг друзей пользователя и число общих друзей (пересчитывается в api_users.suggestions)
+    """
+    user = models.ForeignKey(UserModel, on_delete=models.CASCADE, related_name='friend_suggestions')
+    suggested_user = models.ForeignKey(UserModel, on_delete=models.CASCADE, related_name='+',
+                                       verbose_name='Предлагаемый друг')
+    mutual_friends = models.PositiveIntegerField(verbose_name='Общие друзья')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлено')
+
+    class Meta:
+        verbose_name = 'Предложение дружбы'
+        verbose_name_plural = 'Предложения дружбы'
+        ordering = ['-mutual_friends', 'pk']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'suggested_user'], name='unique_friend_suggestion'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-mutual_friends'], name='friend_suggestion_rank'),
+        ]
+
+    def __str__(self):
+        return f'{self.pk} FriendSuggestion: {self.user_id} -> {self.suggested_user_id}'
 
 
 class DeletedUsersModel(models.Model):
@@ -133,11 +188,58 @@ class UserActivityDateModel(models.Model):
         verbose_name = 'Активность пользователя'
         verbose_name_plural = 'Активности пользователей'
         ordering = ['-datetime']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'datetime'], name='unique_user_activity_datetime'),
+        ]
 
     def __str__(self):
         return f'{self.pk} Activity '
 
 
+# 366 дней по биту на день
+ACTIVITY_YEAR_BYTES = 46
+
+
+class UserActivityYear(models.Model):
+    """
+    Дни активности пользователя за год по его местному времени: бит N - (N+1)-й день года
+    """
+    user = models.ForeignKey(UserModel, on_delete=models.CASCADE, related_name='activity_years')
+    year = models.PositiveSmallIntegerField(verbose_name='Год')
+    days = models.BinaryField(max_length=ACTIVITY_YEAR_BYTES, default=bytes(ACTIVITY_YEAR_BYTES),
+                              verbose_name='Дни активности (битовая маска)')
+
+    class Meta:
+        verbose_name = 'Активность пользователя за год'
+        verbose_name_plural = 'Активность пользователей по годам'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'year'], name='unique_user_activity_year'),
+        ]
+
+    def __str__(self):
+        return f'{self.pk} Activity {self.year}'
+
+    @staticmethod
+    def day_index(day) -> int:
+        return day.timetuple().tm_yday - 1
+
+    def has_day(self, day) -> bool:
+        index = self.day_index(day)
+        return bool(bytes(self.days)[index // 8] >> (index % 8) & 1)
+
+    def add_day(self, day):
+        days = bytearray(self.days)
+        index = self.day_index(day)
+        days[index // 8] |= 1 << (index % 8)
+        self.days = bytes(days)
+
+    def dates(self) -> list:
+        days = bytes(self.days)
+        first_day = timezone.datetime(self.year, 1, 1).date()
+        return [first_day + timezone.timedelta(days=index)
+                for index in range(len(days) * 8) if days[index // 8] >> (index % 8) & 1]
+
+
 class UserPointAddHistory(models.Model):
     user = models.ForeignKey(UserModel, on_delete=models.CASCADE, related_name='point_add_history')
     points = models.IntegerField()
@@ -0,0 +1,114 @@
+"""
+Баллы и дневная серия. Все изменения идут одной транзакцией: счетчики меняются через F() в UPDATE
+(без чтения-изменения-записи всей строки, параллельные запросы не теряют баллы), история - одним bulk_create,
+push уходит после коммита.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Greatest, Mod
+from django.db.models.lookups import Exact
+from django.utils import timezone
+
+from api_users.activity import record_activity
+from api_users.models import UserModel, UserPointAddHistory
+from api_users.socket.consumer_actions import ActionTypes
+from api_users.socket.push import push_to_user
+
+DAY_STREAK_POINTS = 1
+DAY_STREAK_DESCRIPTION = 'Бонус за дневную серию'
+# Каждые DAY_STREAK_BONUS_EVERY дней подряд
+DAY_STREAK_BONUS_EVERY = 10
+DAY_STREAK_BONUS_POINTS = 5
+DAY_STREAK_BONUS_DESCRIPTION = 'Бонусы за 10 дней подряд'
+
+
+def validate_award(points: int, description: str):
+    if points < 0:
+        raise ValueError('Points must be positive')
+    if description == '':
+        raise ValueError('Description must be filled')
+
+
+def award_points(awards) -> dict:
+    """
+    Начисляет баллы многим пользователям сразу: awards - список (user_id, points, description).
+    Один UPDATE на каждую различную сумму, история одним bulk_create. Возвращает {user_id: новые баллы}
+    """
+    awards = list(awards)
+    for _, points, description in awards:
+        validate_award(points, description)
+    totals = defaultdict(int)
+    for user_id, points, _ in awards:
+        totals[user_id] += points
+    if not totals:
+        return {}
+
+    user_ids_by_total = defaultdict(list)
+    for user_id, total in totals.items():
+        user_ids_by_total[total].append(user_id)
+
+    with transaction.atomic():
+        for total, user_ids in user_ids_by_total.items():
+            UserModel.objects.filter(pk__in=user_ids).update(points=F('points') + total)
+        new_points = dict(UserModel.objects.filter(pk__in=totals).values_list('pk', 'points'))
+        UserPointAddHistory.objects.bulk_create([
+            UserPointAddHistory(user_id=user_id, points=points, description=description)
+            for user_id, points, description in awards if user_id in new_points
+        ], batch_size=1000)
+        for user_id, points in new_points.items():
+            push_to_user(user_id, ActionTypes.UPDATE_POINTS, {'points': points})
+    return new_points
+
+
+def add_points(user: UserModel, points: int, description: str):
+    user.points = award_points([(user.pk, points, description)])[user.pk]
+
+
+def day_streak_awards(user: UserModel) -> list:
+    awards = [(user.pk, DAY_STREAK_POINTS, DAY_STREAK_DESCRIPTION)]
+    if user.day_streak % DAY_STREAK_BONUS_EVERY == 0:
+        awards.append((user.pk, DAY_STREAK_BONUS_POINTS, DAY_STREAK_BONUS_DESCRIPTION))
+    return awards
+
+
+def increase_day_streak(user: UserModel) -> bool:
+    """
+    +1 к дневной серии, баллы за нее и активность за сегодня: один UPDATE серии, баллов вместе с бонусом
+    и времени активности, затем история одним INSERT и день в годовой маске активности. Поля user обновляются из БД.
+    False, если серия уже продлена сегодня: проверка в условии UPDATE, параллельные запросы не продлят ее дважды
+    """
+    now = timezone.now()
+    next_streak = F('day_streak') + 1
+    bonus = Case(
+        When(Exact(Mod(next_streak, DAY_STREAK_BONUS_EVERY), 0), then=Value(DAY_STREAK_BONUS_POINTS)),
+        default=Value(0),
+    )
+    with transaction.atomic():
+        # Все выражения в SET считаются по старым значениям строки
+        updated = UserModel.objects.filter(
+            Q(last_activity_at__isnull=True) | Q(last_activity_at__lt=user.local_day_start(now)), pk=user.pk,
+        ).update(
+            day_streak=next_streak,
+            max_day_streak=Greatest('max_day_streak', next_streak),
+            points=F('points') + DAY_STREAK_POINTS + bonus,
+            last_activity_at=now,
+        )
+        if not updated:
+            return False
+        user.last_activity_at = now
+        user.refresh_from_db(fields=['day_streak', 'max_day_streak', 'points'])
+        UserPointAddHistory.objects.bulk_create([
+            UserPointAddHistory(user_id=user_id, points=points, description=description)
+            for user_id, points, description in day_streak_awards(user)
+        ])
+        record_activity(user, now)
+
+        push_to_user(user.pk, ActionTypes.UPDATE_POINTS, {'points': user.points})
+        push_to_user(user.pk, ActionTypes.UPDATE_DAY_STREAK, {
+            'day_streak': user.day_streak,
+            'max_day_streak': user.max_day_streak,
+            'points': user.points,
+        })
+    return True
@@ -1,3 +1,4 @@
+from django.db.models import Count, Exists, Manager, OuterRef, Q
 from rest_framework import serializers
 
 from api_users.models import *
@@ -43,6 +44,30 @@ class UserModelSerializer(serializers.ModelSerializer):
         return UserModel.objects.filter(points__gt=obj.points).count() + 1
 
 
+def get_rankings(points_values) -> dict:
+    # Место в рейтинге для каждого значения баллов одним запросом
+    points_values = list(set(points_values))
+    counts = UserModel.objects.aggregate(**{
+        f'points_{index}': Count('pk', filter=Q(points__gt=points)) for index, points in enumerate(points_values)
+    }) if points_values else {}
+    return {points: counts[f'points_{index}'] + 1 for index, points in enumerate(points_values)}
+
+
+def with_friend_data(queryset, user: UserModel):
+    """
+    is_request_pending (заявка от user этому пользователю) подзапросом Exists в том же запросе, что и список
+    """
+    return queryset.annotate(is_request_pending=Exists(UserModel.friendship_requests.through.objects.filter(
+        from_usermodel=OuterRef('pk'), to_usermodel=user)))
+
+
+class UserModelAsFriendListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        users = list(data.all() if isinstance(data, Manager) else data)
+        self.child.load_friend_data(users)
+        return super().to_representation(users)
+
+
 class UserModelAsFriendSerializer(UserContextNeededSerializer, serializers.ModelSerializer):
     is_request_pending = serializers.SerializerMethodField()
     photo = serializers.SerializerMethodField()
@@ -51,6 +76,23 @@ class UserModelAsFriendSerializer(UserContextNeededSerializer, serializers.Model
     class Meta:
         model = UserModel
         fields = ['id', 'name', 'photo', 'description', 'max_day_streak', 'is_request_pending', 'ranking']
+        list_serializer_class = UserModelAsFriendListSerializer
+
+    def load_friend_data(self, users):
+        """
+        Заявки и рейтинг загружаются сразу для всего списка, а не запросом на каждого пользователя.
+        Заявки уже известны для списка из with_friend_data, рейтинг - если передан в context['rankings']
+        """
+        not_annotated = [user.id for user in users if not hasattr(user, 'is_request_pending')]
+        self.pending_ids = set(UserModel.friendship_requests.through.objects.filter(
+            from_usermodel__in=not_annotated, to_usermodel=self.user,
+        ).values_list('from_usermodel_id', flat=True)) if not_annotated else set()
+        self.rankings = self.context.get('rankings') or get_rankings(user.points for user in users)
+
+    def to_representation(self, instance):
+        if not hasattr(self, 'rankings'):
+            self.load_friend_data([instance])
+        return super().to_representation(instance)
 
     def get_photo(self, obj: UserModel):
         if obj.photo:
@@ -58,7 +100,8 @@ class UserModelAsFriendSerializer(UserContextNeededSerializer, serializers.Model
         return obj.photo_url
 
     def get_is_request_pending(self, obj: UserModel):
-        return obj.friendship_requests.filter(id=self.user.id).exists()
+        pending = getattr(obj, 'is_request_pending', None)
+        return obj.id in self.pending_ids if pending is None else pending
 
     def get_ranking(self, obj: UserModel):
-        return UserModel.objects.filter(points__gt=obj.points).count() + 1
+        return self.rankings[obj.points]
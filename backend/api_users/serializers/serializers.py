@@ -34,6 +34,27 @@ class SearchUserSerializer(serializers.Serializer):
     search = serializers.CharField(max_length=50, min_length=1)
 
 
+class PointsAwardSerializer(serializers.Serializer):
+    user_id = serializers.IntegerField()
+    points = serializers.IntegerField(min_value=1)
+    description = serializers.CharField(max_length=255)
+
+
+class AwardPointsSerializer(serializers.Serializer):
+    awards = PointsAwardSerializer(many=True, allow_empty=False, max_length=10000)
+
+    def validate_awards(self, awards):
+        user_ids = {award['user_id'] for award in awards}
+        missing = user_ids - set(UserModel.objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+        if missing:
+            raise serializers.ValidationError(f'Users not found: {sorted(missing)}')
+        return awards
+
+
+class ActivityHeatmapSerializer(serializers.Serializer):
+    year = serializers.IntegerField(required=False, min_value=2000, max_value=2100)
+
+
 class GetUserByIdSerializer(serializers.Serializer):
     user_id = serializers.IntegerField()
 
@@ -0,0 +1,26 @@
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+
+from api_users.models import UserModel
+from api_users.suggestions import schedule_suggestions_refresh
+
+
+@receiver(m2m_changed, sender=UserModel.friends.through, dispatch_uid='friend_suggestions_friends')
+def friends_changed(sender, instance, action, pk_set, **kwargs):
+    if action == 'pre_clear':
+        instance._suggestion_friend_ids = list(instance.friends.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        schedule_suggestions_refresh([instance.pk, *getattr(instance, '_suggestion_friend_ids', [])])
+    elif action in ('post_add', 'post_remove'):
+        schedule_suggestions_refresh([instance.pk, *pk_set])
+
+
+@receiver(m2m_changed, sender=UserModel.friendship_requests.through, dispatch_uid='friend_suggestions_requests')
+def friendship_requests_changed(sender, instance, action, pk_set, **kwargs):
+    if action == 'pre_clear':
+        instance._suggestion_request_ids = list(instance.friendship_requests.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        schedule_suggestions_refresh([instance.pk, *getattr(instance, '_suggestion_request_ids', [])],
+                                     friendship_changed=False)
+    elif action in ('post_add', 'post_remove'):
+        schedule_suggestions_refresh([instance.pk, *pk_set], friendship_changed=False)
@@ -0,0 +1,46 @@
+from channels.auth import AuthMiddlewareStack
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.authtoken.models import Token
+
+
+TOKEN_SUBPROTOCOL = 'token'
+
+
+@database_sync_to_async
+def get_user_by_token(key):
+    token = Token.objects.select_related('user').filter(key=key).first()
+    if token is None or not token.user.is_active or token.user.blocked:
+        return AnonymousUser()
+    return token.user
+
+
+class TokenAuthMiddleware(BaseMiddleware):
+    """
+    Авторизация вебсокета тем же DRF токеном, что и в REST API.
+    Токен передается в заголовке Authorization: Token ... или, где заголовки задать нельзя (браузер),
+    подпротоколами Sec-WebSocket-Protocol: token, <ключ>. В query string токен не принимается:
+    он попадал бы в логи доступа
+    """
+
+    async def __call__(self, scope, receive, send):
+        key = self.get_token_key(scope)
+        if key:
+            scope['user'] = await get_user_by_token(key)
+        return await super().__call__(scope, receive, send)
+
+    @staticmethod
+    def get_token_key(scope):
+        headers = dict(scope.get('headers', []))
+        authorization = headers.get(b'authorization', b'').decode().split()
+        if len(authorization) == 2 and authorization[0].lower() == 'token':
+            return authorization[1]
+        subprotocols = scope.get('subprotocols', [])
+        if len(subprotocols) == 2 and subprotocols[0] == TOKEN_SUBPROTOCOL:
+            return subprotocols[1]
+        return None
+
+
+def TokenAuthMiddlewareStack(inner):
+    return AuthMiddlewareStack(TokenAuthMiddleware(inner))
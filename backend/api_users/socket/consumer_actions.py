@@ -1,14 +1,14 @@
 import json
 
-"""
-NOT USED FOR NOW
-"""
-
 
 class ActionTypes:
     ERROR = "error"
     SUCCESS = "success"
     UPDATE_DAY_STREAK = 'update_day_streak'
+    UPDATE_POINTS = 'update_points'
+    FRIEND_REQUEST = 'friend_request'
+    FRIEND_REQUEST_ACCEPTED = 'friend_request_accepted'
+    GLOBAL_EVENT = 'global_event'
 
 
 class Action:
@@ -16,9 +16,12 @@ class Action:
         self.type = type
         self.data = data
 
-    async def to_json(self):
+    def dumps(self) -> str:
         return json.dumps({"type": self.type, "data": self.data})
 
+    async def to_json(self):
+        return self.dumps()
+
     @staticmethod
     async def from_json(json_string: str) -> 'Action':
         obj = Action('', '')
@@ -2,15 +2,15 @@ from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 from django.utils import timezone
 
-from .consumer_actions import Action
+from api_global_event.cache import with_bars_number
+from .auth import TOKEN_SUBPROTOCOL
+from .consumer_actions import Action, ActionTypes
+from .groups import GLOBAL_GROUP, user_group
 
-"""
-NOT USED FOR NOW
-"""
 
 class ChatConsumer(AsyncWebsocketConsumer):
     def __init__(self, *args, **kwargs):
-        super().__init__(args, kwargs)
+        super().__init__(*args, **kwargs)
         self.user = None
         self.connected_time = None
 
@@ -23,38 +23,44 @@ class ChatConsumer(AsyncWebsocketConsumer):
             """
             await self.accept()
             await self.send(text_data=await Action.error("You must be logged in to chat."))
-            await self.close()
+            await self.close(code=4001)
             return
 
         self.connected_time = timezone.now()
-        await self.channel_layer.group_add(f'user{self.user.pk}', self.channel_name)
-        await self.accept()
+        await self.channel_layer.group_add(user_group(self.user.pk), self.channel_name)
+        await self.channel_layer.group_add(GLOBAL_GROUP, self.channel_name)
+        # Браузер закрывает соединение, если сервер не подтвердил запрошенный подпротокол
+        subprotocol = TOKEN_SUBPROTOCOL if TOKEN_SUBPROTOCOL in self.scope.get('subprotocols', []) else None
+        await self.accept(subprotocol=subprotocol)
         await self.send(await Action.success(data="Connected"))
 
     async def disconnect(self, close_code):
         # Leave room group
-        if self.user.is_anonymous:
+        if self.user is None or self.user.is_anonymous:
             return
 
-        await self.channel_layer.group_discard(f'user{self.user.pk}', self.channel_name)
+        await self.channel_layer.group_discard(user_group(self.user.pk), self.channel_name)
+        await self.channel_layer.group_discard(GLOBAL_GROUP, self.channel_name)
 
     # Receive message from WebSocket
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         # action: Action = await Action.from_json(text_data)
-        await self.send(text_data=Action.error('Unknown action.'))
+        await self.send(text_data=await Action.error('Unknown action.'))
 
     async def send_message(self, event):
         await self.send(text_data=event["action"])
 
-    # HOW TO SEND MESSAGE TO A GROUP?? EASY!
-    #
-    # async_to_sync(channel_layer.group_send)(
-    #                 WebsocketGroups.FARM,
-    #                 {
-    #                     "type": "send.message",
-    #                     "action": Action,
-    #                 }
-    #             )
+    async def global_event(self, event):
+        # Событие рассылается один раз на всю группу, персональные данные (номер для bars) добавляются здесь
+        data = event["data"]
+        if data is not None and data['type'] == 'bars':
+            data = with_bars_number(data, await self.get_registration_number())
+        await self.send(text_data=Action(ActionTypes.GLOBAL_EVENT, data).dumps())
+
+    async def get_registration_number(self):
+        if self.user.registration_number is None:
+            await database_sync_to_async(self.user.assign_registration_number)()
+        return self.user.registration_number
 
     @database_sync_to_async
     def has_perm(self, permission):
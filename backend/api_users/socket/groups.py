@@ -0,0 +1,5 @@
+GLOBAL_GROUP = 'global'
+
+
+def user_group(user_id) -> str:
+    return f'user{user_id}'
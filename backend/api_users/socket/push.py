@@ -0,0 +1,36 @@
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from .consumer_actions import Action
+from .groups import GLOBAL_GROUP, user_group
+
+logger = logging.getLogger(__name__)
+
+
+def _group_send(group, message):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(group, message)
+    except Exception:
+        # Недоступность Redis не должна ломать HTTP запрос, клиент получит данные при следующем запросе
+        logger.exception('Could not push message to group %s', group)
+
+
+def push_to_user(user_id, action_type: str, data):
+    """
+    Отправляет действие во все открытые вебсокеты пользователя после коммита транзакции
+    """
+    text = Action(action_type, data).dumps()
+    transaction.on_commit(lambda: _group_send(user_group(user_id), {'type': 'send.message', 'action': text}))
+
+
+def broadcast_global_event(data):
+    """
+    Одно сообщение на группу всех подключенных пользователей вместо рассылки по каждому пользователю
+    """
+    transaction.on_commit(lambda: _group_send(GLOBAL_GROUP, {'type': 'global.event', 'data': data}))
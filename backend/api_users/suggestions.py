@@ -0,0 +1,96 @@
+"""
+Предложения дружбы: друзья друзей с числом общих друзей. Считаются одним GROUP BY по таблице друзей
+(через друга к его друзьям) сразу для пачки пользователей и хранятся в FriendSuggestion.
+После изменения дружбы пересчитываются только затронутые пользователи: оба участника и их друзья.
+"""
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from api_users.models import FriendSuggestion, UserModel
+from backend.task_queues import enqueue
+
+FRIEND_SUGGESTIONS_PER_USER = getattr(settings, 'FRIEND_SUGGESTIONS_PER_USER', 50)
+FRIEND_SUGGESTIONS_BATCH_SIZE = 500
+
+Friends = UserModel.friends.through
+FriendshipRequests = UserModel.friendship_requests.through
+
+
+def with_friends(user_ids) -> set:
+    user_ids = set(user_ids)
+    return user_ids | set(Friends.objects.filter(from_usermodel__in=user_ids).values_list('to_usermodel', flat=True))
+
+
+def compute_suggestions(user_ids) -> dict:
+    """
+    {user_id: [(suggested_user_id, mutual_friends), ...]} по убыванию общих друзей, не больше
+    FRIEND_SUGGESTIONS_PER_USER. Без друзей, заблокированных и пользователей с заявкой в любую сторону
+    """
+    user_ids = set(user_ids)
+    mutual = defaultdict(Counter)
+    rows = Friends.objects.filter(
+        from_usermodel__in=user_ids, to_usermodel__friends__blocked=False,
+    ).values('from_usermodel', candidate=F('to_usermodel__friends')).annotate(
+        mutual_friends=Count('to_usermodel'),
+    ).values_list('from_usermodel', 'candidate', 'mutual_friends')
+    for user_id, candidate_id, mutual_friends in rows:
+        mutual[user_id][candidate_id] = mutual_friends
+
+    excluded = defaultdict(set)
+    for user_id, friend_id in Friends.objects.filter(from_usermodel__in=user_ids).values_list(
+            'from_usermodel', 'to_usermodel'):
+        excluded[user_id].add(friend_id)
+    for receiver_id, sender_id in FriendshipRequests.objects.filter(
+            Q(from_usermodel__in=user_ids) | Q(to_usermodel__in=user_ids)).values_list(
+            'from_usermodel', 'to_usermodel'):
+        excluded[receiver_id].add(sender_id)
+        excluded[sender_id].add(receiver_id)
+
+    suggestions = {}
+    for user_id in user_ids:
+        candidates = [
+            (candidate_id, count) for candidate_id, count in mutual[user_id].items()
+            if candidate_id != user_id and candidate_id not in excluded[user_id]
+        ]
+        candidates.sort(key=lambda candidate: (-candidate[1], candidate[0]))
+        suggestions[user_id] = candidates[:FRIEND_SUGGESTIONS_PER_USER]
+    return suggestions
+
+
+def refresh_suggestions(user_ids) -> int:
+    suggestions = compute_suggestions(user_ids)
+    with transaction.atomic():
+        FriendSuggestion.objects.filter(user__in=suggestions).delete()
+        created = FriendSuggestion.objects.bulk_create([
+            FriendSuggestion(user_id=user_id, suggested_user_id=candidate_id, mutual_friends=count)
+            for user_id, candidates in suggestions.items() for candidate_id, count in candidates
+        ], batch_size=1000)
+    return len(created)
+
+
+def refresh_in_batches(user_ids) -> int:
+    user_ids = sorted(user_ids)
+    return sum(refresh_suggestions(user_ids[start:start + FRIEND_SUGGESTIONS_BATCH_SIZE])
+               for start in range(0, len(user_ids), FRIEND_SUGGESTIONS_BATCH_SIZE))
+
+
+def refresh_all_suggestions() -> int:
+    return refresh_in_batches(UserModel.objects.values_list('pk', flat=True))
+
+
+def schedule_suggestions_refresh(user_ids, friendship_changed=True):
+    """
+    Пересчет после коммита. Изменение дружбы меняет общих друзей и у друзей участников, заявка - только у участников
+    """
+    user_ids = sorted(set(user_ids))
+    transaction.on_commit(lambda: enqueue(
+        'api_users.tasks.refresh_friend_suggestions', user_ids, friendship_changed))
+
+
+def ranked_suggestions(user: UserModel):
+    # Среди равных по общим друзьям выше недавно активные
+    return FriendSuggestion.objects.filter(user=user).select_related('suggested_user').order_by(
+        '-mutual_friends', F('suggested_user__last_activity_at').desc(nulls_last=True), 'pk')
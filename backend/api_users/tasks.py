@@ -1,4 +1,6 @@
-from .models import UserActivityDateModel, UserModel
+from . import suggestions
+from .activity import LAST_LOGIN
+from .models import UserModel
 from .cloud_messaging import *
 
 
@@ -6,8 +8,8 @@ def check_for_strike():
     """
     Check if user has a strike and send a notification if needed
     """
-    # get all users that have at least one UserActivityDateModel object
-    users = UserModel.objects.filter(activity_dates__isnull=False).distinct()
+    # get all users that have been active at least once
+    users = UserModel.objects.filter(last_activity_at__isnull=False).select_related('notification_settings')
     for user in users:
         user: UserModel
         remaining_hours = user.remaining_hours_till_streak_reset()
@@ -15,3 +17,16 @@ def check_for_strike():
             send_streak_notification(user=user, minutes_remaining=remaining_hours * 60)
 
     return True
+
+
+def flush_last_login():
+    """
+    Записывает накопленное время последнего входа одним UPDATE ... CASE на пачку пользователей
+    """
+    return LAST_LOGIN.flush()
+
+
+def refresh_friend_suggestions(user_ids, friendship_changed=True):
+    if friendship_changed:
+        user_ids = suggestions.with_friends(user_ids)
+    return suggestions.refresh_in_batches(user_ids)
@@ -0,0 +1,402 @@
+import json
+import time
+from datetime import date
+from importlib import import_module
+from unittest import mock
+
+import jwt
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from django.apps import apps
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from api_users import firebase_tokens
+from api_users.activity import LAST_LOGIN, record_activity
+from api_users.models import FriendSuggestion, UserActivityDateModel, UserActivityYear, UserModel, UserPointAddHistory
+from api_users.points import award_points, increase_day_streak
+from api_users.socket.auth import TokenAuthMiddlewareStack
+from api_users.socket.consumer_actions import ActionTypes
+from api_users.socket.consumers import ChatConsumer
+from api_users.socket.groups import GLOBAL_GROUP
+from api_users.socket.push import push_to_user
+from api_users.suggestions import compute_suggestions, refresh_all_suggestions, refresh_suggestions
+from api_users.views import *
+from backend.write_behind import MemoryStore, WriteBehindField
+from lms.apps.reports.query_budget import QueryBudgetTestCase, ViewCallMixin
+
+
+def user_with_most_friends(dataset) -> UserModel:
+    return UserModel.objects.filter(pk__in=dataset.user_ids).annotate(
+        friends_number=Count('friends', distinct=True),
+        requests_number=Count('friendship_requests', distinct=True),
+    ).filter(requests_number__gt=0).order_by('-friends_number', 'pk').first()
+
+
+def expected_suggestions(user: UserModel) -> dict:
+    friends = set(user.friends.values_list('pk', flat=True))
+    pending = set(user.friendship_requests.values_list('pk', flat=True)) | set(
+        UserModel.objects.filter(friendship_requests=user).values_list('pk', flat=True))
+    mutual = {}
+    for friend in UserModel.objects.filter(pk__in=friends):
+        for candidate in friend.friends.filter(blocked=False).values_list('pk', flat=True):
+            if candidate != user.pk and candidate not in friends and candidate not in pending:
+                mutual[candidate] = mutual.get(candidate, 0) + 1
+    return mutual
+
+
+class FriendsQueryBudgetTest(QueryBudgetTestCase):
+    def test_get_friends(self):
+        def request_for(dataset):
+            return GetFriendsView, 'get', None, user_with_most_friends(dataset)
+
+        self.assertQueryBudget(3, request_for)
+
+    def test_search_friends(self):
+        def request_for(dataset):
+            return SearchFriendsView, 'post', {'search': 'e'}, user_with_most_friends(dataset)
+
+        self.assertQueryBudget(6, request_for)
+
+
+    def test_friend_request_queries_do_not_depend_on_friends_number(self):
+        alice, bob = [UserModel.objects.create(username=name, email=f'{name}@example.com') for name in ('alice', 'bob')]
+        for user in (alice, bob):
+            user.friends.add(*UserModel.objects.filter(pk__in=self.small.user_ids))
+        with self.assertNumQueries(4):
+            alice.send_friend_request(bob)
+        with self.assertNumQueries(4):
+            bob.accept_friend_request(alice)
+        self.assertTrue(alice.friends.filter(pk=bob.pk).exists())
+        self.assertTrue(bob.friends.filter(pk=alice.pk).exists())
+        self.assertFalse(bob.friendship_requests.exists())
+
+    def test_pending_request_flag(self):
+        user = user_with_most_friends(self.small)
+        requested = UserModel.objects.exclude(pk=user.pk).exclude(friends=user).first()
+        requested.friendship_requests.add(user)
+        data = self.call_view(SearchFriendsView, 'post', {'search': requested.name}, user).data['message']
+        self.assertTrue(next(item for item in data if item['id'] == requested.pk)['is_request_pending'])
+
+    def test_get_suggestions(self):
+        def request_for(dataset):
+            refresh_all_suggestions()
+            return GetFriendSuggestionsView, 'get', None, user_with_most_friends(dataset)
+
+        self.assertQueryBudget(4, request_for)
+        user = user_with_most_friends(self.small)
+        data = self.call_view(GetFriendSuggestionsView, 'get', None, user).data['message']
+        self.assertEqual({item['id']: item['mutual_friends'] for item in data}, expected_suggestions(user))
+        self.assertFalse(FriendSuggestion.objects.filter(user=user, suggested_user__in=user.friends.all()).exists())
+
+
+class ActivityIndexPlanTest(QueryBudgetTestCase):
+    def test_activity_lookups_use_user_datetime_index(self):
+        user = UserModel.objects.get(pk=self.small.user_ids[0])
+        day_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+        self.assertUsesIndex(user.activity_dates.all()[:1], 'unique_user_activity_datetime')
+        self.assertUsesIndex(UserActivityDateModel.objects.filter(
+            user=user, datetime__gte=day_start, datetime__lt=day_start + timezone.timedelta(days=1)),
+            'unique_user_activity_datetime')
+
+
+class PointsQueryBudgetTest(QueryBudgetTestCase):
+    def test_award_points_to_many_users(self):
+        def request_for(dataset):
+            awards = [{'user_id': user_id, 'points': 3, 'description': 'Событие'} for user_id in dataset.user_ids]
+            admin = UserModel.objects.get_or_create(username=f'admin_{dataset.user_ids[0]}', defaults={
+                'email': f'admin_{dataset.user_ids[0]}@example.com', 'is_staff': True})[0]
+            return AwardPointsView, 'post', {'awards': awards}, admin
+
+        self.assertQueryBudget(6, request_for)
+
+
+class PointsTest(ViewCallMixin, TestCase):
+    def test_award_points_sums_per_user(self):
+        user_id = UserModel.objects.create(username='points', email='points@example.com', points=7).pk
+        with self.captureOnCommitCallbacks(execute=True):
+            new_points = award_points([(user_id, 2, 'Событие'), (user_id, 3, 'Подарок')])
+
+        self.assertEqual(new_points, {user_id: 12})
+        self.assertEqual(UserModel.objects.get(pk=user_id).points, 12)
+        self.assertEqual(UserPointAddHistory.objects.filter(user_id=user_id).count(), 2)
+        with self.assertRaises(ValueError):
+            award_points([(user_id, 1, '')])
+
+    def test_day_streak_bonus(self):
+        user = UserModel.objects.create(username='streak', email='streak@example.com', day_streak=9,
+                                        max_day_streak=9, points=10,
+                                        last_login=timezone.now() - timezone.timedelta(minutes=10))
+        response = self.call_view(UpdateDayStreak, 'post', None, user)
+
+        self.assertEqual(response.status_code, 200, response.data)
+        user.refresh_from_db()
+        self.assertEqual((user.day_streak, user.max_day_streak, user.points), (10, 10, 16))
+        self.assertEqual(sorted(user.point_add_history.values_list('points', flat=True)), [1, 5])
+        self.assertTrue(user.is_active_today())
+        self.assertTrue(user.activity_years.get().has_day(user.local_date()))
+        self.assertEqual(self.call_view(UpdateDayStreak, 'post', None, user).status_code, 400)
+
+    def test_day_streak_is_increased_once_a_day(self):
+        user = UserModel.objects.create(username='twice', email='twice@example.com',
+                                        last_login=timezone.now() - timezone.timedelta(minutes=10))
+        # Второй запрос прочитал пользователя до того, как первый продлил серию
+        stale_user = UserModel.objects.get(pk=user.pk)
+        self.assertEqual(self.call_view(UpdateDayStreak, 'post', None, user).status_code, 200)
+
+        response = self.call_view(UpdateDayStreak, 'post', None, stale_user)
+        self.assertEqual((response.status_code, response.data['message']), (400, 'Already updated today'))
+        user.refresh_from_db()
+        self.assertEqual((user.day_streak, user.points), (1, 1))
+
+    def test_day_streak_uses_local_day(self):
+        user = UserModel.objects.create(username='local', email='local@example.com', timezone_difference=5)
+        now = timezone.datetime(2024, 3, 10, 20, tzinfo=timezone.timezone.utc)
+        self.assertEqual(user.local_day_start(now), timezone.datetime(2024, 3, 10, 19, tzinfo=timezone.timezone.utc))
+
+        UserModel.objects.filter(pk=user.pk).update(last_activity_at=now - timezone.timedelta(minutes=90))
+        with mock.patch('api_users.points.timezone.now', return_value=now):
+            self.assertTrue(increase_day_streak(user))
+            self.assertFalse(increase_day_streak(UserModel.objects.get(pk=user.pk)))
+
+    def test_record_activity_after_concurrent_insert(self):
+        user = UserModel.objects.create(username='race', email='race@example.com')
+        day = user.local_date()
+        UserActivityYear.objects.create(user=user, year=day.year)
+        # Строки еще не было при чтении, ее вставил параллельный запрос
+        with mock.patch('django.db.models.query.QuerySet.first', return_value=None):
+            record_activity(user, timezone.now())
+        self.assertTrue(UserActivityYear.objects.get(user=user, year=day.year).has_day(day))
+
+
+class ActivityYearTest(ViewCallMixin, TestCase):
+    def test_bitset_days(self):
+        activity = UserActivityYear(year=2024)
+        for day in (date(2024, 1, 1), date(2024, 2, 29), date(2024, 12, 31)):
+            activity.add_day(day)
+        self.assertEqual(activity.dates(), [date(2024, 1, 1), date(2024, 2, 29), date(2024, 12, 31)])
+        self.assertTrue(activity.has_day(date(2024, 2, 29)))
+        self.assertFalse(activity.has_day(date(2024, 3, 1)))
+
+    def test_backfill_from_activity_rows(self):
+        user = UserModel.objects.create(username='backfill', email='backfill@example.com', timezone_difference=5)
+        moments = [timezone.datetime(2025, 12, 31, 20, tzinfo=timezone.timezone.utc),
+                   timezone.datetime(2025, 6, 1, 10, tzinfo=timezone.timezone.utc)]
+        UserActivityDateModel.objects.bulk_create(UserActivityDateModel(user=user, datetime=moment) for moment in moments)
+
+        backfill = import_module('api_users.migrations.0029_backfill_activity_years')
+        backfill.backfill_activity_years(apps, None)
+
+        user.refresh_from_db()
+        self.assertEqual(user.last_activity_at, moments[0])
+        # 31 декабря 20:00 UTC - уже 1 января по местному времени пользователя
+        self.assertEqual({activity.year: activity.dates() for activity in user.activity_years.all()},
+                         {2025: [date(2025, 6, 1)], 2026: [date(2026, 1, 1)]})
+
+    def test_heatmap(self):
+        user = UserModel.objects.create(username='heatmap', email='heatmap@example.com', day_streak=2)
+        moment = timezone.datetime(2025, 6, 1, 10, tzinfo=timezone.timezone.utc)
+        for days in (0, 1, 400):
+            record_activity(user, moment - timezone.timedelta(days=days))
+        with self.assertNumQueries(1):
+            data = self.call_view(GetActivityHeatmapView, 'get', {'year': 2025}, user).data['message']
+        self.assertEqual(data['days'], ['2025-05-31', '2025-06-01'])
+        self.assertEqual(data['day_streak'], 2)
+
+
+class LastLoginBufferTest(ViewCallMixin, TestCase):
+    def setUp(self):
+        # Буфер в памяти: задача сброса вызывается в том же процессе
+        patcher = mock.patch.object(LAST_LOGIN, 'store', MemoryStore())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.users = [UserModel.objects.create(username=f'login{index}', email=f'login{index}@example.com')
+                      for index in range(2)]
+
+    def test_get_user_does_not_update_user_row(self):
+        user = self.users[0]
+        with CaptureQueriesContext(connection) as context:
+            response = self.call_view(GetUserView, 'get', None, user)
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertFalse([query['sql'] for query in context if query['sql'].startswith('UPDATE')])
+        self.assertEqual(UserModel.objects.get(pk=user.pk).last_login, None)
+        self.assertEqual(LAST_LOGIN.pending(user.pk), user.last_login)
+
+    def test_day_streak_reads_buffered_last_login(self):
+        user = UserModel.objects.create(username='buffered', email='buffered@example.com',
+                                        last_login=timezone.now() - timezone.timedelta(hours=1))
+        self.assertEqual(self.call_view(UpdateDayStreak, 'post', None, user).status_code, 400)
+
+        LAST_LOGIN.record(user.pk, timezone.now() - timezone.timedelta(minutes=10))
+        user = UserModel.objects.get(pk=user.pk)
+        response = self.call_view(UpdateDayStreak, 'post', None, user)
+        self.assertEqual(response.status_code, 200, response.data)
+
+    def test_flush_writes_all_users_in_one_update(self):
+        first, second = [user.pk for user in self.users]
+        moments = {first: timezone.now() - timezone.timedelta(minutes=3), second: timezone.now()}
+        LAST_LOGIN.record(first, timezone.now() - timezone.timedelta(days=1))
+        for user_id, moment in moments.items():
+            LAST_LOGIN.record(user_id, moment)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(LAST_LOGIN.flush(), 2)
+        self.assertEqual(dict(UserModel.objects.filter(pk__in=moments).values_list('pk', 'last_login')), moments)
+        self.assertIsNone(LAST_LOGIN.pending(first))
+
+    @override_settings(WRITE_BEHIND_BACKEND='sync')
+    def test_sync_backend_writes_through(self):
+        last_login = WriteBehindField(UserModel, 'last_login')
+        user = self.users[0]
+        moment = timezone.now() - timezone.timedelta(minutes=10)
+        with self.assertNumQueries(1):
+            last_login.record(user.pk, moment)
+        self.assertEqual(UserModel.objects.get(pk=user.pk).last_login, moment)
+        self.assertIsNone(last_login.pending(user.pk))
+        self.assertEqual(last_login.flush(), 0)
+
+
+class FriendSuggestionTest(TestCase):
+    def test_mutual_friend_counts(self):
+        alice, bob, carol, dave, erin, frank, grace = [
+            UserModel.objects.create(username=name, email=f'{name}@example.com')
+            for name in ('alice', 'bob', 'carol', 'dave', 'erin', 'frank', 'grace')]
+        alice.friends.add(bob, carol)
+        bob.friends.add(dave, erin, frank)
+        carol.friends.add(dave, grace)
+        frank.send_friend_request(alice)
+        UserModel.objects.filter(pk=grace.pk).update(blocked=True)
+
+        with self.assertNumQueries(3):
+            suggestions = compute_suggestions([alice.pk])
+        self.assertEqual(dict(suggestions[alice.pk]), {dave.pk: 2, erin.pk: 1})
+        self.assertEqual(dict(suggestions[alice.pk]), expected_suggestions(alice))
+
+    def test_suggestions_follow_friendship_changes(self):
+        alice, bob, carol, dave = [UserModel.objects.create(username=name, email=f'{name}@example.com')
+                                   for name in ('alice', 'bob', 'carol', 'dave')]
+        with self.captureOnCommitCallbacks() as callbacks:
+            bob.friends.add(alice, carol, dave)
+            carol.friends.add(dave)
+        self.assertTrue(callbacks)
+        refresh_suggestions([alice.pk, carol.pk])
+        self.assertEqual(list(alice.friend_suggestions.values_list('suggested_user', 'mutual_friends')),
+                         [(carol.pk, 1), (dave.pk, 1)])
+
+        alice.send_friend_request(carol)
+        alice.friends.add(dave)
+        refresh_suggestions([alice.pk, carol.pk])
+        self.assertEqual(list(alice.friend_suggestions.values_list('suggested_user', 'mutual_friends')), [])
+        self.assertFalse(carol.friend_suggestions.exists())
+
+
+FIREBASE_TEST_KEY = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+FIREBASE_TEST_PUBLIC_KEY = FIREBASE_TEST_KEY.public_key().public_bytes(
+    serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo).decode()
+
+
+@override_settings(FIREBASE_PROJECT_ID='vector-test', FIREBASE_KEY_PROVIDER='api_users.firebase_tokens.LocalKeyProvider',
+                   FIREBASE_LOCAL_PUBLIC_KEYS={'test-kid': FIREBASE_TEST_PUBLIC_KEY})
+class FirebaseTokenTest(ViewCallMixin, TestCase):
+    def id_token(self, kid='test-kid', **claims) -> str:
+        now = int(time.time())
+        claims = {
+            'iss': 'https://securetoken.google.com/vector-test', 'aud': 'vector-test', 'sub': 'firebase-uid',
+            'iat': now, 'exp': now + 3600, 'auth_time': now,
+            'email': 'new.user@example.com', 'name': 'New User', 'picture': 'https://example.com/photo.png',
+        } | claims
+        return jwt.encode(claims, FIREBASE_TEST_KEY, algorithm='RS256', headers={'kid': kid})
+
+    def test_verify_id_token(self):
+        self.assertEqual(firebase_tokens.verify_id_token(self.id_token())['uid'], 'firebase-uid')
+        for token in (self.id_token(aud='other-project'), self.id_token(exp=int(time.time()) - 60),
+                      self.id_token(kid='unknown'), self.id_token(sub=''), 'not a token'):
+            with self.assertRaises(firebase_tokens.InvalidFirebaseToken):
+                firebase_tokens.verify_id_token(token)
+
+    def test_login_creates_user_from_claims_and_keeps_token(self):
+        data = self.call_view(AuthViaFirebase, 'post', {'token': self.id_token()}).data['message']
+        user = UserModel.objects.get(firebase_user_id='firebase-uid')
+        self.assertEqual((user.name, user.email, user.photo_url),
+                         ('New', 'new.user@example.com', 'https://example.com/photo.png'))
+        again = self.call_view(AuthViaFirebase, 'post', {'token': self.id_token()}).data['message']
+        self.assertEqual(again['token'], data['token'])
+
+    def test_google_certs_are_cached_for_max_age(self):
+        response = mock.Mock(headers={'Cache-Control': 'public, max-age=600, must-revalidate'})
+        response.json.return_value = {'test-kid': FIREBASE_TEST_PUBLIC_KEY}
+        provider = firebase_tokens.GoogleCertsProvider()
+        with mock.patch('api_users.firebase_tokens.requests.get', return_value=response) as get:
+            self.assertIsNotNone(provider.get_key('test-kid'))
+            self.assertIsNotNone(provider.get_key('test-kid'))
+            # Неизвестный kid сразу после загрузки не вызывает повторный запрос
+            self.assertIsNone(provider.get_key('rotated'))
+            self.assertEqual(get.call_count, 1)
+            provider.expires_at = 0
+            provider.get_key('test-kid')
+            self.assertEqual(get.call_count, 2)
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class SocketGatewayTest(TransactionTestCase):
+    def setUp(self):
+        self.user = UserModel.objects.create(username='socket', email='socket@example.com')
+        self.token = Token.objects.create(user=self.user)
+        self.application = TokenAuthMiddlewareStack(ChatConsumer.as_asgi())
+
+    def communicator(self, headers=None, subprotocols=None):
+        return WebsocketCommunicator(self.application, '/ws/user/', headers=headers, subprotocols=subprotocols)
+
+    async def test_rejects_missing_invalid_and_query_string_token(self):
+        for communicator in (
+                self.communicator(),
+                self.communicator(headers=[(b'authorization', b'Token invalid')]),
+                WebsocketCommunicator(self.application, f'/ws/user/?token={self.token.key}')):
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            self.assertEqual(json.loads(await communicator.receive_from())['type'], ActionTypes.ERROR)
+            self.assertEqual((await communicator.receive_output())['code'], 4001)
+            await communicator.disconnect()
+
+    async def test_joins_user_and_global_groups(self):
+        communicator = self.communicator(subprotocols=['token', self.token.key])
+        connected, subprotocol = await communicator.connect()
+        self.assertEqual((connected, subprotocol), (True, 'token'))
+        self.assertEqual(json.loads(await communicator.receive_from())['type'], ActionTypes.SUCCESS)
+
+        layer = get_channel_layer()
+        await layer.group_send(f'user{self.user.pk}', {'type': 'send.message', 'action': 'personal'})
+        self.assertEqual(await communicator.receive_from(), 'personal')
+        await layer.group_send(GLOBAL_GROUP, {'type': 'global.event', 'data': {'type': 'plain'}})
+        self.assertEqual(json.loads(await communicator.receive_from())['type'], ActionTypes.GLOBAL_EVENT)
+        await communicator.disconnect()
+
+    async def test_push_is_sent_only_after_commit(self):
+        communicator = self.communicator(headers=[(b'authorization', f'Token {self.token.key}'.encode())])
+        await communicator.connect()
+        await communicator.receive_from()
+
+        def push(commit):
+            try:
+                with transaction.atomic():
+                    push_to_user(self.user.pk, ActionTypes.UPDATE_POINTS, {'points': int(commit)})
+                    if not commit:
+                        raise ValueError
+            except ValueError:
+                pass
+
+        await sync_to_async(push)(False)
+        self.assertTrue(await communicator.receive_nothing())
+        await sync_to_async(push)(True)
+        self.assertEqual(json.loads(await communicator.receive_from())['data'], {'points': 1})
+        await communicator.disconnect()
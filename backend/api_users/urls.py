@@ -8,6 +8,8 @@ urlpatterns = [
     path("edit_photo/", EditPhotoView.as_view()),
     path("edit_user_data/", EditUserSettingsView.as_view()),
     path('update_day_streak/', UpdateDayStreak.as_view()),
+    path('award_points/', AwardPointsView.as_view()),
+    path('get_activity_heatmap/', GetActivityHeatmapView.as_view()),
     path('set_fcm_token/', SetFCMToken.as_view()),
     path('delete_account/', DeleteAccountView.as_view()),
     path('logout/', LogOutView.as_view()),
@@ -15,6 +17,7 @@ urlpatterns = [
     # friends
     path('get_friends/', GetFriendsView.as_view()),
     path('search_friends/', SearchFriendsView.as_view()),  # Uses Pagination
+    path('get_friend_suggestions/', GetFriendSuggestionsView.as_view()),  # Uses Pagination
     path('add_friend/', AddFriendView.as_view()),
     path('accept_friend/', AcceptFriendRequestView.as_view()),
     path('reject_friend/', DeclineFriendRequestView.as_view()),
@@ -1,10 +1,9 @@
 from django.db import IntegrityError
-from firebase_admin import auth
-from firebase_admin._auth_utils import InvalidIdTokenError
 from rest_framework.authtoken.models import Token
 from rest_framework.request import Request
 from rest_framework.views import APIView
 
+from api_users.firebase_tokens import InvalidFirebaseToken, verify_id_token
 from api_users.serializers import *
 from backend.global_function import error_with_text, success_with_text
 
@@ -21,10 +20,8 @@ class AuthViaFirebase(APIView):
 
         # trying  to decode token, if not valid return error
         try:
-            decoded_token = auth.verify_id_token(token)
-        except ValueError:
-            return error_with_text('The provided token is not a valid Firebase token')
-        except InvalidIdTokenError:
+            decoded_token = verify_id_token(token)
+        except InvalidFirebaseToken:
             return error_with_text('The provided token is not a valid Firebase token')
 
         # trying to get the user id from the token, if not valid return error
@@ -38,15 +35,19 @@ class AuthViaFirebase(APIView):
         try:
             user_profile = UserModel.objects.get(firebase_user_id=firebase_user_id)
         except UserModel.DoesNotExist:
-            firebase_user = auth.get_user(firebase_user_id)
+            # profile fields come from the token claims, no auth.get_user request to Firebase
+            email = decoded_token.get('email')
+            if not email:
+                return error_with_text('The provided Firebase token has no email')
+            display_name = (decoded_token.get('name') or '').split()
             try:
                 user_profile: UserModel = UserModel.objects.create(
-                    photo_url=firebase_user.photo_url,
-                    name=firebase_user.display_name.split()[0],
-                    email=firebase_user.email,
+                    photo_url=decoded_token.get('picture'),
+                    name=display_name[0] if display_name else email.split('@')[0],
+                    email=email,
                     firebase_user_id=firebase_user_id,
                     description='no bio yet',
-                    username=firebase_user.email,
+                    username=email,
                     password='no password',
                 )
                 user_profile.set_password('no password')
@@ -58,7 +59,6 @@ class AuthViaFirebase(APIView):
                 print(e)
                 return error_with_text('A user with the provided Firebase UID already exists')
 
-        # delete old token and generate a new one
-        Token.objects.filter(user=user_profile).delete()
-        token = Token.objects.create(user=user_profile)
+        # the token is kept between logins, LogOutView deletes it
+        token, _ = Token.objects.get_or_create(user=user_profile)
         return success_with_text(UserModelSerializer(user_profile).data | {'token': token.key})
@@ -6,7 +6,9 @@ from rest_framework.request import Request
 from api_users.cloud_messaging import send_friend_request_notification
 from api_users.serializers import *
 from api_users.models import *
-from api_users.serializers.model_serializers import UserModelSerializer
+from api_users.serializers.model_serializers import UserModelSerializer, get_rankings, with_friend_data
+from api_users.suggestions import ranked_suggestions
+from backend.db_router import read_only
 from backend.global_function import success_with_text, error_with_text
 
 
@@ -15,24 +17,48 @@ class PaginationClass(PageNumberPagination):
 
 
 class GetFriendsView(APIView):
+    """
+    Друзья и входящие заявки: по запросу на список (заявки через Exists) и один запрос рейтинга на всех
+    """
+
     def get(self, request: Request):
-        a = UserModelAsFriendSerializer(request.user.friends.all(), many=True, user=request.user).data
-        b = UserModelAsFriendSerializer(request.user.friendship_requests.all(), many=True, user=request.user).data
+        user: UserModel = request.user
+        friends = list(with_friend_data(user.friends.all(), user))
+        requests = list(with_friend_data(user.friendship_requests.all(), user))
+        context = {'rankings': get_rankings(friend.points for friend in friends + requests)}
+        a = UserModelAsFriendSerializer(friends, many=True, user=user, context=context).data
+        b = UserModelAsFriendSerializer(requests, many=True, user=user, context=context).data
         return success_with_text(
             {'friends': a, 'pending_requests': b}
         )
 
 
+@read_only
 class SearchFriendsView(APIView):
     def post(self, request: Request):
         serializer = SearchUserSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         search = serializer.validated_data['search']
-        users = UserModel.objects.filter(name__icontains=search).exclude(id=request.user.id).all()
+        users = with_friend_data(UserModel.objects.filter(name__icontains=search).exclude(id=request.user.id).order_by('pk'), request.user)
         page = PaginationClass().paginate_queryset(users, request)
         return success_with_text(UserModelAsFriendSerializer(page, many=True, user=request.user).data)
 
 
+@read_only
+class GetFriendSuggestionsView(APIView):
+    """
+    Друзья друзей по числу общих друзей (mutual_friends), среди равных - недавно активные
+    """
+
+    def get(self, request: Request):
+        page = PaginationClass().paginate_queryset(ranked_suggestions(request.user), request)
+        users = UserModelAsFriendSerializer([suggestion.suggested_user for suggestion in page], many=True,
+                                            user=request.user).data
+        return success_with_text([
+            {**user, 'mutual_friends': suggestion.mutual_friends} for user, suggestion in zip(users, page)
+        ])
+
+
 class AddFriendView(APIView):
     def post(self, request: Request):
         serializer = GetUserByIdSerializer(data=request.data)
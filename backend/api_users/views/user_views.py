@@ -1,10 +1,15 @@
+from asgiref.sync import sync_to_async
 from django.utils import timezone
+from rest_framework.permissions import IsAdminUser
 from rest_framework.views import APIView
 from rest_framework.request import Request
 
 from api_users.serializers import *
+from api_users.activity import LAST_LOGIN, activity_heatmap
 from api_users.models import *
+from api_users.points import award_points, increase_day_streak
 from api_users.serializers.model_serializers import UserModelSerializer
+from backend.async_api import AsyncAPIView, aserialize
 from backend.global_function import success_with_text, error_with_text
 
 
@@ -19,21 +24,19 @@ class SetFCMToken(APIView):
         return success_with_text(UserModelSerializer(user).data)
 
 
-class GetUserView(APIView):
-    def get(self, request: Request):
+class GetUserView(AsyncAPIView):
+    async def get(self, request: Request):
         user: UserModel = request.user
         user.last_login = timezone.now()
-        user.save()
+        await sync_to_async(LAST_LOGIN.record)(user.pk, user.last_login)
 
         # Проверка на дневную серию (если пропущено то обновляем)
-        last_active_date = user.activity_dates.first()
-        if last_active_date is not None:
-            if user.remaining_hours_till_streak_reset() <= 0:
-                user.day_streak = 0
-                user.save()
+        streak_lost = user.last_activity_at is not None and user.remaining_hours_since(user.last_activity_at) <= 0
+        if user.day_streak and streak_lost:
+            user.day_streak = 0
+            await user.asave(update_fields=['day_streak'])
 
-        user.last_login = timezone.now()
-        return success_with_text(UserModelSerializer(user).data)
+        return success_with_text(await aserialize(UserModelSerializer, user))
 
 
 class UpdateDayStreak(APIView):
@@ -43,31 +46,52 @@ class UpdateDayStreak(APIView):
         # Некая фильтрация
         # Если прошло меньше 5ти минут с последнего входа, то не обновляем активность
         # Если прошло больше 15ти с последнего входа, то просим юзера заново залогиниться
-        last_login_difference = (timezone.now() - user.last_login).seconds
+        last_login = LAST_LOGIN.fresh(user)
+        if last_login is None:
+            return error_with_text('Too late to update activity date, login again')
+        last_login_difference = (timezone.now() - last_login).seconds
         if last_login_difference < 300:
             return error_with_text('Too early to update activity date')
         elif last_login_difference > 900:
             return error_with_text('Too late to update activity date, login again')
 
-        # Логика самого day streak
-        user_now_date = user.current_datetime().date()
-        if UserActivityDateModel.objects.filter(datetime__date=user_now_date, user=user).exists():
+        # Логика самого day streak. Проверка без запроса к БД, параллельные запросы отсекает условие UPDATE
+        if user.is_active_today():
             return error_with_text('Already updated today')
 
-        user.day_streak += 1
-        if user.day_streak > user.max_day_streak:
-            user.max_day_streak = user.day_streak
-        user.save()
-        user.add_points(points=1, description='Бонус за дневную серию')
+        # Серия, баллы (и бонус за каждые 10 дней подряд) и новая активность одной транзакцией
+        if not increase_day_streak(user):
+            return error_with_text('Already updated today')
+        return success_with_text(UserModelSerializer(user).data)
 
-        # Если у пользователя 10 дней подряд, то даем ему 5 бонусных баллов
-        if user.day_streak % 10 == 0:
-            user.add_points(points=5, description='Бонусы за 10 дней подряд')
 
-        # Создаем новую активность
-        user.activity_dates.create()
+class AwardPointsView(APIView):
+    """
+    Начисление баллов многим пользователям сразу (события, начисления администратором)
+    """
+    permission_classes = [IsAdminUser]
 
-        return success_with_text(UserModelSerializer(user).data)
+    def post(self, request: Request):
+        serializer = AwardPointsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        points = award_points(
+            (award['user_id'], award['points'], award['description'])
+            for award in serializer.validated_data['awards']
+        )
+        return success_with_text({str(user_id): value for user_id, value in points.items()})
+
+
+class GetActivityHeatmapView(APIView):
+    """
+    Дни активности за год (year, по умолчанию текущий) для календаря
+    """
+
+    def get(self, request: Request):
+        serializer = ActivityHeatmapSerializer(data=request.GET)
+        serializer.is_valid(raise_exception=True)
+        user: UserModel = request.user
+        year = serializer.validated_data.get('year', user.local_date().year)
+        return success_with_text(activity_heatmap(user, year))
 
 
 class UpdateTimezoneDifferenceView(APIView):
@@ -16,14 +16,16 @@ django_asgi_app = get_asgi_application()
 
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.security.websocket import AllowedHostsOriginValidator
-from channels.auth import AuthMiddlewareStack
+
+from api_users.socket.auth import TokenAuthMiddlewareStack
+from api_users.socket.routing import websocket_urlpatterns
 
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
     "websocket": AllowedHostsOriginValidator(
-        AuthMiddlewareStack(
-            URLRouter([])
-        ),  # Add routes here
+        TokenAuthMiddlewareStack(
+            URLRouter(websocket_urlpatterns)
+        ),
     ),
 })
 
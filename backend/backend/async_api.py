@@ -0,0 +1,43 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+from backend.conditional import ConditionalVersionMixin
+
+
+class AsyncAPIView(ConditionalVersionMixin, APIView):
+    """
+    APIView с async-обработчиками (async def get/post).
+    Аутентификация, права и ETag (ConditionalVersionMixin) проверяются в потоке, т.к. TokenAuthentication
+    обращается к БД синхронно, а сам обработчик выполняется в event loop без блокировки воркера.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+async def aserialize(serializer_class, *args, **kwargs):
+    # Сериализаторы DRF синхронные и могут обращаться к БД (SerializerMethodField), поэтому выполняем их в потоке
+    return await sync_to_async(lambda: serializer_class(*args, **kwargs).data)()
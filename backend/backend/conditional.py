@@ -0,0 +1,85 @@
+import hashlib
+import logging
+import time
+
+from django.http import HttpResponseNotModified
+from django.utils.http import parse_etags
+from rest_framework.response import Response
+
+from backend.versioning import get_versions, version_key
+
+logger = logging.getLogger(__name__)
+
+
+class NotModified(Exception):
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
+
+
+class ConditionalVersionMixin:
+    """
+    ETag/304 для вьюх, которые объявили зависимости:
+        version_dependencies - общие модели/области
+        user_version_dependencies - данные конкретного пользователя
+        conditional_methods - методы, для которых считается ETag (по умолчанию только GET)
+        version_max_age - время жизни ETag в секундах (для данных с истекающими ссылками, например Vimeo)
+    ETag считается в initial() после аутентификации, прав и throttling, только из счетчиков версий,
+    поэтому ответ отдается до выполнения обработчика и сериализации.
+    На GET отдается 304. 304 на POST нестандартен (прокси и HTTP клиенты его не ожидают), поэтому на остальные
+    методы отдается 200 с {'not_modified': true} и тем же ETag - клиент использует сохраненный ответ.
+    """
+    conditional_methods = ('GET',)
+    version_dependencies = None
+    user_version_dependencies = ()
+    version_max_age = None
+    version_etag = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.version_etag = None
+        if self.version_dependencies is None or request.method not in self.conditional_methods:
+            return
+        user = request.user
+        if not user.is_authenticated:
+            return
+
+        keys = [version_key(dependency) for dependency in self.version_dependencies]
+        keys += [version_key(dependency, user.pk) for dependency in self.user_version_dependencies]
+        try:
+            versions = get_versions(keys)
+        except Exception:
+            # Без кэша просто отдаем полный ответ
+            logger.exception('Could not read data versions')
+            return
+
+        etag = self.make_etag(request, user, [versions[key] for key in keys])
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            if request.method in ('GET', 'HEAD'):
+                response = HttpResponseNotModified()
+            else:
+                response = Response({'not_modified': True})
+            response['ETag'] = etag
+            raise NotModified(response)
+        self.version_etag = etag
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.version_etag and response.status_code == 200 and not response.has_header('ETag'):
+            response['ETag'] = self.version_etag
+        return response
+
+    def make_etag(self, request, user, versions):
+        parts = [request.path, request.META.get('QUERY_STRING', ''), str(user.pk), user.user_type]
+        if request.method != 'GET':
+            parts.append(hashlib.md5(request.body).hexdigest())
+        if self.version_max_age:
+            parts.append(str(int(time.time() // self.version_max_age)))
+        parts += [str(version) for version in versions]
+        return '"%s"' % hashlib.md5('|'.join(parts).encode()).hexdigest()
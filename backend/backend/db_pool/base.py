@@ -0,0 +1,86 @@
+"""
+PostgreSQL с пулом соединений процесса: ENGINE = 'backend.db_pool', параметры пула в OPTIONS['pool'] (см. ConnectionPool).
+Вместе с CONN_MAX_AGE = 0: в конце запроса или задачи django-q соединение не закрывается, а возвращается в пул.
+"""
+from functools import partial
+
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base, creation
+from django.utils.asyncio import async_unsafe
+
+from backend.db_pool.pool import PoolTimeout, close_pool, get_pool
+
+# PGTransactionStatusType из libpq, одинаковые значения в psycopg2 и psycopg
+TRANSACTION_STATUS_IDLE = 0
+TRANSACTION_STATUS_INTRANS = 2
+TRANSACTION_STATUS_INERROR = 3
+
+
+def pool_name(alias, settings_dict) -> str:
+    # Тестовая БД подменяет NAME у того же alias, соединения к разным БД не должны смешиваться
+    return f'{alias}:{settings_dict["HOST"] or "local"}:{settings_dict["PORT"] or ""}/{settings_dict["NAME"]}'
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Свободные соединения пула к тестовой БД не дают выполнить DROP DATABASE
+        close_pool(pool_name(self.connection.alias, {**self.connection.settings_dict, 'NAME': test_database_name}))
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    @property
+    def pool(self):
+        # Служебное соединение к БД postgres (создание/удаление тестовой БД) не кешируется
+        if self.alias == NO_DB_ALIAS:
+            return None
+        return get_pool(pool_name(self.alias, self.settings_dict), **self.settings_dict['OPTIONS'].get('pool', {}))
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        conn_params.pop('pool', None)
+        return conn_params
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        try:
+            connection = pool.getconn(partial(super().get_new_connection, conn_params), self._check_connection)
+        except PoolTimeout as e:
+            raise self.Database.OperationalError(str(e)) from e
+
+        # Для соединения из пула get_new_connection родителя не вызывается, уровень изоляции выставляется здесь
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        self.isolation_level = (
+            base.IsolationLevel.READ_COMMITTED if isolation_level is None else base.IsolationLevel(isolation_level)
+        )
+        return connection
+
+    def _close(self):
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+        if self.in_atomic_block:
+            # Внутри atomic Django сохраняет ссылку на закрытое соединение, поэтому в пул оно не возвращается
+            pool.putconn(self.connection, lambda connection: False)
+        else:
+            pool.putconn(self.connection, self._reset_connection)
+
+    @staticmethod
+    def _check_connection(connection):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+    @staticmethod
+    def _reset_connection(connection):
+        if connection.closed:
+            return False
+        status = connection.info.transaction_status
+        if status in (TRANSACTION_STATUS_INTRANS, TRANSACTION_STATUS_INERROR):
+            connection.rollback()
+            return True
+        return status == TRANSACTION_STATUS_IDLE
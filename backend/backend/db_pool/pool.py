@@ -0,0 +1,237 @@
+"""
+Ограниченный пул соединений с БД внутри процесса.
+Безопасен для потоков (ASGI thread executor) и для форков (воркеры django-q): после fork пул создается заново,
+унаследованные от родителя соединения не используются и не закрываются.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class PooledConnection:
+    __slots__ = ('connection', 'created_at', 'returned_at')
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = self.returned_at = time.monotonic()
+
+
+class ConnectionPool:
+    """
+    max_size - максимум соединений процесса (выданных + свободных)
+    min_size - сколько свободных соединений держать, остальные закрываются после max_idle секунд простоя
+    timeout - сколько ждать свободного соединения, после этого PoolTimeout
+    max_lifetime - соединение старше закрывается при возврате в пул
+    check_interval - соединение, простоявшее дольше, проверяется запросом перед выдачей
+    """
+
+    def __init__(self, name, max_size=10, min_size=0, timeout=10.0, max_lifetime=3600.0, max_idle=600.0,
+                 check_interval=30.0):
+        self.name = name
+        self.max_size = max_size
+        self.min_size = min_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.check_interval = check_interval
+
+        self.pid = os.getpid()
+        self.condition = threading.Condition()
+        self.idle = deque()
+        self.in_use = {}
+        self.waiting = 0
+        self.stats = {
+            'requests': 0,
+            'waits': 0,
+            'wait_time_total_ms': 0.0,
+            'timeouts': 0,
+            'created': 0,
+            'closed': 0,
+            'health_check_failures': 0,
+        }
+
+    @property
+    def size(self):
+        return len(self.idle) + len(self.in_use)
+
+    def getconn(self, connect, check):
+        """
+        connect() открывает новое соединение, check(connection) проверяет соединение (исключение - неисправно)
+        """
+        start = time.monotonic()
+        with self.condition:
+            self.stats['requests'] += 1
+            pooled = self._take_idle()
+            if pooled is None and self.size >= self.max_size:
+                self.stats['waits'] += 1
+                self.waiting += 1
+                try:
+                    pooled = self._wait_idle(start)
+                finally:
+                    self.waiting -= 1
+                    self.stats['wait_time_total_ms'] += (time.monotonic() - start) * 1000
+            # Место под соединение занимается сразу, чтобы другие потоки не превысили max_size
+            if pooled is not None:
+                self.in_use[id(pooled.connection)] = pooled
+            else:
+                reserved = object()
+                self.in_use[id(reserved)] = reserved
+
+        if pooled is not None:
+            if time.monotonic() - pooled.returned_at < self.check_interval or self._is_healthy(pooled, check):
+                return pooled.connection
+            # Неисправное соединение уже закрыто, его место занимает новое
+            with self.condition:
+                del self.in_use[id(pooled.connection)]
+                reserved = object()
+                self.in_use[id(reserved)] = reserved
+
+        try:
+            pooled = PooledConnection(connect())
+        except Exception:
+            with self.condition:
+                del self.in_use[id(reserved)]
+                self.condition.notify()
+            raise
+        with self.condition:
+            del self.in_use[id(reserved)]
+            self.in_use[id(pooled.connection)] = pooled
+            self.stats['created'] += 1
+        return pooled.connection
+
+    def putconn(self, connection, reset):
+        """
+        reset(connection) возвращает соединение в исходное состояние и говорит, можно ли его переиспользовать
+        """
+        with self.condition:
+            pooled = self.in_use.pop(id(connection), None)
+            if pooled is None:
+                # Соединение открыто до форка или не из этого пула
+                return
+            self.condition.notify()
+
+        now = time.monotonic()
+        reusable = now - pooled.created_at < self.max_lifetime and self._reset(connection, reset)
+        if not reusable:
+            self._close(pooled)
+            return
+
+        pooled.returned_at = now
+        with self.condition:
+            self.idle.append(pooled)
+            expired = self._expire_idle(now)
+        for item in expired:
+            self._close(item)
+
+    def close_all(self):
+        with self.condition:
+            idle, self.idle = list(self.idle), deque()
+        for pooled in idle:
+            self._close(pooled)
+
+    def snapshot(self):
+        with self.condition:
+            return {
+                'name': self.name,
+                'pid': self.pid,
+                'max_size': self.max_size,
+                'size': self.size,
+                'in_use': len(self.in_use),
+                'idle': len(self.idle),
+                'waiting': self.waiting,
+                **self.stats,
+            }
+
+    def _take_idle(self):
+        # Последнее возвращенное соединение "теплее" и скорее всего исправно
+        while self.idle:
+            pooled = self.idle.pop()
+            if pooled.connection.closed:
+                self.stats['closed'] += 1
+                continue
+            return pooled
+        return None
+
+    def _wait_idle(self, start):
+        while True:
+            remaining = self.timeout - (time.monotonic() - start)
+            if remaining <= 0:
+                self.stats['timeouts'] += 1
+                raise PoolTimeout(
+                    f'Connection pool "{self.name}" exhausted: {self.max_size} connections in use for {self.timeout}s')
+            self.condition.wait(remaining)
+            pooled = self._take_idle()
+            if pooled is not None:
+                return pooled
+            if self.size < self.max_size:
+                return None
+
+    def _expire_idle(self, now):
+        expired = []
+        while len(self.idle) > self.min_size and now - self.idle[0].returned_at > self.max_idle:
+            expired.append(self.idle.popleft())
+        return expired
+
+    def _is_healthy(self, pooled, check):
+        try:
+            check(pooled.connection)
+            return True
+        except Exception:
+            logger.info('Pooled connection "%s" failed health check', self.name, exc_info=True)
+            with self.condition:
+                self.stats['health_check_failures'] += 1
+            self._close(pooled)
+            return False
+
+    def _reset(self, connection, reset):
+        try:
+            return reset(connection)
+        except Exception:
+            logger.info('Could not reset pooled connection "%s"', self.name, exc_info=True)
+            return False
+
+    def _close(self, pooled):
+        try:
+            pooled.connection.close()
+        except Exception:
+            pass
+        with self.condition:
+            self.stats['closed'] += 1
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+# Пулы, унаследованные от родительского процесса: ссылки держатся, чтобы сборщик мусора не закрыл
+# соединения родителя через общий сокет
+_inherited_pools = []
+
+
+def get_pool(name, **options) -> ConnectionPool:
+    pool = _pools.get(name)
+    if pool is None or pool.pid != os.getpid():
+        with _pools_lock:
+            pool = _pools.get(name)
+            if pool is None or pool.pid != os.getpid():
+                if pool is not None:
+                    _inherited_pools.append(pool)
+                pool = _pools[name] = ConnectionPool(name, **options)
+    return pool
+
+
+def close_pool(name):
+    pool = _pools.get(name)
+    if pool is not None and pool.pid == os.getpid():
+        pool.close_all()
+
+
+def pools_snapshot():
+    pid = os.getpid()
+    return [pool.snapshot() for pool in list(_pools.values()) if pool.pid == pid]
@@ -0,0 +1,180 @@
+"""
+Чтение с реплик для read-only эндпоинтов и отчетов.
+Реплики используются только внутри запроса, помеченного @read_only, или внутри use_replicas(), остальное - в default.
+Реплика пропускается, если ее отставание больше REPLICA_MAX_LAG секунд. После записи пользователь читает из default
+REPLICA_PIN_SECONDS секунд, чтобы сразу видеть свои ответы.
+"""
+import contextvars
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.functional import SimpleLazyObject, empty
+
+logger = logging.getLogger(__name__)
+
+REPLICA_MAX_LAG = getattr(settings, 'REPLICA_MAX_LAG', 2.0)
+REPLICA_PIN_SECONDS = getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+REPLICA_LAG_CHECK_INTERVAL = getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', 5.0)
+
+# Реплика догнала primary - отставание 0, иначе время с последней примененной транзакции
+REPLICA_LAG_SQL = (
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+)
+
+
+def read_only(view):
+    """
+    Маркер для функции-вьюхи, класса вьюхи или метода (action) viewset: чтения запроса идут на реплику
+    """
+    view.read_only = True
+    return view
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS]
+
+
+def pin_key(user_id) -> str:
+    return f'db:primary_pin:user:{user_id}'
+
+
+def pin_to_primary(user_id):
+    cache.set(pin_key(user_id), True, timeout=REPLICA_PIN_SECONDS)
+
+
+class ReplicaLag:
+    """
+    Отставание реплик, проверяется не чаще раза в REPLICA_LAG_CHECK_INTERVAL на процесс
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checked_at = {}
+        self.lag = {}
+
+    def get(self, alias):
+        now = time.monotonic()
+        if now - self.checked_at.get(alias, 0) >= REPLICA_LAG_CHECK_INTERVAL and self.lock.acquire(blocking=False):
+            # Проверяет один поток, остальные пока используют прошлое значение
+            try:
+                self.checked_at[alias] = now
+                self.lag[alias] = self.measure(alias)
+            finally:
+                self.lock.release()
+        return self.lag.get(alias)
+
+    @staticmethod
+    def measure(alias):
+        connection = connections[alias]
+        if connection.vendor != 'postgresql':
+            return 0.0
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(REPLICA_LAG_SQL)
+                lag = cursor.fetchone()[0]
+        except Exception:
+            logger.warning('Replica "%s" is unavailable', alias, exc_info=True)
+            return None
+        return float(lag or 0)
+
+    def available(self, alias) -> bool:
+        lag = self.get(alias)
+        return lag is not None and lag <= REPLICA_MAX_LAG
+
+
+replica_lag = ReplicaLag()
+
+
+class RoutingState:
+    def __init__(self, request=None):
+        self.request = request
+        self.read_only = False
+        self.wrote = False
+        self.pinned = None
+        self.replica = None
+
+    @property
+    def user_id(self):
+        # request.user не вычисляется здесь: ленивая загрузка пользователя сама обращается к БД через роутер
+        user = getattr(self.request, '__dict__', {}).get('user')
+        if isinstance(user, SimpleLazyObject):
+            user = None if user._wrapped is empty else user._wrapped
+        if user is None or not user.is_authenticated:
+            return None
+        return user.pk
+
+    def is_pinned(self):
+        if self.pinned is None:
+            user_id = self.user_id
+            if user_id is None:
+                return False
+            self.pinned = bool(cache.get(pin_key(user_id)))
+        return self.pinned
+
+    def read_alias(self):
+        # default возвращается явно: иначе Django читает связанные объекты из БД экземпляра, полученного с реплики
+        if not self.read_only or self.wrote or connections[DEFAULT_DB_ALIAS].in_atomic_block or self.is_pinned():
+            return DEFAULT_DB_ALIAS
+        if self.replica is None:
+            # Одна реплика на весь запрос, чтобы чтения были согласованы между собой
+            candidates = [alias for alias in replica_aliases() if replica_lag.available(alias)]
+            self.replica = random.choice(candidates) if candidates else DEFAULT_DB_ALIAS
+        return self.replica
+
+
+_state = contextvars.ContextVar('db_routing_state', default=None)
+
+
+@contextmanager
+def routing_state(request=None):
+    token = _state.set(RoutingState(request))
+    try:
+        yield _state.get()
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def use_replicas():
+    """
+    Чтения внутри блока идут на реплику, например для тяжелых отчетов вне запроса
+    """
+    state = _state.get()
+    if state is None:
+        with routing_state() as state:
+            state.read_only = True
+            yield
+        return
+    read_only_before, state.read_only = state.read_only, True
+    try:
+        yield
+    finally:
+        state.read_only = read_only_before
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None:
+            return None
+        return state.read_alias()
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На репликах те же данные, что и в default
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,33 @@
+"""
+Firebase Admin SDK инициализируется при первом использовании, а не при импорте настроек:
+manage.py, воркеры django-q и перезапуски daphne не загружают SDK и ключ сервисного аккаунта, пока он не нужен.
+"""
+import json
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+
+_app_lock = threading.Lock()
+
+
+def get_firebase_app():
+    import firebase_admin
+    from firebase_admin import credentials
+
+    with _app_lock:
+        try:
+            return firebase_admin.get_app()
+        except ValueError:
+            return firebase_admin.initialize_app(credentials.Certificate(settings.FIREBASE_CREDENTIALS_FILE))
+
+
+@lru_cache(maxsize=None)
+def credentials_project_id():
+    with open(settings.FIREBASE_CREDENTIALS_FILE) as f:
+        return json.load(f)['project_id']
+
+
+def firebase_project_id() -> str:
+    # Для проверки токенов SDK не нужен, достаточно project_id из файла ключа
+    return settings.FIREBASE_PROJECT_ID or credentials_project_id()
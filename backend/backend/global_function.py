@@ -1,5 +1,7 @@
 import uuid
 
+from django.db import models, transaction
+from django.dispatch import Signal
 from django.utils.deconstruct import deconstructible
 from rest_framework import status
 from rest_framework.response import Response
@@ -7,6 +9,11 @@ from rest_framework.exceptions import ValidationError
 from rest_framework.views import exception_handler
 from rest_framework import serializers
 
+from backend.versioning import bump_versions
+
+# bulk_create не отправляет post_save: bulk_create_nested отправляет этот сигнал (sender - модель, objects - созданные)
+bulk_created = Signal()
+
 
 def error_with_text(text):
     return Response({'message': text}, status=status.HTTP_400_BAD_REQUEST)
@@ -65,49 +72,86 @@ class ModelIntegerField(serializers.IntegerField):
             return self.model.objects.get(id=value)
         raise ValueError('HEY! value needs to be INT')
 
+    def get_instances(self, values) -> dict:
+        """
+        Один in_bulk на все значения поля вместо get() на каждое
+        """
+        if any(type(value) != int for value in values):
+            raise ValueError('HEY! value needs to be INT')
+        instances = self.model.objects.in_bulk(set(values))
+        missing = set(values) - instances.keys()
+        if missing:
+            raise ValidationError(f'{self.model.__name__} not found: {sorted(missing)}')
+        return instances
+
+
+def bulk_create_nested(serializer, items: list, created_models: set) -> list:
+    """
+    Создает объекты serializer.Meta.model для всех items (провалидированные данные) одним bulk_create.
+    Вложенные одиночные сериализаторы (внешние ключи) создаются до родителя, списки - после, тоже уровнем целиком.
+    bulk_create не вызывает save(), поэтому перед вставкой вызывается before_save() модели, если он есть.
+    """
+    if not items:
+        return []
+    model = serializer.Meta.model
+    rows = [{} for _ in items]
+    list_fields = []
+
+    for field in serializer._writable_fields:
+        if field.source == '*':
+            continue
+        key = field.source_attrs[0]
+        present = [(row, item[key]) for row, item in zip(rows, items) if key in item]
+
+        if isinstance(field, serializers.ListSerializer):
+            list_fields.append((key, field.child))
+        elif isinstance(field, serializers.BaseSerializer):
+            present = [(row, value) for row, value in present if value is not None]
+            instances = bulk_create_nested(field, [value for _, value in present], created_models)
+            for (row, _), instance in zip(present, instances):
+                row[key] = instance
+        elif isinstance(field, ModelIntegerField):
+            # Обратная ссылка на только что созданного родителя уже является объектом
+            ids = [value['id'] for _, value in present if not isinstance(value, models.Model)]
+            instances = field.get_instances(ids) if ids else {}
+            for row, value in present:
+                row[key] = value if isinstance(value, models.Model) else instances[value['id']]
+        else:
+            for row, value in present:
+                row[key] = value
+
+    objects = [model(**row) for row in rows]
+    for obj in objects:
+        if hasattr(obj, 'before_save'):
+            obj.before_save()
+    model.objects.bulk_create(objects)
+    created_models.add(model)
+    bulk_created.send(sender=model, objects=objects)
+
+    for key, child in list_fields:
+        back_reference = serializer.get_this_class_name_inside_another_serializer_fields(child)
+        if back_reference:
+            back_reference = child.fields[back_reference].source_attrs[0]
+        children = []
+        for obj, item in zip(objects, items):
+            for data in item.get(key) or []:
+                children.append({**data, back_reference: obj} if back_reference else data)
+        bulk_create_nested(child, children, created_models)
+
+    return objects
+
 
 class NestedSupportedModelSerializer(serializers.ModelSerializer):
+    """
+    create() сохраняет все дерево: данные уже провалидированы целиком в is_valid(), каждый уровень вставляется
+    одним bulk_create, поэтому число запросов зависит от глубины дерева, а не от числа объектов.
+    """
 
     def create(self, validated_data):
-        this_class_data = {}
-        many_serializers_data = {}
-        single_serializers_data = {}
-        for data_key in self.validated_data.keys():
-            data_value = self.validated_data[data_key]
-            field_value = self.fields.get(data_key)
-            if isinstance(field_value, serializers.BaseSerializer):
-                if isinstance(field_value, serializers.ListSerializer) and data_value is not None:
-                    many_serializers_data[data_key] = data_value
-                elif data_value is not None:
-                    single_serializers_data[data_key] = data_value
-            else:
-                if isinstance(field_value, ModelIntegerField):
-                    data_value = field_value.get_instance(data_value['id'])
-                this_class_data[data_key] = data_value
-
-        for key in single_serializers_data.keys():
-            serializer = self.fields[key]
-            serializer = serializer.__class__(data=single_serializers_data[key])
-
-            if not serializer.is_valid():
-                raise ValidationError(f'[S] Error in {key} field: {serializer.errors}')
-
-            this_class_data[key] = serializer.save()
-
-        this_class_instance = self.Meta.model(**this_class_data)
-        this_class_instance.save()
-
-        for key in many_serializers_data.keys():
-            serializer = self.fields[key].child
-            for data in many_serializers_data[key]:
-                a = self.get_this_class_name_inside_another_serializer_fields(serializer)
-                if a:
-                    data[a] = this_class_instance.id
-                a = serializer.__class__(data=data)
-                if not a.is_valid():
-                    raise ValidationError(f'[M] Error in {key} field: {a.errors}')
-                a.save()
-
+        created_models = set()
+        with transaction.atomic():
+            this_class_instance, = bulk_create_nested(self, [validated_data], created_models)
+            transaction.on_commit(lambda: bump_versions(*created_models))
         return this_class_instance
 
     def get_this_class_name_inside_another_serializer_fields(self, other_serializer):
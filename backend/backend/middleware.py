@@ -0,0 +1,57 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from backend.db_router import pin_to_primary, routing_state
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Состояние роутера реплик на время запроса (backend.db_router):
+    для вьюх с @read_only чтения идут на реплику, после записи пользователь закрепляется за default.
+    Состояние хранится в contextvar, поэтому под ASGI оно видно и в потоках sync_to_async.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with routing_state(request) as state:
+            request._routing_state = state
+            response = self.get_response(request)
+            user_id = state.user_id
+            if state.wrote and user_id is not None:
+                pin_to_primary(user_id)
+        return response
+
+    async def __acall__(self, request):
+        with routing_state(request) as state:
+            request._routing_state = state
+            response = await self.get_response(request)
+            user_id = state.user_id
+            if state.wrote and user_id is not None:
+                await sync_to_async(pin_to_primary)(user_id)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self.is_read_only(request, view_func):
+            request._routing_state.read_only = True
+        return None
+
+    @staticmethod
+    def is_read_only(request, view_func):
+        if getattr(view_func, 'read_only', False):
+            return True
+        view_class = getattr(view_func, 'cls', None)
+        if view_class is None:
+            return False
+        if getattr(view_class, 'read_only', False):
+            return True
+        # Для viewset отмечается отдельный action
+        actions = getattr(view_func, 'actions', None) or {}
+        handler_name = actions.get(request.method.lower(), request.method.lower())
+        return getattr(getattr(view_class, handler_name, None), 'read_only', False)
@@ -0,0 +1,13 @@
+"""
+Клиент Redis для данных приложения, которые не должны пропадать при очистке кэша (буферы отложенной записи и т.п.)
+"""
+from functools import lru_cache
+
+import redis
+from django.conf import settings
+
+
+@lru_cache(maxsize=None)
+def get_redis() -> redis.Redis:
+    return redis.Redis(host=settings.REDIS_HOST, port=int(settings.REDIS_PORT), db=settings.REDIS_DATA_DB,
+                       decode_responses=True)
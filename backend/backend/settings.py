@@ -1,9 +1,7 @@
 import os
 from pathlib import Path
 
-import firebase_admin
 from django.utils import timezone
-from firebase_admin import credentials
 
 RUNNING_FROM_DOCKER = os.environ.get('RUNNING_FROM_DOCKER', False)
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -45,6 +43,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'lms.apps.reports.middleware.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     "corsheaders.middleware.CorsMiddleware",
@@ -53,6 +52,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'backend.middleware.ReplicaRoutingMiddleware',
 ]
 
 CORS_ALLOW_ALL_ORIGINS = True
@@ -93,24 +93,50 @@ REST_FRAMEWORK = {
     'EXCEPTION_HANDLER': 'backend.global_function.custom_exception_handler',
 }
 
-# Firebase
-cred = credentials.Certificate("service_account.json")
-firebase_admin.initialize_app(cred)
-print("Firebase admin is initialized")
+# Firebase: SDK инициализируется при первом использовании (backend.firebase.get_firebase_app).
+# ID токены проверяются на месте (api_users.firebase_tokens), ключи Google кэшируются по Cache-Control.
+# Для разработки без сети: FIREBASE_KEY_PROVIDER=api_users.firebase_tokens.LocalKeyProvider и FIREBASE_LOCAL_PUBLIC_KEYS
+FIREBASE_CREDENTIALS_FILE = os.environ.get("FIREBASE_CREDENTIALS_FILE", "service_account.json")
+# Пустой - project_id из FIREBASE_CREDENTIALS_FILE
+FIREBASE_PROJECT_ID = os.environ.get("FIREBASE_PROJECT_ID", "")
+FIREBASE_KEY_PROVIDER = os.environ.get("FIREBASE_KEY_PROVIDER", "api_users.firebase_tokens.GoogleCertsProvider")
+FIREBASE_LOCAL_PUBLIC_KEYS = {}
 
 # Database
 
 if RUNNING_FROM_DOCKER:
+    # Пул соединений процесса (backend.db_pool): соединение возвращается в пул в конце каждого запроса/задачи.
+    # POSTGRES_POOL_MAX_SIZE=0 - без пула, постоянные соединения Django на CONN_MAX_AGE секунд
+    POSTGRES_POOL_MAX_SIZE = int(os.environ.get("POSTGRES_POOL_MAX_SIZE", 10))
     DATABASES = {
         "default": {
-            "ENGINE": 'django.db.backends.postgresql',
+            "ENGINE": 'backend.db_pool' if POSTGRES_POOL_MAX_SIZE else 'django.db.backends.postgresql',
             "NAME": os.environ.get("POSTGRES_DB"),
             "USER": os.environ.get("POSTGRES_USER"),
             "PASSWORD": os.environ.get("POSTGRES_PASSWORD"),
             "HOST": os.environ.get("POSTGRES_HOST"),
             "PORT": os.environ.get("POSTGRES_PORT"),
+            "CONN_MAX_AGE": 0 if POSTGRES_POOL_MAX_SIZE else int(os.environ.get("POSTGRES_CONN_MAX_AGE", 60)),
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {
+                "pool": {
+                    "max_size": POSTGRES_POOL_MAX_SIZE,
+                    "min_size": int(os.environ.get("POSTGRES_POOL_MIN_SIZE", 2)),
+                    "timeout": float(os.environ.get("POSTGRES_POOL_TIMEOUT", 10)),
+                    "max_lifetime": float(os.environ.get("POSTGRES_POOL_MAX_LIFETIME", 3600)),
+                },
+            } if POSTGRES_POOL_MAX_SIZE else {},
         }
     }
+    # Реплики только для чтения: "host[:port] host[:port]", используются вьюхами с @read_only и отчетами
+    for index, replica in enumerate(os.environ.get("POSTGRES_REPLICA_HOSTS", "").split(), start=1):
+        replica_host, _, replica_port = replica.partition(":")
+        DATABASES[f"replica_{index}"] = {
+            **DATABASES["default"],
+            "HOST": replica_host,
+            "PORT": replica_port or DATABASES["default"]["PORT"],
+            "TEST": {"MIRROR": "default"},
+        }
 
 else:
     DATABASES = {
@@ -120,6 +146,10 @@ else:
         }
     }
 
+DATABASE_ROUTERS = ['backend.db_router.ReplicaRouter']
+REPLICA_MAX_LAG = float(os.environ.get("REPLICA_MAX_LAG", 2))
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", 10))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -161,6 +191,10 @@ STATICFILES_DIRS = (
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "mediafiles"
 
+# Опубликованные уроки (api_lessons/static_render.py). Отдельно от STATIC_ROOT: collectstatic --clear их не удаляет
+LESSON_STATIC_URL = "/lesson-files/"
+LESSON_STATIC_ROOT = BASE_DIR / "lessonfiles"
+
 # Logging
 LOGGING = {}
 
@@ -199,6 +233,21 @@ if RUNNING_FROM_DOCKER:
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+REDIS_HOST = os.environ.get('REDIS_HOST', "127.0.0.1")
+REDIS_PORT = os.environ.get('REDIS_PORT', '6379')
+# База для данных приложения вне кэша (backend/redis_client.py), 1 занята кэшем
+REDIS_DATA_DB = int(os.environ.get('REDIS_DATA_DB', 2))
+# База брокера django-q
+REDIS_TASKS_DB = int(os.environ.get('REDIS_TASKS_DB', 3))
+
+# Брокер django-q: Redis в docker, локально опрос таблицы в БД (TASK_BROKER=orm)
+TASK_BROKER = os.environ.get('TASK_BROKER', 'redis' if RUNNING_FROM_DOCKER else 'orm')
+
+# Очереди задач (backend/task_queues.py): основной кластер 'backend' и отдельные кластеры ALT_CLUSTERS
+# со своими воркерами, запуск: Q_CLUSTER_NAME=<очередь> python manage.py qcluster.
+# Очередь включается после запуска ее воркеров: TASK_QUEUES_ENABLED="interactive bulk" и migrate (переносит расписания).
+# Без этого все задачи выполняет основной кластер
+TASK_QUEUES_ENABLED = os.environ.get('TASK_QUEUES_ENABLED', '').split()
 Q_CLUSTER = {
     'name': 'backend',
     'workers': 3,
@@ -209,21 +258,57 @@ Q_CLUSTER = {
     'queue_limit': 500,
     'cpu_affinity': 1,
     'label': 'Django Q2',
-    'orm': 'default',
     'ack_failures': True,
     'max_attempts': 1,
-    'attempt_count': 1
+    'attempt_count': 1,
+    'ALT_CLUSTERS': {
+        # Побочные эффекты действий пользователя: короткие задачи, не ждут за массовыми пересчетами
+        'interactive': {
+            'workers': int(os.environ.get('Q_INTERACTIVE_WORKERS', 2)),
+            'timeout': 30,
+            'retry': 60,
+        },
+        # Массовые пересчеты и сборки: ограниченная параллельность, длинный таймаут
+        'bulk': {
+            'workers': int(os.environ.get('Q_BULK_WORKERS', 1)),
+            'timeout': 1800,
+            'retry': 1860,
+            'recycle': 50,
+        },
+    },
 }
+if TASK_BROKER == 'redis':
+    Q_CLUSTER['redis'] = {'host': REDIS_HOST, 'port': int(REDIS_PORT), 'db': REDIS_TASKS_DB}
+else:
+    Q_CLUSTER['orm'] = 'default'
+
+# Буфер отложенной записи частых полей (backend/write_behind.py): Redis в docker, локально запись сразу.
+# Буфер в памяти ('memory') не подходит: сброс идет в qcluster, который не видит память веб-процесса
+WRITE_BEHIND_BACKEND = 'redis' if RUNNING_FROM_DOCKER else 'sync'
 
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
         "CONFIG": {
-            "hosts": [(os.environ.get('REDIS_HOST', "127.0.0.1"), os.environ.get('REDIS_PORT', '6379'))],
+            "hosts": [(REDIS_HOST, REDIS_PORT)],
         },
     },
 }
 
+if RUNNING_FROM_DOCKER:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": f"redis://{REDIS_HOST}:{REDIS_PORT}/1",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
 if RUNNING_FROM_DOCKER:
     PROTECTED_MEDIA_ROOT = "/home/app/protected/"
     PROTECTED_MEDIA_SERVER = "nginx"
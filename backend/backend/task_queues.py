@@ -0,0 +1,86 @@
+"""
+Очереди задач django-q. Очередь - это кластер (Q_CLUSTER['ALT_CLUSTERS']) со своими воркерами и таймаутом:
+интерактивные побочные эффекты не ждут за массовыми пересчетами, а пересчеты не занимают больше своих воркеров.
+Задача попадает в очередь по TASK_ROUTES или явному queue. Упавшие задачи остаются в django_q Failure
+(очередь недоставленных), их можно поставить заново requeue_failed_tasks.
+
+Отдельные очереди включаются явно (settings.TASK_QUEUES_ENABLED), когда для них запущены воркеры
+(Q_CLUSTER_NAME=<очередь> python manage.py qcluster). Пока очередь не включена, ее задачи и расписания
+выполняет основной кластер, поэтому развертывание только с основным qcluster продолжает работать.
+"""
+from django.conf import settings
+from django.db.models import Q
+from django_q.models import Failure, Schedule
+from django_q.tasks import async_task
+
+QUEUE_DEFAULT = settings.Q_CLUSTER['name']
+QUEUE_INTERACTIVE = 'interactive'
+QUEUE_BULK = 'bulk'
+TASK_QUEUES = (QUEUE_INTERACTIVE, QUEUE_DEFAULT, QUEUE_BULK)
+
+TASK_ROUTES = {
+    'api_users.tasks.flush_last_login': QUEUE_INTERACTIVE,
+    'api_users.tasks.refresh_friend_suggestions': QUEUE_BULK,
+    'api_lessons.tasks.build_lesson_pack': QUEUE_BULK,
+    'api_lessons.tasks.prune_content_changes': QUEUE_BULK,
+}
+
+
+def enabled_queue(queue: str) -> str:
+    # Выключенная очередь заменяется основным кластером
+    return queue if queue == QUEUE_DEFAULT or queue in settings.TASK_QUEUES_ENABLED else QUEUE_DEFAULT
+
+
+def queue_for(func: str) -> str:
+    return enabled_queue(TASK_ROUTES.get(func, QUEUE_DEFAULT))
+
+
+def enqueue(func: str, *args, queue=None, **kwargs):
+    return async_task(func, *args, cluster=enabled_queue(queue) if queue else queue_for(func), **kwargs)
+
+
+def route_schedules(schedule_model=Schedule) -> int:
+    """
+    Расписания задач из TASK_ROUTES переводятся в их очередь, если она включена, иначе в основной кластер.
+    Расписание с cluster другой очереди выполняет только ее планировщик. Вызывается после migrate,
+    schedule_model - историческая модель в миграциях
+    """
+    updated = 0
+    for func in TASK_ROUTES:
+        queue = queue_for(func)
+        updated += schedule_model.objects.filter(func=func).update(cluster=None if queue == QUEUE_DEFAULT else queue)
+    return updated
+
+
+def task_queue(cluster) -> str:
+    # Задачи, поставленные без cluster, выполняет основной кластер
+    return cluster or QUEUE_DEFAULT
+
+
+def in_queue(queue: str) -> Q:
+    condition = Q(cluster=queue)
+    if queue == QUEUE_DEFAULT:
+        condition |= Q(cluster__isnull=True)
+    return condition
+
+
+def failed_tasks(queue=None):
+    failures = Failure.objects.all()
+    return failures if queue is None else failures.filter(in_queue(queue))
+
+
+def requeue_failed_tasks(queue=None, ids=None) -> int:
+    """
+    Ставит упавшие задачи заново в их очередь и удаляет их из Failure
+    """
+    failures = failed_tasks(queue)
+    if ids is not None:
+        failures = failures.filter(id__in=ids)
+    requeued = []
+    for failure in failures:
+        async_task(failure.func, *failure.args or (), cluster=enabled_queue(task_queue(failure.cluster)),
+                   hook=failure.hook,
+                   group=failure.group, **failure.kwargs or {})
+        requeued.append(failure.id)
+    Failure.objects.filter(id__in=requeued).delete()
+    return len(requeued)
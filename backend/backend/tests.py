@@ -0,0 +1,419 @@
+import importlib.util
+import json
+import threading
+import unittest
+from unittest import mock
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from rest_framework import serializers, viewsets
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+
+from api_users.models import UserModel
+from backend.async_api import AsyncAPIView, aserialize
+from backend.conditional import ConditionalVersionMixin
+from backend.db_pool import pool as db_pool
+from backend.db_pool.pool import ConnectionPool, PoolTimeout
+from backend.db_router import pin_key, read_only, replica_lag
+from backend.global_function import success_with_text
+from backend.middleware import ReplicaRoutingMiddleware
+from backend.versioning import bump_user_versions, bump_versions
+
+
+class UserNameSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+
+
+class AsyncUserView(AsyncAPIView):
+    async def get(self, request):
+        return success_with_text(await aserialize(UserNameSerializer, request.user))
+
+    async def post(self, request):
+        if 'name' not in request.data:
+            raise ValidationError('name is required')
+        return success_with_text(request.data['name'])
+
+
+class AsyncAdminView(AsyncAPIView):
+    permission_classes = [IsAdminUser]
+
+    async def get(self, request):
+        return success_with_text('ok')
+
+
+class AsyncAPIViewTest(TestCase):
+    factory = APIRequestFactory()
+
+    def setUp(self):
+        self.user = UserModel.objects.create(username='async', email='async@example.com', name='Async')
+        self.token = Token.objects.create(user=self.user)
+
+    def call(self, view_class, method, data=None, token=None):
+        headers = {'HTTP_AUTHORIZATION': f'Token {token}'} if token else {}
+        request = getattr(self.factory, method)('/', data, format='json', **headers)
+        view = view_class.as_view()
+        self.assertTrue(view_class.view_is_async)
+        return async_to_sync(view)(request)
+
+    def test_authenticated_request(self):
+        response = self.call(AsyncUserView, 'get', token=self.token.key)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['message'], {'id': self.user.pk, 'name': 'Async'})
+
+    def test_missing_or_invalid_token(self):
+        for token in (None, 'invalid'):
+            response = self.call(AsyncUserView, 'get', token=token)
+            self.assertEqual(response.status_code, 401)
+            self.assertIn('detail', response.data)
+
+    def test_blocked_user_and_permission_denied(self):
+        self.assertEqual(self.call(AsyncAdminView, 'get', token=self.token.key).status_code, 403)
+        UserModel.objects.filter(pk=self.user.pk).update(blocked=True)
+        self.assertEqual(self.call(AsyncUserView, 'get', token=self.token.key).status_code, 403)
+
+    def test_validation_error_goes_through_exception_handler(self):
+        response = self.call(AsyncUserView, 'post', {}, token=self.token.key)
+        self.assertEqual(response.status_code, 400)
+        # custom_exception_handler оборачивает ошибки валидации в {'message': ...}
+        self.assertEqual(response.data, {'message': ['name is required']})
+        self.assertEqual(self.call(AsyncUserView, 'post', {'name': 'x'}, token=self.token.key).data['message'], 'x')
+
+
+class VersionedView(ConditionalVersionMixin, APIView):
+    conditional_methods = ('GET', 'POST')
+    version_dependencies = ('test_content',)
+    user_version_dependencies = ('test_progress',)
+    calls = 0
+
+    def get(self, request):
+        VersionedView.calls += 1
+        return success_with_text(request.user.pk)
+
+    def post(self, request):
+        VersionedView.calls += 1
+        return success_with_text(request.data)
+
+
+class ExpiringVersionedView(VersionedView):
+    version_max_age = 60
+
+
+class AsyncVersionedView(AsyncAPIView):
+    version_dependencies = ('test_content',)
+
+    async def get(self, request):
+        VersionedView.calls += 1
+        return success_with_text(request.user.pk)
+
+
+class ConditionalVersionTest(TestCase):
+    factory = APIRequestFactory()
+
+    def setUp(self):
+        cache.clear()
+        VersionedView.calls = 0
+        self.users = [UserModel.objects.create(username=f'etag{index}', email=f'etag{index}@example.com')
+                      for index in range(2)]
+        self.tokens = [Token.objects.create(user=user).key for user in self.users]
+
+    def call(self, method='get', data=None, etag=None, user_index=0, view_class=VersionedView):
+        headers = {'HTTP_AUTHORIZATION': f'Token {self.tokens[user_index]}'} if user_index is not None else {}
+        if etag:
+            headers['HTTP_IF_NONE_MATCH'] = etag
+        request = getattr(self.factory, method)('/versioned/', data, format='json', **headers)
+        view = view_class.as_view()
+        response = async_to_sync(view)(request) if view_class.view_is_async else view(request)
+        return response.render() if hasattr(response, 'render') else response
+
+    def test_not_modified_for_matching_etag(self):
+        etag = self.call()['ETag']
+        response = self.call(etag=etag)
+        self.assertEqual((response.status_code, response['ETag'], VersionedView.calls), (304, etag, 1))
+        self.assertEqual(self.call(etag='"other"').status_code, 200)
+
+    def test_etag_per_user(self):
+        first = self.call()
+        # Токен проверяется один раз, в initial() вьюхи
+        with self.assertNumQueries(1):
+            second = self.call(user_index=1)
+        self.assertEqual(json.loads(second.content)['message'], self.users[1].pk)
+        self.assertNotEqual(first['ETag'], second['ETag'])
+
+    def test_permissions_checked_before_etag(self):
+        etag = self.call()['ETag']
+        self.assertEqual(self.call(etag=etag, user_index=None).status_code, 401)
+        with mock.patch.object(VersionedView, 'permission_classes', [IsAdminUser]):
+            response = self.call(etag=etag)
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertEqual(VersionedView.calls, 1)
+
+    def test_async_view(self):
+        etag = self.call(view_class=AsyncVersionedView)['ETag']
+        response = self.call(etag=etag, view_class=AsyncVersionedView)
+        self.assertEqual((response.status_code, response['ETag'], VersionedView.calls), (304, etag, 1))
+
+    def test_etag_changes_after_bump(self):
+        etag = self.call()['ETag']
+        bump_user_versions('test_progress', [self.users[1].pk])
+        self.assertEqual(self.call(etag=etag).status_code, 304)
+        bump_user_versions('test_progress', [self.users[0].pk])
+        self.assertEqual(self.call(etag=etag).status_code, 200)
+        etag = self.call()['ETag']
+        bump_versions('test_content')
+        self.assertEqual(self.call(etag=etag).status_code, 200)
+
+    def test_post_body_hash_and_not_modified_marker(self):
+        etag = self.call('post', {'lesson_id': 1})['ETag']
+        self.assertNotEqual(self.call('post', {'lesson_id': 2})['ETag'], etag)
+        response = self.call('post', {'lesson_id': 1}, etag=etag)
+        self.assertEqual((response.status_code, json.loads(response.content)), (200, {'not_modified': True}))
+        self.assertEqual(response['ETag'], etag)
+
+    def test_version_max_age(self):
+        with mock.patch('backend.conditional.time.time', return_value=6000):
+            etag = self.call(view_class=ExpiringVersionedView)['ETag']
+            self.assertEqual(self.call(etag=etag, view_class=ExpiringVersionedView).status_code, 304)
+        with mock.patch('backend.conditional.time.time', return_value=6060):
+            self.assertEqual(self.call(etag=etag, view_class=ExpiringVersionedView).status_code, 200)
+
+
+class FakeConnection:
+    def __init__(self, transaction_status=0):
+        self.closed = False
+        self.rollbacks = 0
+        self.info = mock.Mock(transaction_status=transaction_status)
+
+    def close(self):
+        self.closed = True
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.info.transaction_status = 0
+
+
+def healthy(connection):
+    pass
+
+
+def broken(connection):
+    raise OSError('server closed the connection unexpectedly')
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    def test_checkout_timeout(self):
+        pool = ConnectionPool('test', max_size=1, timeout=0.05)
+        connection = pool.getconn(FakeConnection, healthy)
+        with self.assertRaises(PoolTimeout):
+            pool.getconn(FakeConnection, healthy)
+        self.assertEqual((pool.stats['timeouts'], pool.snapshot()['in_use']), (1, 1))
+
+        pool.putconn(connection, lambda connection: True)
+        self.assertIs(pool.getconn(FakeConnection, healthy), connection)
+
+    def test_waiting_thread_gets_returned_connection(self):
+        pool = ConnectionPool('test', max_size=1, timeout=5)
+        connection = pool.getconn(FakeConnection, healthy)
+        received = []
+        waiter = threading.Thread(target=lambda: received.append(pool.getconn(FakeConnection, healthy)))
+        waiter.start()
+        while not pool.waiting:
+            waiter.join(0.01)
+        pool.putconn(connection, lambda connection: True)
+        waiter.join(5)
+        self.assertEqual(received, [connection])
+        self.assertEqual((pool.stats['waits'], pool.stats['created']), (1, 1))
+
+    def test_reset_on_return(self):
+        pool = ConnectionPool('test')
+        connection = pool.getconn(FakeConnection, healthy)
+        pool.putconn(connection, lambda connection: True)
+        self.assertIs(pool.getconn(FakeConnection, healthy), connection)
+
+        # Соединение, которое не удалось сбросить, закрывается и не возвращается в пул
+        for reset in (lambda connection: False, broken):
+            pool.putconn(connection, reset)
+            self.assertTrue(connection.closed)
+            self.assertEqual(pool.size, 0)
+            connection = pool.getconn(FakeConnection, healthy)
+            self.assertFalse(connection.closed)
+        self.assertEqual((pool.stats['created'], pool.stats['closed']), (3, 2))
+
+    def test_expired_connection_is_not_reused(self):
+        pool = ConnectionPool('test', max_lifetime=0)
+        connection = pool.getconn(FakeConnection, healthy)
+        pool.putconn(connection, lambda connection: True)
+        self.assertTrue(connection.closed)
+        self.assertIsNot(pool.getconn(FakeConnection, healthy), connection)
+
+    def test_broken_connection_is_discarded(self):
+        pool = ConnectionPool('test', max_size=1, check_interval=0)
+        connection = pool.getconn(FakeConnection, healthy)
+        pool.putconn(connection, lambda connection: True)
+        replacement = pool.getconn(FakeConnection, broken)
+        self.assertIsNot(replacement, connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats['health_check_failures'], 1)
+        self.assertEqual(pool.snapshot()['in_use'], 1)
+
+        # Закрытое сервером свободное соединение пропускается без проверки
+        pool.putconn(replacement, lambda connection: True)
+        replacement.closed = True
+        self.assertIsNot(pool.getconn(FakeConnection, broken), replacement)
+
+    def test_pool_is_recreated_after_fork(self):
+        name = 'test:fork'
+        self.addCleanup(db_pool._pools.pop, name, None)
+        parent_pool = db_pool.get_pool(name, max_size=1)
+        connection = parent_pool.getconn(FakeConnection, healthy)
+        self.assertIs(db_pool.get_pool(name), parent_pool)
+
+        with mock.patch('backend.db_pool.pool.os.getpid', return_value=parent_pool.pid + 1):
+            child_pool = db_pool.get_pool(name, max_size=1)
+            self.assertIsNot(child_pool, parent_pool)
+            self.assertIn(parent_pool, db_pool._inherited_pools)
+            self.assertEqual([snapshot['pid'] for snapshot in db_pool.pools_snapshot()
+                              if snapshot['name'] == name], [parent_pool.pid + 1])
+            # Соединение родителя в пуле потомка не переиспользуется и не закрывается
+            child_pool.putconn(connection, lambda connection: True)
+            db_pool.close_pool(name)
+            self.assertFalse(connection.closed)
+            self.assertIsNot(child_pool.getconn(FakeConnection, healthy), connection)
+
+
+@unittest.skipUnless(importlib.util.find_spec('psycopg2') or importlib.util.find_spec('psycopg'),
+                     'PostgreSQL driver is not installed')
+class PooledDatabaseWrapperTest(SimpleTestCase):
+    def test_reset_connection(self):
+        from backend.db_pool.base import (
+            TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INERROR, TRANSACTION_STATUS_INTRANS, DatabaseWrapper,
+        )
+        for status in (TRANSACTION_STATUS_INTRANS, TRANSACTION_STATUS_INERROR):
+            connection = FakeConnection(status)
+            self.assertTrue(DatabaseWrapper._reset_connection(connection))
+            self.assertEqual(connection.rollbacks, 1)
+        connection = FakeConnection(TRANSACTION_STATUS_IDLE)
+        self.assertTrue(DatabaseWrapper._reset_connection(connection))
+        self.assertEqual(connection.rollbacks, 0)
+        # Активный запрос (ACTIVE) или закрытое соединение в пул не возвращаются
+        self.assertFalse(DatabaseWrapper._reset_connection(FakeConnection(1)))
+        connection.closed = True
+        self.assertFalse(DatabaseWrapper._reset_connection(connection))
+
+
+def read_db(request):
+    return Response({'db': UserModel.objects.all().db})
+
+
+class PrimaryView(APIView):
+    def get(self, request):
+        return read_db(request)
+
+
+@read_only
+class ReplicaView(APIView):
+    def get(self, request):
+        return read_db(request)
+
+    def post(self, request):
+        UserModel.objects.filter(pk=request.user.pk).update(name='Written')
+        return read_db(request)
+
+
+class ReportsViewSet(viewsets.ViewSet):
+    def list(self, request):
+        return read_db(request)
+
+    @read_only
+    def report(self, request):
+        return read_db(request)
+
+
+class ReplicaRoutingMiddlewareTest(TransactionTestCase):
+    """
+    Вторая sqlite БД регистрируется как реплика, запросы в нее не выполняются: проверяется выбранный alias
+    """
+    factory = APIRequestFactory()
+
+    def setUp(self):
+        cache.clear()
+        replica = {**connections['default'].settings_dict, 'NAME': ':memory:', 'TEST': {'MIRROR': None}}
+        # connections.settings - тот же словарь, что и settings.DATABASES
+        databases = mock.patch.dict(settings.DATABASES, {'replica': replica})
+        databases.start()
+        self.addCleanup(databases.stop)
+        self.addCleanup(connections.__delitem__, 'replica')
+        self.addCleanup(connections['replica'].close)
+        replica_lag.checked_at.clear()
+        replica_lag.lag.clear()
+        self.users = [UserModel.objects.create(username=f'replica{index}', email=f'replica{index}@example.com')
+                      for index in range(2)]
+
+    def request(self, method='get', user_index=0):
+        request = getattr(self.factory, method)('/')
+        force_authenticate(request, user=self.users[user_index])
+        return request
+
+    def call(self, view, method='get', user_index=0):
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            return view(request)
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        return middleware(self.request(method, user_index)).data['db']
+
+    def test_read_and_write_aliases(self):
+        self.assertEqual(self.call(PrimaryView.as_view()), 'default')
+        self.assertEqual(self.call(ReplicaView.as_view()), 'replica')
+        # После записи в запросе чтения идут в default
+        self.assertEqual(self.call(ReplicaView.as_view(), 'post'), 'default')
+        self.assertEqual(UserModel.objects.get(pk=self.users[0].pk).name, 'Written')
+
+    def test_read_only_marker_on_function_view_and_action(self):
+        @read_only
+        def function_view(request):
+            return read_db(request)
+
+        self.assertEqual(self.call(function_view), 'replica')
+        self.assertEqual(self.call(ReportsViewSet.as_view({'get': 'list'})), 'default')
+        self.assertEqual(self.call(ReportsViewSet.as_view({'get': 'report'})), 'replica')
+
+    def test_user_is_pinned_to_primary_after_write(self):
+        self.call(ReplicaView.as_view(), 'post')
+        self.assertEqual(self.call(ReplicaView.as_view()), 'default')
+        self.assertEqual(self.call(ReplicaView.as_view(), user_index=1), 'replica')
+        # Окно закрепления закончилось
+        cache.delete(pin_key(self.users[0].pk))
+        self.assertEqual(self.call(ReplicaView.as_view()), 'replica')
+
+    def test_lagging_or_unavailable_replica_falls_back_to_primary(self):
+        for lag in (60.0, None):
+            replica_lag.checked_at.clear()
+            with mock.patch('backend.db_router.ReplicaLag.measure', return_value=lag):
+                self.assertEqual(self.call(ReplicaView.as_view()), 'default')
+        replica_lag.checked_at.clear()
+        with mock.patch('backend.db_router.ReplicaLag.measure', return_value=0.5):
+            self.assertEqual(self.call(ReplicaView.as_view()), 'replica')
+
+    def test_async_chain(self):
+        view = ReplicaView.as_view()
+
+        async def get_response(request):
+            await sync_to_async(middleware.process_view)(request, view, (), {})
+            return await sync_to_async(view)(request)
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        self.assertEqual(async_to_sync(middleware)(self.request()).data['db'], 'replica')
+        async_to_sync(middleware)(self.request('post'))
+        self.assertTrue(cache.get(pin_key(self.users[0].pk)))
+        self.assertEqual(async_to_sync(middleware)(self.request()).data['db'], 'default')
@@ -22,6 +22,7 @@ urlpatterns += [
 if settings.DEBUG_MODE:
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    urlpatterns += static(settings.LESSON_STATIC_URL, document_root=settings.LESSON_STATIC_ROOT)
 
     from debug_toolbar.toolbar import debug_toolbar_urls
 
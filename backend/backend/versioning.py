@@ -0,0 +1,76 @@
+"""
+Счетчики версий данных для условных ответов (ETag / 304).
+Зависимость - это модель (версия меняется при любом save/delete) или строковое имя произвольной области.
+Зависимости пользователя хранятся отдельно для каждого пользователя.
+"""
+import time
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+
+
+def dependency_name(dependency) -> str:
+    if isinstance(dependency, str):
+        return dependency
+    return dependency._meta.label_lower
+
+
+def version_key(dependency, user_id=None) -> str:
+    if user_id is None:
+        return f'version:{dependency_name(dependency)}'
+    return f'version:{dependency_name(dependency)}:user:{user_id}'
+
+
+def _initial_version() -> int:
+    # Начинаем со времени, чтобы после очистки кэша версии не совпали со старыми ETag у клиентов
+    return int(time.time() * 1000)
+
+
+def _bump_key(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), timeout=None)
+
+
+def bump_versions(*dependencies):
+    """
+    Нужно вызывать вручную после bulk_create/update(), т.к. они не отправляют сигналы
+    """
+    for dependency in dependencies:
+        _bump_key(version_key(dependency))
+
+
+def bump_user_versions(dependency, user_ids):
+    for user_id in set(user_ids):
+        _bump_key(version_key(dependency, user_id))
+
+
+def get_versions(keys) -> dict:
+    versions = cache.get_many(keys)
+    missing = {key: _initial_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return versions
+
+
+def track_model_versions(*models):
+    for model in models:
+        def handler(sender, **kwargs):
+            bump_versions(sender)
+
+        post_save.connect(handler, sender=model, weak=False, dispatch_uid=f'version_{model._meta.label_lower}')
+        post_delete.connect(handler, sender=model, weak=False, dispatch_uid=f'version_{model._meta.label_lower}')
+
+
+def track_user_model_versions(*models, user_field='user_id'):
+    """
+    Для моделей с данными пользователя (ответы и т.п.) версия меняется только у владельца записи
+    """
+    for model in models:
+        def handler(sender, instance, **kwargs):
+            bump_user_versions(sender, [getattr(instance, user_field)])
+
+        post_save.connect(handler, sender=model, weak=False, dispatch_uid=f'user_version_{model._meta.label_lower}')
+        post_delete.connect(handler, sender=model, weak=False, dispatch_uid=f'user_version_{model._meta.label_lower}')
@@ -0,0 +1,142 @@
+"""
+Отложенная запись частых малоценных полей модели (время последнего входа и т.п.): запрос только кладет значение
+в буфер (Redis или память процесса), задача django-q периодически записывает накопленное пачками
+UPDATE ... SET field = CASE WHEN id = ... END. Для одной строки остается последнее значение.
+Пока значение не записано, его нужно читать через pending()/fresh(), а не из строки в БД.
+WRITE_BEHIND_BACKEND: 'redis' - общий буфер веб-процессов и qcluster; 'sync' - без буфера, запись сразу
+(локальный запуск без Redis); 'memory' - буфер процесса, только если сброс идет в том же процессе (тесты).
+"""
+import threading
+
+import redis
+from django.conf import settings
+from django.db.models import Case, Value, When
+
+from backend.redis_client import get_redis
+
+FLUSH_BATCH_SIZE = 500
+
+
+class MemoryStore:
+    """
+    Буфер в памяти процесса (локальная разработка, тесты): задача видит только записи своего процесса
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def set(self, pk: str, raw: str):
+        with self.lock:
+            self.values[pk] = raw
+
+    def get(self, pk: str):
+        return self.values.get(pk)
+
+    def take(self) -> dict:
+        with self.lock:
+            values, self.values = self.values, {}
+        return values
+
+    def done(self):
+        pass
+
+
+class WriteThroughStore:
+    """
+    Без буфера: значение сразу записывается в БД одним UPDATE. Для запуска без Redis, где задача сброса
+    в qcluster не видит память веб-процесса
+    """
+
+    def __init__(self, model, field):
+        self.model = model
+        self.field = field
+
+    def set(self, pk: str, raw: str):
+        self.model.objects.filter(pk=self.model._meta.pk.to_python(pk)).update(
+            **{self.field.attname: self.field.to_python(raw)})
+
+    def get(self, pk: str):
+        return None
+
+    def take(self) -> dict:
+        return {}
+
+    def done(self):
+        pass
+
+
+class RedisStore:
+    """
+    Хеш pk -> значение. Сброс переименовывает хеш, новые записи идут в новый хеш, пока старый пишется в БД.
+    Если запись в БД упала, хеш сброса остается и записывается при следующем запуске
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.flushing_key = f'{key}:flushing'
+
+    def set(self, pk: str, raw: str):
+        get_redis().hset(self.key, pk, raw)
+
+    def get(self, pk: str):
+        client = get_redis()
+        return client.hget(self.key, pk) or client.hget(self.flushing_key, pk)
+
+    def take(self) -> dict:
+        client = get_redis()
+        if not client.exists(self.flushing_key):
+            try:
+                client.rename(self.key, self.flushing_key)
+            except redis.ResponseError:
+                # Буфер пуст
+                return {}
+        return client.hgetall(self.flushing_key)
+
+    def done(self):
+        get_redis().delete(self.flushing_key)
+
+
+class WriteBehindField:
+    def __init__(self, model, field_name: str):
+        self.model = model
+        self.field = model._meta.get_field(field_name)
+        if settings.WRITE_BEHIND_BACKEND == 'redis':
+            self.store = RedisStore(f'write_behind:{model._meta.label_lower}:{field_name}')
+        elif settings.WRITE_BEHIND_BACKEND == 'memory':
+            self.store = MemoryStore()
+        else:
+            self.store = WriteThroughStore(model, self.field)
+
+    @staticmethod
+    def dumps(value) -> str:
+        return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+    def record(self, pk, value):
+        self.store.set(str(pk), self.dumps(value))
+
+    def pending(self, pk):
+        raw = self.store.get(str(pk))
+        return None if raw is None else self.field.to_python(raw)
+
+    def fresh(self, instance):
+        """
+        Значение из буфера, если оно еще не записано, иначе из экземпляра. Экземпляр обновляется
+        """
+        value = self.pending(instance.pk)
+        if value is None:
+            return getattr(instance, self.field.attname)
+        setattr(instance, self.field.attname, value)
+        return value
+
+    def flush(self) -> int:
+        values = self.store.take()
+        items = [(self.model._meta.pk.to_python(pk), self.field.to_python(raw)) for pk, raw in values.items()]
+        for start in range(0, len(items), FLUSH_BATCH_SIZE):
+            batch = items[start:start + FLUSH_BATCH_SIZE]
+            self.model.objects.filter(pk__in=[pk for pk, _ in batch]).update(**{self.field.attname: Case(
+                *[When(pk=pk, then=Value(value, output_field=self.field)) for pk, value in batch],
+                output_field=self.field,
+            )})
+        self.store.done()
+        return len(items)
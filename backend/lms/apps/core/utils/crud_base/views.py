@@ -7,6 +7,8 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.authentication import TokenAuthentication, SessionAuthentication
 
+from backend.db_router import use_replicas
+
 
 class CustomPagination(pagination.PageNumberPagination):
     page_size = 10
@@ -37,6 +39,8 @@ class BaseListApiView(AuthControlMixin, StandardizedViewMixin, viewsets.ModelVie
     def list(self, request, *args, **kwargs):
         if request.GET.get("disablePagination", None) is not None:
             self.pagination_class = None
+            with use_replicas():
+                return super().list(request, *args, **kwargs)
 
         return super().list(request, *args, **kwargs)
 
@@ -55,6 +59,9 @@ class BaseApiViewSet(AuthControlMixin, StandardizedViewMixin, viewsets.ModelView
     def list(self, request, *args, **kwargs):
         if request.GET.get("disablePagination", None) is not None:
             self.pagination_class = None
+            # Full unpaginated listings are read from a replica
+            with use_replicas():
+                return super().list(request, *args, **kwargs)
 
         return super().list(request, *args, **kwargs)
 
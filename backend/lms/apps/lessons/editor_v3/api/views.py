@@ -1,4 +1,6 @@
 import json
+from api_lessons.models import Lesson
+from api_lessons.packs import schedule_lesson_packs_on_commit
 from lms.apps.core.models import PublicationStatus
 from lms.apps.attachments.api.serializers import BaseAttachmentSerializer
 from lms.apps.attachments.models import Attachment
@@ -158,6 +160,10 @@ class BuildAndPublishContentAction(EditorPostActionBase):
         )
         lesson_page_public_post_obj.content = post_obj.content
         lesson_page_public_post_obj.title = post_obj.title
+        if post_obj.publication_status == PublicationStatus.PUBLISH:
+            # Element changes are bulk operations and do not trigger the offline pack rebuild.
+            # The pack build also renders the lesson static file (Lesson.render_url) after commit
+            schedule_lesson_packs_on_commit(Lesson, [page_obj.lesson_id])
         lesson_page_public_post_obj.save()
         return {
             "success": 1,
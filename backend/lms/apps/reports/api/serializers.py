@@ -1,6 +1,8 @@
 from rest_framework import serializers
 
 from lms.apps.posts.models import Post
+from lms.apps.reports.performance import WINDOW_SLOTS
+from lms.apps.reports.queue_stats import TASK_STATS_HOURS
 from lms.apps.resources.api.serializers import PostAuthorSerializer
 
 
@@ -22,3 +24,20 @@ class RecordPostSerializer(serializers.ModelSerializer):
             "object_id",
             "content",
         ]
+
+
+class PerformanceQuerySerializer(serializers.Serializer):
+    SORT_FIELDS = {
+        "latency": "latency_p95_ms",
+        "queries": "queries_avg",
+        "db_time": "db_time_total_ms",
+        "requests": "requests",
+    }
+
+    sort = serializers.ChoiceField(choices=list(SORT_FIELDS), default="db_time")
+    minutes = serializers.IntegerField(min_value=1, max_value=WINDOW_SLOTS, default=WINDOW_SLOTS)
+    limit = serializers.IntegerField(min_value=1, default=20)
+
+
+class TaskQueuesQuerySerializer(serializers.Serializer):
+    hours = serializers.IntegerField(min_value=1, max_value=TASK_STATS_HOURS, default=1)
@@ -1,11 +1,19 @@
 from django_filters import CharFilter
 from django_filters.rest_framework import FilterSet
 from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 
+from backend.db_router import read_only
 from lms.apps.core.utils.crud_base.views import BaseApiViewSet
 from lms.apps.posts.models import Post
-from lms.apps.reports.api.serializers import RecordPostSerializer
+from lms.apps.reports.api.serializers import (
+    PerformanceQuerySerializer,
+    RecordPostSerializer,
+    TaskQueuesQuerySerializer,
+)
+from lms.apps.reports.performance import collect_pool_report, collect_report
+from lms.apps.reports.queue_stats import collect_queue_report
 from lms.apps.reports.tasks import start_recording
 
 
@@ -29,6 +37,14 @@ class ReportViewSet(BaseApiViewSet):
     def get_serializer_class(self):
         return RecordPostSerializer
 
+    @read_only
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @read_only
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 
     @action(
         methods=["post"],
@@ -44,3 +60,36 @@ class ReportViewSet(BaseApiViewSet):
             self.get_serializer(new_post_obj).data,
             status=200,
         )
+
+    @read_only
+    @action(
+        methods=["get"],
+        detail=False,
+        permission_classes=[IsAdminUser],
+    )
+    def performance(self, request):
+        params = PerformanceQuerySerializer(data=request.GET)
+        params.is_valid(raise_exception=True)
+        sort_field = PerformanceQuerySerializer.SORT_FIELDS[params.validated_data["sort"]]
+        limit = params.validated_data["limit"]
+
+        endpoints = sorted(
+            collect_report(params.validated_data["minutes"]),
+            key=lambda item: float("inf") if item[sort_field] is None else item[sort_field],
+            reverse=True,
+        )
+        return Response(
+            {"endpoints": endpoints[:limit], "db_pools": collect_pool_report()},
+            status=200,
+        )
+
+    @read_only
+    @action(
+        methods=["get"],
+        detail=False,
+        permission_classes=[IsAdminUser],
+    )
+    def task_queues(self, request):
+        params = TaskQueuesQuerySerializer(data=request.GET)
+        params.is_valid(raise_exception=True)
+        return Response({"queues": collect_queue_report(params.validated_data["hours"])}, status=200)
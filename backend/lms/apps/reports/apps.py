@@ -6,3 +6,7 @@ class ReportsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = "lms.apps.reports"
     verbose_name = _("Reports")
+
+    def ready(self):
+        import lms.apps.reports.signals  # noqa
+        super().ready()
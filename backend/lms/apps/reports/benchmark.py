@@ -0,0 +1,211 @@
+"""
+Воспроизводимые замеры основных сценариев на синтетических данных (см. dataset.py).
+Запросы идут через полный стек (маршруты, middleware, вьюхи), для каждого сценария считаются
+перцентили задержки и количество SQL запросов.
+"""
+import json
+import platform
+import statistics
+import time
+from contextlib import ExitStack
+
+import django
+from django.db import connections
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api_lessons.models import *
+from api_users.models import UserModel
+from lms.apps.posts.models import Post
+from lms.apps.reports.dataset import SYNTHETIC_EMAIL_DOMAIN, SYNTHETIC_META
+from lms.apps.reports.performance import RequestQueries
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def percentile(values, percent):
+    if not values:
+        return 0
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(percent / 100 * len(values) + 0.5) - 1))
+    return values[index]
+
+
+class Scenario:
+    name = None
+
+    def __init__(self, client: APIClient):
+        self.client = client
+        self.setup()
+
+    def setup(self):
+        pass
+
+    def requests(self):
+        """
+        Список (method, path, data, user) для одной итерации
+        """
+        raise NotImplementedError
+
+    def lesson_user(self):
+        # Урок, открытый для пользователя: первый в коллекции и доступный бесплатно
+        lesson = Lesson.objects.filter(meta=SYNTHETIC_META, order=0, is_available_on_free=True).first()
+        user = UserModel.objects.filter(email__endswith=f'@{SYNTHETIC_EMAIL_DOMAIN}', is_staff=False).order_by(
+            'pk').first()
+        if lesson is None or user is None:
+            raise BenchmarkError('Synthetic dataset is not generated, run generate_dataset first')
+        return lesson, user
+
+
+class LessonOpenScenario(Scenario):
+    name = 'lesson_open'
+
+    def setup(self):
+        self.lesson, self.user = self.lesson_user()
+
+    def requests(self):
+        return [('post', '/api_lessons/get_lesson/', {'lesson_id': self.lesson.pk}, self.user)]
+
+
+class AnswerSubmitScenario(Scenario):
+    name = 'answer_submit'
+
+    def setup(self):
+        self.lesson, self.user = self.lesson_user()
+        lesson_filter = {'component__page_element__page__lesson': self.lesson}
+        self.answer = QuestionAnswer.objects.filter(**lesson_filter).first()
+        self.lines = list(FillTextLine.objects.filter(**lesson_filter))
+        self.elements = list(PutInOrderComponentElement.objects.filter(**lesson_filter))
+        self.couples = list(MatchingComponentElementCouple.objects.filter(**lesson_filter))
+
+    def requests(self):
+        requests = []
+        if self.answer:
+            requests.append(('post', '/api_lessons/answer_question_component/', {'answer_id': self.answer.pk},
+                             self.user))
+        if self.lines:
+            requests.append(('post', '/api_lessons/answer_to_fill_text/', {
+                'lines': [{'line_id': line.pk, 'answer': line.answer} for line in self.lines]}, self.user))
+        if self.elements:
+            requests.append(('post', '/api_lessons/answer_put_in_order_component/', {
+                'elements': [{'element_id': element.pk, 'order': element.order} for element in self.elements]},
+                             self.user))
+        if self.couples:
+            requests.append(('post', '/api_lessons/answer_matching_component/', {
+                'elements': [{'first_element_id': couple.first_element_id,
+                              'second_element_id': couple.second_element_id} for couple in self.couples]},
+                             self.user))
+        return requests
+
+
+class CatalogScenario(Scenario):
+    name = 'catalog'
+
+    def setup(self):
+        self.lesson, self.user = self.lesson_user()
+
+    def requests(self):
+        return [
+            ('get', '/api_lessons/get_lesson_catalog/', None, self.user),
+            ('get', '/api_lessons/get_lesson_batch/', None, self.user),
+        ]
+
+
+class FriendsScenario(Scenario):
+    name = 'friends'
+
+    def setup(self):
+        self.lesson, self.user = self.lesson_user()
+
+    def requests(self):
+        return [
+            ('get', '/api_users/get_friends/', None, self.user),
+            ('post', '/api_users/search_friends/', {'search': 'e'}, self.user),
+        ]
+
+
+class PublishScenario(Scenario):
+    name = 'publish'
+
+    def setup(self):
+        self.post = Post.objects.filter(post_type='lesson-page', slug__startswith='synthetic-page-').select_related(
+            'author').first()
+        if self.post is None:
+            raise BenchmarkError('Synthetic dataset is not generated, run generate_dataset first')
+
+    def requests(self):
+        # Повторная публикация сохраненного контента (static блоки, без изменения компонентов)
+        self.post.refresh_from_db(fields=['content'])
+        return [(
+            'post', '/api/v1/lms/resources/posts/edit-content/lessons2/action/?action=build-and-publish-content',
+            {'post_id': self.post.pk, 'content': self.post.content}, self.post.author,
+        )]
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in (LessonOpenScenario, AnswerSubmitScenario, CatalogScenario, FriendsScenario, PublishScenario)
+}
+
+
+def measure(client, method, path, data, user):
+    client.force_authenticate(user=user)
+    queries = RequestQueries()
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(queries))
+        start = time.perf_counter()
+        response = getattr(client, method)(path, data, format='json')
+        latency = time.perf_counter() - start
+    return latency * 1000, queries.count, response.status_code
+
+
+def run_scenario(scenario: Scenario, iterations, warmup=1):
+    latencies, query_counts, statuses = [], [], {}
+    for iteration in range(warmup + iterations):
+        for method, path, data, user in scenario.requests():
+            latency, query_count, status_code = measure(scenario.client, method, path, data, user)
+            if iteration < warmup:
+                continue
+            latencies.append(latency)
+            query_counts.append(query_count)
+            statuses[str(status_code)] = statuses.get(str(status_code), 0) + 1
+
+    return {
+        'requests': len(latencies),
+        'latency_p50_ms': round(percentile(latencies, 50), 2),
+        'latency_p95_ms': round(percentile(latencies, 95), 2),
+        'latency_mean_ms': round(statistics.mean(latencies), 2) if latencies else 0,
+        'latency_max_ms': round(max(latencies, default=0), 2),
+        'queries_p50': percentile(query_counts, 50),
+        'queries_p95': percentile(query_counts, 95),
+        'queries_max': max(query_counts, default=0),
+        'status_codes': statuses,
+    }
+
+
+def run_benchmark(scenarios=None, iterations=20, warmup=1):
+    client = APIClient()
+    results = {}
+    for name in scenarios or SCENARIOS:
+        if name not in SCENARIOS:
+            raise BenchmarkError(f'Unknown scenario `{name}`, available: {", ".join(SCENARIOS)}')
+        results[name] = run_scenario(SCENARIOS[name](client), iterations, warmup)
+
+    return {
+        'meta': {
+            'created_at': timezone.now().isoformat(),
+            'iterations': iterations,
+            'warmup': warmup,
+            'database': connections['default'].vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        },
+        'scenarios': results,
+    }
+
+
+def dumps_report(report) -> str:
+    return json.dumps(report, indent=2, ensure_ascii=False)
@@ -0,0 +1,390 @@
+"""
+Генератор синтетических данных для замеров производительности и тестов.
+Все данные создаются через bulk_create, повторный запуск с тем же seed дает одинаковую структуру.
+"""
+import json
+import random
+from dataclasses import dataclass, field
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+
+from api_lessons.models import *
+from api_lessons.versions import LESSON_CONTENT_MODELS
+from api_users.models import UserActivityDateModel, UserActivityYear, UserModel, UserPointAddHistory
+from backend.versioning import bump_versions
+from lms.apps.posts.models import Post
+
+SYNTHETIC_META = 'synthetic'
+SYNTHETIC_EMAIL_DOMAIN = 'synthetic.example'
+
+# Порядок типов компонентов на странице (все десять типов)
+COMPONENT_TYPES = (
+    'text-pro', 'bluecard', 'image', 'audio', 'video', 'record-audio', 'fill-text', 'order', 'question', 'matching',
+)
+
+WORDS = (
+    'apple', 'river', 'mountain', 'teacher', 'window', 'garden', 'morning', 'yellow', 'answer', 'travel',
+    'kitchen', 'letter', 'summer', 'friend', 'school', 'market', 'village', 'doctor', 'silver', 'winter',
+)
+
+
+@dataclass
+class DatasetScale:
+    batches: int = 3
+    lessons_per_batch: int = 5
+    pages_per_lesson: int = 3
+    elements_per_page: int = 10
+    lines_per_component: int = 4
+    users: int = 50
+    friends_per_user: int = 10
+    pending_requests_per_user: int = 2
+    answered_lessons_per_user: int = 3
+    activity_days: int = 60
+    points_history_per_user: int = 10
+
+
+@dataclass
+class Dataset:
+    lesson_ids: list = field(default_factory=list)
+    user_ids: list = field(default_factory=list)
+    post_ids: list = field(default_factory=list)
+    author_id: int = None
+
+    def summary(self):
+        return {
+            'lessons': len(self.lesson_ids),
+            'users': len(self.user_ids),
+            'posts': len(self.post_ids),
+        }
+
+
+class DatasetGenerator:
+    def __init__(self, scale: DatasetScale = None, seed: int = 0):
+        self.scale = scale or DatasetScale()
+        self.random = random.Random(seed)
+        self.dataset = Dataset()
+
+    def words(self, count):
+        return ' '.join(self.random.choice(WORDS) for _ in range(count))
+
+    @transaction.atomic
+    def generate(self) -> Dataset:
+        self.create_users()
+        self.create_lessons()
+        self.create_friend_graph()
+        self.create_answers()
+        self.create_activity()
+        self.create_posts()
+
+        # bulk_create не отправляет сигналы
+        bump_versions(LessonBatch, *LESSON_CONTENT_MODELS)
+        return self.dataset
+
+    # ---------------------------------------------------------------- users
+
+    def create_users(self):
+        start = UserModel.objects.count()
+        author = UserModel(username=f'synthetic_author_{start}', email=f'author_{start}@{SYNTHETIC_EMAIL_DOMAIN}',
+                           name='Synthetic Author', is_staff=True, registration_number=start + 1)
+        users = [author]
+        for index in range(self.scale.users):
+            number = start + index + 1
+            users.append(UserModel(
+                username=f'synthetic_{number}',
+                email=f'user_{number}@{SYNTHETIC_EMAIL_DOMAIN}',
+                name=f'{self.random.choice(WORDS).title()} {number}',
+                description=self.words(5),
+                user_type=self.random.choice(('free', 'free', 'paid')),
+                timezone_difference=self.random.choice((0, 3, 5, 6)),
+                registration_number=number,
+            ))
+        users = UserModel.objects.bulk_create(users)
+        self.dataset.author_id = users[0].pk
+        self.dataset.user_ids = [user.pk for user in users[1:]]
+
+    def create_friend_graph(self):
+        scale = self.scale
+        user_ids = self.dataset.user_ids
+        friend_pairs = set()
+        for user_id in user_ids:
+            candidates = self.random.sample(user_ids, min(scale.friends_per_user, len(user_ids)))
+            for friend_id in candidates:
+                if friend_id != user_id:
+                    friend_pairs.add((min(user_id, friend_id), max(user_id, friend_id)))
+
+        Friends = UserModel.friends.through
+        Friends.objects.bulk_create(
+            [Friends(from_usermodel_id=a, to_usermodel_id=b) for a, b in friend_pairs] +
+            [Friends(from_usermodel_id=b, to_usermodel_id=a) for a, b in friend_pairs]
+        )
+
+        Requests = UserModel.friendship_requests.through
+        requests = set()
+        for user_id in user_ids:
+            for sender_id in self.random.sample(user_ids, min(scale.pending_requests_per_user, len(user_ids))):
+                pair = (min(user_id, sender_id), max(user_id, sender_id))
+                if sender_id != user_id and pair not in friend_pairs:
+                    requests.add((user_id, sender_id))
+        Requests.objects.bulk_create([Requests(from_usermodel_id=a, to_usermodel_id=b) for a, b in requests])
+
+    # -------------------------------------------------------------- lessons
+
+    def create_lessons(self):
+        scale = self.scale
+        titles = [choice[0] for choice in LessonBatchNames.choices()]
+        batches = LessonBatch.objects.bulk_create(
+            [LessonBatch(title=titles[index % len(titles)]) for index in range(scale.batches)])
+
+        lessons = Lesson.objects.bulk_create([
+            Lesson(lesson_batch=batch, order=order, title=self.words(3), description=self.words(12),
+                   is_available_on_free=order < 2 or self.random.random() < 0.5, meta=SYNTHETIC_META,
+                   author_id=self.dataset.author_id)
+            for batch in batches for order in range(scale.lessons_per_batch)
+        ])
+        self.dataset.lesson_ids = [lesson.pk for lesson in lessons]
+
+        pages = LessonPage.objects.bulk_create([
+            LessonPage(lesson=lesson, order=order)
+            for lesson in lessons for order in range(scale.pages_per_lesson)
+        ])
+
+        slots = [(page, order, COMPONENT_TYPES[order % len(COMPONENT_TYPES)])
+                 for page in pages for order in range(scale.elements_per_page)]
+        components = self.create_components([component_type for _, _, component_type in slots])
+        LessonPageElement.objects.bulk_create([
+            LessonPageElement(page=page, order=order, **{ELEMENT_FIELDS[component_type]: component})
+            for (page, order, component_type), component in zip(slots, components)
+        ])
+
+    def create_components(self, component_types):
+        """
+        Создает компоненты всех типов (по одному bulk_create на модель) и возвращает их в порядке component_types
+        """
+        builders = {
+            'text-pro': lambda: TextComponent(title=self.words(2), text=self.words(40)),
+            'bluecard': lambda: BlueCardComponent(text=self.words(15)),
+            'image': lambda: ImageComponent(description=self.words(3), image='images/synthetic.png'),
+            'audio': lambda: AudioComponent(title=self.words(2), audio='audio_components/synthetic.mp3'),
+            'video': lambda: VideoComponent(description=self.words(5),
+                                            video_url=f'https://vimeo.com/{self.random.randint(10 ** 8, 10 ** 9)}'),
+            'record-audio': lambda: RecordAudioComponent(title=self.words(2), description=self.words(10)),
+            'fill-text': lambda: FillTextComponent(title=self.words(2), put_words=self.random.random() < 0.5),
+            'order': lambda: PutInOrderComponent(title=self.words(2)),
+            'question': lambda: QuestionComponent(text=self.words(8) + '?'),
+            'matching': lambda: MatchingComponent(title=self.words(2)),
+        }
+        by_type = {}
+        for component_type in component_types:
+            by_type.setdefault(component_type, []).append(builders[component_type]())
+        for component_type, components in by_type.items():
+            by_type[component_type] = COMPONENT_MODELS[component_type].objects.bulk_create(components)
+
+        self.create_component_children(by_type)
+        self.create_vimeo_cache(by_type.get('video', []))
+
+        positions = {component_type: iter(components) for component_type, components in by_type.items()}
+        return [next(positions[component_type]) for component_type in component_types]
+
+    def create_component_children(self, by_type):
+        lines = self.scale.lines_per_component
+        FillTextLine.objects.bulk_create([
+            FillTextLine(component=component, order=order, text_before=self.words(4), answer=self.random.choice(WORDS),
+                         text_after=self.words(3))
+            for component in by_type.get('fill-text', []) for order in range(lines)
+        ])
+        PutInOrderComponentElement.objects.bulk_create([
+            PutInOrderComponentElement(component=component, order=order, text=self.words(3))
+            for component in by_type.get('order', []) for order in range(lines)
+        ])
+        QuestionAnswer.objects.bulk_create([
+            QuestionAnswer(component=component, text=self.words(2), is_correct=order == 0)
+            for component in by_type.get('question', []) for order in range(lines)
+        ])
+
+        matching = by_type.get('matching', [])
+        elements = MatchingComponentElement.objects.bulk_create([
+            MatchingComponentElement(text=self.random.choice(WORDS))
+            for _ in matching for _ in range(lines * 2)
+        ])
+        elements = iter(elements)
+        MatchingComponentElementCouple.objects.bulk_create([
+            MatchingComponentElementCouple(component=component, first_element=next(elements),
+                                           second_element=next(elements))
+            for component in matching for _ in range(lines)
+        ])
+
+    def create_vimeo_cache(self, videos):
+        # Чтобы замеры не ходили в Vimeo API
+        expire_time = timezone.now() + timezone.timedelta(days=365)
+        VimeoUrlCacheModel.objects.bulk_create([
+            VimeoUrlCacheModel(vimeo_link=video.video_url, playable_video_link=f'{video.video_url}/synthetic.mp4',
+                               expire_time=expire_time)
+            for video in videos
+        ])
+
+    # -------------------------------------------------------------- answers
+
+    def create_answers(self):
+        scale = self.scale
+        lessons = list(Lesson.objects.filter(pk__in=self.dataset.lesson_ids))
+        user_lessons = []
+        answered_lesson_ids = {}
+        for user_id in self.dataset.user_ids:
+            count = min(scale.answered_lessons_per_user, len(lessons))
+            # Проходят уроки по порядку, последний урок может быть не завершен
+            chosen = lessons[:self.random.randint(0, count)]
+            answered_lesson_ids[user_id] = [lesson.pk for lesson in chosen]
+            for index, lesson in enumerate(chosen):
+                user_lessons.append(UserLessonModel(
+                    user_id=user_id, lesson=lesson, completed=index < len(chosen) - 1 or self.random.random() < 0.5,
+                    review_mark=self.random.choice((None, 4, 5)),
+                ))
+        UserLessonModel.objects.bulk_create(user_lessons)
+
+        fill_text, order, question, matching, records = [], [], [], [], []
+        for user_id, lesson_ids in answered_lesson_ids.items():
+            if not lesson_ids:
+                continue
+            for line in FillTextLine.objects.filter(component__page_element__page__lesson__in=lesson_ids):
+                fill_text.append(UserFillTextAnswer(user_id=user_id, line=line, answer=self.random.choice(WORDS)))
+            for element in PutInOrderComponentElement.objects.filter(
+                    component__page_element__page__lesson__in=lesson_ids):
+                order.append(UserPutInOrderAnswer(user_id=user_id, element=element, order=self.random.randint(0, 5)))
+            for answer in QuestionAnswer.objects.filter(component__page_element__page__lesson__in=lesson_ids,
+                                                        is_correct=True):
+                question.append(UserQuestionAnswer(user_id=user_id, answer=answer))
+            for couple in MatchingComponentElementCouple.objects.filter(
+                    component__page_element__page__lesson__in=lesson_ids):
+                matching.append(UserMatchingComponentElementCouple(user_id=user_id, couple=couple,
+                                                                   first_element_id=couple.first_element_id))
+            for component in RecordAudioComponent.objects.filter(page_element__page__lesson__in=lesson_ids):
+                records.append(UserRecordAudioComponent(user_id=user_id, component=component,
+                                                        file='record_component_answer/synthetic.m4a'))
+
+        UserFillTextAnswer.objects.bulk_create(fill_text)
+        UserPutInOrderAnswer.objects.bulk_create(order)
+        UserQuestionAnswer.objects.bulk_create(question)
+        UserMatchingComponentElementCouple.objects.bulk_create(matching)
+        UserRecordAudioComponent.objects.bulk_create(records)
+
+    def create_activity(self):
+        scale = self.scale
+        now = timezone.now()
+        activity, activity_years, history, users = [], [], [], []
+        for user in UserModel.objects.filter(pk__in=self.dataset.user_ids):
+            days = sorted(self.random.sample(range(scale.activity_days), self.random.randint(0, scale.activity_days)))
+            moments = [now - timezone.timedelta(days=day, hours=self.random.randint(0, 12)) for day in days]
+            years = {}
+            for moment in moments:
+                activity.append(UserActivityDateModel(user=user, datetime=moment))
+                local_day = user.local_date(moment)
+                years.setdefault(local_day.year, UserActivityYear(user=user, year=local_day.year)).add_day(local_day)
+            activity_years.extend(years.values())
+            user.last_activity_at = max(moments, default=None)
+
+            streak = 0
+            while streak < len(days) and days[streak] == streak:
+                streak += 1
+            user.day_streak = streak
+            user.max_day_streak = max(streak, self.random.randint(0, len(days)))
+
+            points = 0
+            for _ in range(scale.points_history_per_user):
+                value = self.random.choice((1, 1, 1, 5))
+                points += value
+                history.append(UserPointAddHistory(user=user, points=value, description='Бонус за дневную серию',
+                                                   created_date=now - timezone.timedelta(
+                                                       days=self.random.randint(0, scale.activity_days))))
+            user.points = points
+            users.append(user)
+
+        UserActivityDateModel.objects.bulk_create(activity)
+        UserActivityYear.objects.bulk_create(activity_years)
+        UserPointAddHistory.objects.bulk_create(history)
+        UserModel.objects.bulk_update(users, ['day_streak', 'max_day_streak', 'points', 'last_activity_at'])
+
+    # ---------------------------------------------------------------- posts
+
+    def create_posts(self):
+        """
+        Посты редактора страниц (для замера публикации), контент собран из элементов страницы
+        """
+        page_type = ContentType.objects.get_for_model(LessonPage)
+        pages = LessonPage.objects.filter(lesson__in=self.dataset.lesson_ids).prefetch_related('elements')
+        posts = []
+        for page in pages:
+            posts.append(Post(
+                title=f'Synthetic page {page.pk}',
+                slug=f'synthetic-page-{page.pk}',
+                author_id=self.dataset.author_id,
+                content=json.dumps(build_page_content(page)),
+                post_type='lesson-page',
+                content_type=page_type,
+                object_id=page.pk,
+            ))
+        posts = Post.objects.bulk_create(posts)
+        self.dataset.post_ids = [post.pk for post in posts]
+
+
+COMPONENT_MODELS = {
+    'text-pro': TextComponent,
+    'bluecard': BlueCardComponent,
+    'image': ImageComponent,
+    'audio': AudioComponent,
+    'video': VideoComponent,
+    'record-audio': RecordAudioComponent,
+    'fill-text': FillTextComponent,
+    'order': PutInOrderComponent,
+    'question': QuestionComponent,
+    'matching': MatchingComponent,
+}
+
+ELEMENT_FIELDS = {
+    'text-pro': 'text_component',
+    'bluecard': 'blue_card_component',
+    'image': 'image_component',
+    'audio': 'audio_component',
+    'video': 'video_component',
+    'record-audio': 'record_audio_component',
+    'fill-text': 'fill_text_component',
+    'order': 'put_in_order_component',
+    'question': 'question_component',
+    'matching': 'matching_component',
+}
+
+
+def build_page_content(page: LessonPage) -> dict:
+    blocks = []
+    for element in page.elements.all():
+        for component_type, field_name in ELEMENT_FIELDS.items():
+            component_id = getattr(element, f'{field_name}_id')
+            if component_id:
+                blocks.append({
+                    'id': f'block-{element.pk}',
+                    'type': component_type,
+                    'data': {'obj': {'id': component_id}, 'static': True, 'element_id': element.pk},
+                })
+    return {'date': None, 'blocks': blocks}
+
+
+def generate_dataset(scale: DatasetScale = None, seed: int = 0) -> Dataset:
+    return DatasetGenerator(scale, seed).generate()
+
+
+@transaction.atomic
+def clear_dataset():
+    lessons = Lesson.objects.filter(meta=SYNTHETIC_META)
+    batch_ids = list(lessons.values_list('lesson_batch_id', flat=True).distinct())
+    page_ids = list(LessonPage.objects.filter(lesson__in=lessons).values_list('pk', flat=True))
+    Post.objects.filter(content_type=ContentType.objects.get_for_model(LessonPage), object_id__in=page_ids).delete()
+
+    # Компоненты не удаляются каскадом от элементов страницы (OneToOne на стороне элемента)
+    for field_name in ELEMENT_FIELDS.values():
+        component_ids = LessonPageElement.objects.filter(page__in=page_ids).values_list(f'{field_name}_id', flat=True)
+        LessonPageElement._meta.get_field(field_name).related_model.objects.filter(pk__in=component_ids).delete()
+    lessons.delete()
+    LessonBatch.objects.filter(pk__in=batch_ids, lessons__isnull=True).delete()
+    UserModel.objects.filter(email__endswith=f'@{SYNTHETIC_EMAIL_DOMAIN}').delete()
+    bump_versions(LessonBatch, *LESSON_CONTENT_MODELS)
@@ -0,0 +1,24 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from lms.apps.reports.dataset import DatasetScale, clear_dataset, generate_dataset
+
+
+class Command(BaseCommand):
+    help = 'Generate a seeded synthetic dataset (lessons, components, users, friends, answers) for benchmarks'
+
+    def add_arguments(self, parser):
+        defaults = DatasetScale()
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--clear', action='store_true', help='Remove previously generated synthetic data first')
+        for field_name, value in vars(defaults).items():
+            parser.add_argument(f'--{field_name.replace("_", "-")}', type=int, default=value, dest=field_name)
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            clear_dataset()
+
+        scale = DatasetScale(**{field_name: options[field_name] for field_name in vars(DatasetScale())})
+        dataset = generate_dataset(scale, seed=options['seed'])
+        self.stdout.write(json.dumps({'seed': options['seed'], 'scale': vars(scale), **dataset.summary()}))
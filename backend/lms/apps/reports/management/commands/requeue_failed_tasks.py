@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.task_queues import TASK_QUEUES, requeue_failed_tasks
+
+
+class Command(BaseCommand):
+    help = 'Put failed django-q tasks back to their queues and remove them from the failed tasks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', help=f'Only this queue: {", ".join(TASK_QUEUES)} (default: all)')
+        parser.add_argument('ids', nargs='*', help='Failed task ids (default: all)')
+
+    def handle(self, *args, **options):
+        if options['queue'] and options['queue'] not in TASK_QUEUES:
+            raise CommandError(f'Unknown queue: {options["queue"]}')
+        requeued = requeue_failed_tasks(options['queue'], options['ids'] or None)
+        self.stdout.write(f'Requeued {requeued} tasks')
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from lms.apps.reports.benchmark import SCENARIOS, BenchmarkError, dumps_report, run_benchmark
+
+
+class Command(BaseCommand):
+    help = 'Run endpoint benchmarks on the synthetic dataset and print p50/p95 latency and query counts as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenarios', nargs='*', help=f'Scenarios to run: {", ".join(SCENARIOS)} (default: all)')
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=1)
+        parser.add_argument('--output', help='Write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        try:
+            report = run_benchmark(options['scenarios'], iterations=options['iterations'], warmup=options['warmup'])
+        except BenchmarkError as e:
+            raise CommandError(str(e))
+
+        data = dumps_report(report)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(data)
+        self.stdout.write(data)
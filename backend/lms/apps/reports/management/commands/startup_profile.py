@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from lms.apps.reports.benchmark import dumps_report
+from lms.apps.reports.startup import StartupProfileError, profile_startup
+
+
+class Command(BaseCommand):
+    help = 'Measure django.setup() in a fresh interpreter and print per-module and per-package import time as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=30, help='Number of slowest modules and packages to show')
+        parser.add_argument('--urls', action='store_true', help='Also load the URL configuration')
+        parser.add_argument('--output', help='Write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        try:
+            report = profile_startup(limit=options['limit'], load_urls=options['urls'])
+        except StartupProfileError as e:
+            raise CommandError(str(e))
+
+        data = dumps_report(report)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(data)
+        self.stdout.write(data)
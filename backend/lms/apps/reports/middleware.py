@@ -0,0 +1,58 @@
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import connections
+
+from lms.apps.reports.performance import RequestQueries, recorder
+
+
+def install_wrappers(queries: RequestQueries) -> ExitStack:
+    stack = ExitStack()
+    for alias in connections:
+        stack.enter_context(connections[alias].execute_wrapper(queries))
+    return stack
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Считает SQL запросы, время в БД и задержку каждого запроса через connection.execute_wrapper.
+    Работает для любых вьюх (api_* и lms), статистика группируется по маршруту URL.
+    Под ASGI работает асинхронно и не переводит асинхронные вьюхи в поток.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        queries = RequestQueries()
+        start = time.perf_counter()
+        with install_wrappers(queries):
+            response = self.get_response(request)
+        self.record(request, response, queries, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        queries = RequestQueries()
+        start = time.perf_counter()
+        # Соединения с БД привязаны к потоку: запросы асинхронного кода идут через sync_to_async
+        # в общий для запроса поток (thread_sensitive), обертки ставятся и снимаются в нем же
+        stack = await sync_to_async(install_wrappers)(queries)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self.record(request, response, queries, time.perf_counter() - start)
+        return response
+
+    @staticmethod
+    def record(request, response, queries, latency):
+        resolver_match = getattr(request, 'resolver_match', None)
+        if resolver_match is not None:
+            recorder.record(f'{request.method} {resolver_match.route}', latency, queries, response.status_code)
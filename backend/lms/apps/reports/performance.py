@@ -0,0 +1,253 @@
+"""
+Постоянный сбор статистики запросов: количество SQL, время в БД, задержка и повторяющиеся формы SQL (N+1).
+Статистика копится в памяти процесса по минутным окнам и периодически сбрасывается в кэш (Redis),
+отчет собирается из окон всех процессов.
+"""
+import copy
+import hashlib
+import logging
+import os
+import re
+import socket
+import threading
+import time
+from collections import Counter, deque
+
+from django.conf import settings
+from django.core.cache import cache
+
+from backend.db_pool.pool import pools_snapshot
+
+logger = logging.getLogger(__name__)
+
+SLOT_SECONDS = 60
+WINDOW_SLOTS = getattr(settings, 'PERFORMANCE_WINDOW_MINUTES', 60)
+FLUSH_INTERVAL = getattr(settings, 'PERFORMANCE_FLUSH_INTERVAL', 30)
+N_PLUS_ONE_THRESHOLD = getattr(settings, 'PERFORMANCE_N_PLUS_ONE_THRESHOLD', 5)
+
+# Границы корзин гистограмм: задержка в мс и количество запросов
+LATENCY_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+PROCESSES_CACHE_KEY = 'reports:performance:processes'
+
+
+def process_cache_key() -> str:
+    # pid берется при каждом сбросе: воркеры django-q - форки процесса, импортировавшего модуль
+    return f'reports:performance:{socket.gethostname()}:{os.getpid()}'
+
+
+def pools_cache_key(process_key) -> str:
+    return f'{process_key}:pools'
+
+_IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def sql_shape(sql: str) -> str:
+    # Параметры уже вынесены в %s, остается свернуть IN (...) разной длины и литералы
+    return _LITERAL_RE.sub('?', _IN_LIST_RE.sub('IN (...)', sql))
+
+
+def sql_signature(shape: str) -> str:
+    return hashlib.md5(shape.encode()).hexdigest()[:12]
+
+
+def bucket_index(value, buckets) -> int:
+    for index, edge in enumerate(buckets):
+        if value <= edge:
+            return index
+    return len(buckets)
+
+
+class RequestQueries:
+    """
+    execute_wrapper для одного запроса
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.shapes[sql] += 1
+
+    def repeated_shapes(self):
+        # Нормализуется только каждый уникальный текст SQL, а не каждый выполненный запрос
+        shapes = Counter()
+        for sql, count in self.shapes.items():
+            shapes[sql_shape(sql)] += count
+        return {shape: count for shape, count in shapes.items() if count >= N_PLUS_ONE_THRESHOLD}
+
+
+def _empty_endpoint():
+    return {
+        'requests': 0,
+        'errors': 0,
+        'latency_total': 0.0,
+        'latency_max': 0.0,
+        'db_time_total': 0.0,
+        'queries_total': 0,
+        'queries_max': 0,
+        'latency_histogram': [0] * (len(LATENCY_BUCKETS) + 1),
+        'queries_histogram': [0] * (len(QUERY_BUCKETS) + 1),
+        'n_plus_one': {},
+    }
+
+
+class PerformanceRecorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.slots = deque(maxlen=WINDOW_SLOTS)
+        self.last_flush = time.time()
+
+    def _current_slot(self, now):
+        slot_start = int(now // SLOT_SECONDS * SLOT_SECONDS)
+        if not self.slots or self.slots[-1]['start'] != slot_start:
+            self.slots.append({'start': slot_start, 'endpoints': {}})
+        return self.slots[-1]
+
+    def record(self, endpoint, latency, queries: RequestQueries, status_code):
+        now = time.time()
+        latency_ms = latency * 1000
+        repeated = queries.repeated_shapes()
+        with self.lock:
+            stats = self._current_slot(now)['endpoints'].setdefault(endpoint, _empty_endpoint())
+            stats['requests'] += 1
+            stats['errors'] += status_code >= 500
+            stats['latency_total'] += latency_ms
+            stats['latency_max'] = max(stats['latency_max'], latency_ms)
+            stats['db_time_total'] += queries.duration * 1000
+            stats['queries_total'] += queries.count
+            stats['queries_max'] = max(stats['queries_max'], queries.count)
+            stats['latency_histogram'][bucket_index(latency_ms, LATENCY_BUCKETS)] += 1
+            stats['queries_histogram'][bucket_index(queries.count, QUERY_BUCKETS)] += 1
+            for shape, count in repeated.items():
+                signature = stats['n_plus_one'].setdefault(sql_signature(shape), {
+                    'sql': shape[:500],
+                    'requests': 0,
+                    'max_repeats': 0,
+                })
+                signature['requests'] += 1
+                signature['max_repeats'] = max(signature['max_repeats'], count)
+
+        self.maybe_flush(now)
+
+    def maybe_flush(self, now=None):
+        now = now or time.time()
+        with self.lock:
+            if now - self.last_flush < FLUSH_INTERVAL:
+                return
+            self.last_flush = now
+            slots = copy.deepcopy(list(self.slots))
+        self.flush(slots)
+
+    def flush(self, slots=None):
+        if slots is None:
+            with self.lock:
+                slots = copy.deepcopy(list(self.slots))
+        timeout = WINDOW_SLOTS * SLOT_SECONDS
+        process_key = process_cache_key()
+        try:
+            cache.set_many({process_key: slots, pools_cache_key(process_key): pools_snapshot()}, timeout=timeout)
+            processes = cache.get(PROCESSES_CACHE_KEY) or {}
+            now = time.time()
+            processes = {key: seen for key, seen in processes.items() if now - seen < timeout}
+            processes[process_key] = now
+            cache.set(PROCESSES_CACHE_KEY, processes, timeout=timeout)
+        except Exception:
+            # Статистика не должна ломать обработку запроса
+            logger.warning('Could not flush performance stats', exc_info=True)
+
+
+recorder = PerformanceRecorder()
+
+
+def _merge_endpoint(target, source):
+    for field in ('requests', 'errors', 'latency_total', 'db_time_total', 'queries_total'):
+        target[field] += source[field]
+    for field in ('latency_max', 'queries_max'):
+        target[field] = max(target[field], source[field])
+    for field in ('latency_histogram', 'queries_histogram'):
+        target[field] = [a + b for a, b in zip(target[field], source[field])]
+    for signature, data in source['n_plus_one'].items():
+        merged = target['n_plus_one'].setdefault(signature, {**data, 'requests': 0, 'max_repeats': 0})
+        merged['requests'] += data['requests']
+        merged['max_repeats'] = max(merged['max_repeats'], data['max_repeats'])
+
+
+def histogram_percentile(histogram, buckets, percentile):
+    total = sum(histogram)
+    if not total:
+        return 0
+    threshold = total * percentile / 100
+    seen = 0
+    for index, count in enumerate(histogram):
+        seen += count
+        if seen >= threshold:
+            return buckets[index] if index < len(buckets) else None
+    return None
+
+
+def collect_report(minutes=WINDOW_SLOTS):
+    """
+    Сводка по всем процессам за последние minutes минут
+    """
+    recorder.flush()
+    processes = cache.get(PROCESSES_CACHE_KEY) or {}
+    since = time.time() - minutes * SLOT_SECONDS
+    endpoints = {}
+    for slots in cache.get_many(list(processes)).values():
+        for slot in slots:
+            if slot['start'] < since:
+                continue
+            for endpoint, stats in slot['endpoints'].items():
+                _merge_endpoint(endpoints.setdefault(endpoint, _empty_endpoint()), stats)
+
+    report = []
+    for endpoint, stats in endpoints.items():
+        requests = stats['requests']
+        report.append({
+            'endpoint': endpoint,
+            'requests': requests,
+            'errors': stats['errors'],
+            'latency_avg_ms': round(stats['latency_total'] / requests, 2),
+            'latency_p50_ms': histogram_percentile(stats['latency_histogram'], LATENCY_BUCKETS, 50),
+            'latency_p95_ms': histogram_percentile(stats['latency_histogram'], LATENCY_BUCKETS, 95),
+            'latency_max_ms': round(stats['latency_max'], 2),
+            'db_time_avg_ms': round(stats['db_time_total'] / requests, 2),
+            'db_time_total_ms': round(stats['db_time_total'], 2),
+            'queries_avg': round(stats['queries_total'] / requests, 2),
+            'queries_p95': histogram_percentile(stats['queries_histogram'], QUERY_BUCKETS, 95),
+            'queries_max': stats['queries_max'],
+            'n_plus_one': sorted(stats['n_plus_one'].values(), key=lambda item: -item['max_repeats']),
+        })
+    return report
+
+
+def collect_pool_report():
+    """
+    Состояние пулов соединений с БД по процессам (веб и воркеры django-q) и итог по каждому пулу
+    """
+    recorder.flush()
+    processes = cache.get(PROCESSES_CACHE_KEY) or {}
+    snapshots = cache.get_many([pools_cache_key(process_key) for process_key in processes])
+
+    pools = {}
+    for pool_key, process_pools in snapshots.items():
+        for snapshot in process_pools:
+            total = pools.setdefault(snapshot['name'], {'name': snapshot['name'], 'processes': []})
+            total['processes'].append({'process': pool_key.rsplit(':', 1)[0], **snapshot})
+            for field in ('max_size', 'size', 'in_use', 'idle', 'waiting', 'requests', 'waits', 'wait_time_total_ms',
+                          'timeouts', 'created', 'closed', 'health_check_failures'):
+                total[field] = total.get(field, 0) + snapshot[field]
+    for total in pools.values():
+        total['wait_time_avg_ms'] = round(total['wait_time_total_ms'] / total['waits'], 2) if total['waits'] else 0
+    return list(pools.values())
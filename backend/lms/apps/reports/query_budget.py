@@ -0,0 +1,74 @@
+"""
+Базовый класс тестов бюджета SQL запросов: эндпоинт проверяется на маленьком и большом синтетическом наборе данных,
+количество запросов должно совпадать (O(1) по размеру урока и числу друзей) и не превышать бюджет.
+Также проверка плана запроса: горячие выборки должны идти по индексу.
+"""
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from lms.apps.reports.dataset import DatasetScale, generate_dataset
+
+SMALL_SCALE = DatasetScale(batches=1, lessons_per_batch=2, pages_per_lesson=1, elements_per_page=10,
+                           lines_per_component=2, users=5, friends_per_user=3, pending_requests_per_user=1,
+                           answered_lessons_per_user=1, activity_days=5, points_history_per_user=2)
+LARGE_SCALE = DatasetScale(batches=2, lessons_per_batch=3, pages_per_lesson=3, elements_per_page=20,
+                           lines_per_component=6, users=30, friends_per_user=20, pending_requests_per_user=5,
+                           answered_lessons_per_user=3, activity_days=20, points_history_per_user=5)
+
+
+class ViewCallMixin:
+    """
+    Вызов вьюхи без маршрутов: для тестов, которым не нужен синтетический набор данных
+    """
+    factory = APIRequestFactory()
+
+    def call_view(self, view_class, method, data=None, user=None, path='/'):
+        request = getattr(self.factory, method)(path, data, format='json')
+        force_authenticate(request, user=user)
+        view = view_class.as_view()
+        if view_class.view_is_async:
+            return async_to_sync(view)(request)
+        return view(request)
+
+
+class QueryBudgetTestCase(ViewCallMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.small = generate_dataset(SMALL_SCALE, seed=1)
+
+    def count_queries(self, view_class, method, data=None, user=None, path='/'):
+        # Первый вызов прогревает состояние (UserLessonModel, кэш), замеряется повторный
+        self.call_view(view_class, method, data, user, path)
+        with CaptureQueriesContext(connection) as context:
+            response = self.call_view(view_class, method, data, user, path)
+        self.assertEqual(response.status_code, 200, getattr(response, 'data', None))
+        return len(context), context.captured_queries
+
+    def assertQueryBudget(self, budget, request_for):
+        """
+        request_for(dataset) возвращает (view_class, method, data, user, path) для набора данных
+        """
+        small_count, small_queries = self.count_queries(*request_for(self.small))
+        large = generate_dataset(LARGE_SCALE, seed=2)
+        large_count, large_queries = self.count_queries(*request_for(large))
+
+        self.assertEqual(small_count, large_count, 'Query count grows with data size:\n' + '\n'.join(
+            query['sql'] for query in large_queries))
+        self.assertLessEqual(large_count, budget, 'Query budget exceeded:\n' + '\n'.join(
+            query['sql'] for query in large_queries))
+
+    def assertUsesIndex(self, queryset, index_name):
+        index_names = [index_name]
+        if connection.vendor == 'sqlite':
+            # SQLite хранит UNIQUE ограничения в самой таблице, их индексы называются sqlite_autoindex_<таблица>_N
+            index_names.append(f'sqlite_autoindex_{queryset.model._meta.db_table}_')
+        if connection.vendor == 'postgresql':
+            # На маленьких тестовых таблицах планировщик Postgres предпочитает полный проход
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = queryset.explain()
+        self.assertTrue(any(name in plan for name in index_names),
+                        f'Query does not use index {index_name}:\n{queryset.query}\n{plan}')
@@ -0,0 +1,109 @@
+"""
+Статистика очередей задач django-q: длина очереди в брокере, задержка задач (ожидание в очереди и выполнение)
+и упавшие задачи. Задержки копятся гистограммами по часовым окнам в кэше (Redis), пишет их монитор кластера
+по сигналу post_execute.
+"""
+import logging
+import time
+from collections import Counter
+
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+from django_q.brokers import get_broker
+
+from backend.task_queues import TASK_QUEUES, failed_tasks, task_queue
+from lms.apps.reports.performance import bucket_index, histogram_percentile
+
+logger = logging.getLogger(__name__)
+
+SLOT_SECONDS = 3600
+# Границы корзин задержки задач, мс
+TASK_LATENCY_BUCKETS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 300000, 1800000)
+TASK_STATS_HOURS = 48
+TASK_STATS_TIMEOUT = TASK_STATS_HOURS * SLOT_SECONDS
+
+
+def current_slot(now=None) -> int:
+    return int((now or time.time()) // SLOT_SECONDS)
+
+
+def stats_key(queue, name, slot) -> str:
+    return f'task_queues:{queue}:{slot}:{name}'
+
+
+def incr(key, delta=1):
+    if not cache.add(key, delta, timeout=TASK_STATS_TIMEOUT):
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            # Ключ истек между add и incr
+            cache.add(key, delta, timeout=TASK_STATS_TIMEOUT)
+
+
+def record_task(task: dict):
+    """
+    started - время постановки в очередь (async_task), picked_at - начало выполнения (pre_execute), stopped - конец
+    """
+    queue = task_queue(task.get('cluster'))
+    slot = current_slot()
+    picked_at = task.get('picked_at', task['started'])
+    wait = (picked_at - task['started']).total_seconds() * 1000
+    run = (task['stopped'] - picked_at).total_seconds() * 1000
+    incr(stats_key(queue, f'wait:{bucket_index(wait, TASK_LATENCY_BUCKETS)}', slot))
+    incr(stats_key(queue, f'run:{bucket_index(run, TASK_LATENCY_BUCKETS)}', slot))
+    incr(stats_key(queue, 'run_ms', slot), int(run))
+    incr(stats_key(queue, 'processed', slot))
+    if not task['success']:
+        incr(stats_key(queue, 'failed', slot))
+        logger.warning('Task %s (%s) failed in queue %s and is kept in failed tasks', task['name'], task['func'], queue)
+
+
+def mark_picked(task: dict):
+    task['picked_at'] = timezone.now()
+
+
+def queue_size(queue):
+    try:
+        return get_broker(queue).queue_size()
+    except Exception as e:
+        logger.warning('Could not get size of queue %s: %s', queue, e)
+        return None
+
+
+def latency(histogram) -> dict:
+    return {
+        'p50_ms': histogram_percentile(histogram, TASK_LATENCY_BUCKETS, 50),
+        'p95_ms': histogram_percentile(histogram, TASK_LATENCY_BUCKETS, 95),
+    }
+
+
+def collect_queue_report(hours=1) -> list:
+    """
+    По каждой очереди: длина в брокере, упавшие задачи, обработано и задержка за последние hours часов
+    """
+    slots = range(current_slot() - hours + 1, current_slot() + 1)
+    names = ['processed', 'failed', 'run_ms'] + [
+        f'{kind}:{index}' for kind in ('wait', 'run') for index in range(len(TASK_LATENCY_BUCKETS) + 1)]
+    values = cache.get_many([stats_key(queue, name, slot) for queue in TASK_QUEUES for name in names for slot in slots])
+
+    failures = Counter()
+    for row in failed_tasks().values('cluster').annotate(count=Count('id')):
+        failures[task_queue(row['cluster'])] += row['count']
+    report = []
+    for queue in TASK_QUEUES:
+        def total(name):
+            return sum(values.get(stats_key(queue, name, slot), 0) for slot in slots)
+
+        processed = total('processed')
+        report.append({
+            'queue': queue,
+            'queue_size': queue_size(queue),
+            'failed_tasks': failures.get(queue, 0),
+            'processed': processed,
+            'failed': total('failed'),
+            'run_avg_ms': round(total('run_ms') / processed, 2) if processed else 0,
+            'wait': latency([total(f'wait:{index}') for index in range(len(TASK_LATENCY_BUCKETS) + 1)]),
+            'run': latency([total(f'run:{index}') for index in range(len(TASK_LATENCY_BUCKETS) + 1)]),
+        })
+    return report
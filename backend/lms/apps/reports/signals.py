@@ -0,0 +1,21 @@
+from django.dispatch import receiver
+from django_q.signals import post_execute, pre_execute
+
+from lms.apps.reports.performance import recorder
+from lms.apps.reports.queue_stats import mark_picked, record_task
+
+
+@receiver(post_execute)
+def flush_worker_stats(sender, task, **kwargs):
+    # Воркеры django-q не проходят через middleware, состояние их пулов соединений сбрасывается после задач
+    recorder.maybe_flush()
+
+
+@receiver(pre_execute)
+def task_picked(sender, task, **kwargs):
+    mark_picked(task)
+
+
+@receiver(post_execute)
+def task_executed(sender, task, **kwargs):
+    record_task(task)
@@ -0,0 +1,82 @@
+"""
+Время запуска процесса: django.setup() (и при необходимости загрузка маршрутов) выполняется в отдельном
+интерпретаторе с python -X importtime, отчет показывает самые дорогие модули и время по пакетам.
+Так видно, что стоит перезапуск воркера django-q (Q_CLUSTER['recycle']) или daphne.
+"""
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+
+IMPORT_TIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+SETUP_CODE = '''
+import time
+started = time.perf_counter()
+import django
+django.setup()
+{extra}
+print('startup_seconds', time.perf_counter() - started)
+'''
+URLS_CODE = '''
+from django.urls import get_resolver
+get_resolver().url_patterns
+'''
+
+
+class StartupProfileError(Exception):
+    pass
+
+
+def run_with_import_time(code: str):
+    env = os.environ | {'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE, 'PYTHONDONTWRITEBYTECODE': '1'}
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=settings.BASE_DIR, env=env,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise StartupProfileError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'failed')
+    return result.stdout, result.stderr
+
+
+def parse_import_time(stderr: str) -> list:
+    """
+    [(модуль, собственное время мкс, с вложенными импортами мкс, глубина)] в порядке вывода
+    """
+    modules = []
+    for line in stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            modules.append((name, int(own), int(cumulative), len(indent) // 2))
+    return modules
+
+
+def profile_startup(limit=30, load_urls=False) -> dict:
+    stdout, stderr = run_with_import_time(SETUP_CODE.format(extra=URLS_CODE if load_urls else ''))
+    startup_seconds = next(
+        (float(line.split()[1]) for line in stdout.splitlines() if line.startswith('startup_seconds')), None)
+    modules = parse_import_time(stderr)
+
+    packages = defaultdict(lambda: [0, 0])
+    for name, own, _, _ in modules:
+        package = packages[name.split('.')[0]]
+        package[0] += own
+        package[1] += 1
+
+    top_modules = sorted(modules, key=lambda module: -module[2])[:limit]
+    top_packages = sorted(packages.items(), key=lambda item: -item[1][0])[:limit]
+    return {
+        'startup_seconds': startup_seconds,
+        'modules_imported': len(modules),
+        'import_seconds': sum(own for _, own, _, _ in modules) / 1e6,
+        'modules': [
+            {'module': name, 'self_ms': own / 1000, 'cumulative_ms': cumulative / 1000}
+            for name, own, cumulative, _ in top_modules
+        ],
+        'packages': [
+            {'package': name, 'self_ms': own / 1000, 'modules': count}
+            for name, (own, count) in top_packages
+        ],
+    }
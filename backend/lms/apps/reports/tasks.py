@@ -4,6 +4,7 @@ import time
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 
+from backend.db_router import use_replicas
 from lms.apps.posts.models import Post
 from lms.apps.reports.lesson_page_element_component_use import (
     collect as collect_lesson_page,
@@ -21,7 +22,8 @@ def lesson_page_element_component_use(record_name, user):
         },
     }
     start = time.time()
-    result = collect_lesson_page()
+    with use_replicas():
+        result = collect_lesson_page()
     end = time.time()
     context["data"] = result
     context["timestamp"]["end"] = timezone.now().isoformat()
@@ -45,7 +47,8 @@ def storage_files_use(record_name, user):
         },
     }
     start = time.time()
-    result = collect_storage_files()
+    with use_replicas():
+        result = collect_storage_files()
     end = time.time()
     context["data"] = result
     context["timestamp"]["end"] = timezone.now().isoformat()
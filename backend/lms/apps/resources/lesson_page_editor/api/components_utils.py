@@ -10,6 +10,8 @@ from api_lessons.models import (
     TextComponent,
     MatchingComponent,
 )
+from api_lessons.prefetch import PAGE_ELEMENT_COMPONENT_FIELDS, component_prefetches
+from lms.apps.resources.utils import get_video_links_from_vimeo
 
 COMPONENT_NAME_TO_ELEMENT_FIELD_NAME_DICT = {
     "matching": "matching_component",
@@ -36,3 +38,30 @@ COMPONENT_NAME_TO_COMPONENT_MODEL_CLASS_DICT = {
     "image": ImageComponent,
     "text-pro": TextComponent,
 }
+
+
+def load_components(object_ids_by_type: dict) -> dict:
+    """
+    Loads components grouped by type: one query per type plus nested data
+    (lines, answers, couples), so the query count does not depend on the page size.
+    Returns ``{component_type: {object_id: component}}``.
+    """
+    components = {}
+    for component_type, object_ids in object_ids_by_type.items():
+        component_class = COMPONENT_NAME_TO_COMPONENT_MODEL_CLASS_DICT[component_type]
+        field_name = COMPONENT_NAME_TO_ELEMENT_FIELD_NAME_DICT[component_type]
+        components[component_type] = component_class.objects.prefetch_related(
+            *component_prefetches(field_name)
+        ).in_bulk(object_ids)
+    return components
+
+
+def page_elements_with_components(page_obj):
+    lookups = []
+    for field_name in PAGE_ELEMENT_COMPONENT_FIELDS:
+        lookups += component_prefetches(field_name, prefix=f"{field_name}__")
+    return page_obj.elements.select_related(*PAGE_ELEMENT_COMPONENT_FIELDS).prefetch_related(*lookups)
+
+
+def get_video_links(video_components) -> dict:
+    return get_video_links_from_vimeo(component.video_url for component in video_components)
@@ -7,6 +7,7 @@ from api_lessons.models.lesson_components.matching_component import (
     MatchingComponentElement,
     MatchingComponentElementCouple,
 )
+from api_lessons.change_log import log_changes
 from .utils import components_elements_qs, getUid
 from collections import Counter
 
@@ -21,9 +22,9 @@ def _build_representation(component: MatchingComponent) -> dict:
     """
     Shared read-side formatter for list / detail responses.
     """
-    couples_qs = component.element_couples.all().select_related(
-        "first_element", "second_element"
-    )
+    couples_qs = component.element_couples.all()
+    if "element_couples" not in getattr(component, "_prefetched_objects_cache", {}):
+        couples_qs = couples_qs.select_related("first_element", "second_element")
 
     elem_map = {}
     for c in couples_qs:
@@ -157,6 +158,7 @@ class MatchingComponentCreateUpdateSerializer(serializers.ModelSerializer):
         # create new elements in bulk
         if new_instances:
             MatchingComponentElement.objects.bulk_create(new_instances)
+            log_changes(MatchingComponentElement, [obj.pk for obj in new_instances])
 
         # save updated elements
         for instance in updated_instances:
@@ -282,6 +284,7 @@ class MatchingComponentCreateUpdateSerializer(serializers.ModelSerializer):
         ]
         if new_objs:
             MatchingComponentElementCouple.objects.bulk_create(new_objs)
+            log_changes(MatchingComponentElementCouple, [obj.pk for obj in new_objs])
 
     def _sync_couples(self, component, couples_data, uid_map):
         """
@@ -329,6 +332,7 @@ class MatchingComponentCreateUpdateSerializer(serializers.ModelSerializer):
         )
         if new_objs:
             MatchingComponentElementCouple.objects.bulk_create(new_objs)
+            log_changes(MatchingComponentElementCouple, [obj.pk for obj in new_objs])
 
     # ----------  create ----------
     @transaction.atomic
@@ -1,6 +1,7 @@
 from django.db import transaction
 from rest_framework import serializers
 
+from api_lessons.change_log import log_changes
 from api_lessons.models import LessonPage, LessonPageElement
 from api_lessons.models.lesson_components import (
     # media & simple
@@ -76,7 +77,7 @@ class LoadComponentObjDataSerializer(BasePostEditSerializer):
 # ───────────────────────────────────────────────────────────────
 # utilities
 # ───────────────────────────────────────────────────────────────
-class _ItemIdMixin:
+class _ItemIdMixin(serializers.Serializer):
     """Adds write-only ``item_id`` for bulk update_or_create."""
 
     item_id = serializers.IntegerField(write_only=True, required=False)
@@ -221,6 +222,10 @@ class VideoComponentSerializer(serializers.ModelSerializer):
         fields = ["id", "description", "video_url", "embedded_video_url"]
 
     def get_embedded_video_url(self, obj):
+        # Links may be resolved in one batch beforehand (see BuildAndPublishContentAction)
+        video_links = self.context.get("video_links", {})
+        if obj.video_url in video_links:
+            return video_links[obj.video_url]
         return get_video_link_from_vimeo(obj.video_url)
 
 
@@ -247,10 +252,11 @@ class QuestionComponentSerializer(serializers.ModelSerializer):
     def create(self, validated):
         answers_data = validated.pop("answers", [])
         q = QuestionComponent.objects.create(**validated)
-        QuestionAnswer.objects.bulk_create(
+        answers = QuestionAnswer.objects.bulk_create(
             QuestionAnswer(component=q, text=a["text"], is_correct=a["is_correct"])
             for a in answers_data
         )
+        log_changes(QuestionAnswer, [a.pk for a in answers])
         return q
 
     @transaction.atomic
@@ -294,7 +300,7 @@ class FillTextComponentSerializer(serializers.ModelSerializer):
     def create(self, validated):
         lines = validated.pop("lines", [])
         ft = FillTextComponent.objects.create(**validated)
-        FillTextLine.objects.bulk_create(
+        created_lines = FillTextLine.objects.bulk_create(
             FillTextLine(
                 component=ft,
                 text_before=l["text_before"],
@@ -304,6 +310,7 @@ class FillTextComponentSerializer(serializers.ModelSerializer):
             )
             for l in lines
         )
+        log_changes(FillTextLine, [l.pk for l in created_lines])
         return ft
 
     @transaction.atomic
@@ -350,7 +357,7 @@ class OrderComponentElementSerializer(serializers.ModelSerializer):
     def create(self, validated):
         elements = validated.pop("elements", [])
         comp = PutInOrderComponent.objects.create(**validated)
-        PutInOrderComponentElement.objects.bulk_create(
+        created_elements = PutInOrderComponentElement.objects.bulk_create(
             PutInOrderComponentElement(
                 component=comp,
                 text=e["text"],
@@ -358,6 +365,7 @@ class OrderComponentElementSerializer(serializers.ModelSerializer):
             )
             for e in elements
         )
+        log_changes(PutInOrderComponentElement, [e.pk for e in created_elements])
         return comp
 
     @transaction.atomic
@@ -1,4 +1,6 @@
 import json
+
+from django.db import transaction
 from rest_framework import permissions, status
 from rest_framework.response import Response
 
@@ -12,13 +14,17 @@ from api_lessons.models import (
     VideoComponent,
     ImageComponent,
     RecordAudioComponent,
+    Lesson,
 )
 from api_lessons.models.lesson_components.__component_base import LessonPage
 from api_lessons.models.lesson_components.__page_element import LessonPageElement
+from api_lessons.change_log import log_changes
+from api_lessons.packs import schedule_lesson_packs_on_commit
 from api_lessons.serializers.components_serializers import (
     BlueCardComponentSerializer,
     LessonPageSerializer,
 )
+from backend.versioning import bump_versions
 from lms.apps.core.utils.api_actions import (
     BaseAction,
     BaseActionException,
@@ -44,6 +50,9 @@ from lms.apps.resources.lesson_page_editor.api.matching.action import (
 from .components_utils import (
     COMPONENT_NAME_TO_COMPONENT_MODEL_CLASS_DICT,
     COMPONENT_NAME_TO_ELEMENT_FIELD_NAME_DICT,
+    get_video_links,
+    load_components,
+    page_elements_with_components,
 )
 from .matching.serializers import MatchingComponentCreateUpdateSerializer
 from .matching.views import MatchingComponentViewSet
@@ -249,6 +258,15 @@ class BuildAndPublishContentAction(BaseAction):
                 errors=errors,
             )
 
+        # Components of every block are loaded with one query per component type
+        object_ids_by_type = {}
+        for i_block in formatted_content["blocks"]:
+            object_ids_by_type.setdefault(i_block["type"], []).append(
+                i_block["data"]["obj"]["id"]
+            )
+        components = load_components(object_ids_by_type)
+        video_links = get_video_links(components.get("video", {}).values())
+
         # ─────────────────────────────────────────────────────────────────────
         # Second pass: Process and upsert components and elements
         # ─────────────────────────────────────────────────────────────────────
@@ -268,14 +286,15 @@ class BuildAndPublishContentAction(BaseAction):
             }
 
             # Fetch or create/update component instance
-            try:
-                component_obj = component_class.objects.get(pk=i_data_obj["id"])
-            except component_class.DoesNotExist:
+            component_obj = components[i_type].get(i_data_obj["id"])
+            if component_obj is None:
                 raise BaseActionException(
                     f"`component_id`={i_data_obj['id']} is invalid"
                 )
 
             if not i_data_static and i_data_obj_values:
+                # Edited components are reloaded, the prefetched nested data would be stale after update
+                component_obj = component_class.objects.get(pk=component_obj.pk)
                 component_serializer = get_serializer_class_by_component_type(i_type)(
                     instance=component_obj, partial=True, data=i_data_obj_values
                 )
@@ -291,7 +310,7 @@ class BuildAndPublishContentAction(BaseAction):
                 serialized_data = component_serializer.data
             else:
                 serialized_data = get_serializer_class_by_component_type(i_type)(
-                    instance=component_obj
+                    instance=component_obj, context={"video_links": video_links}
                 ).data
 
             obj_kwargs[field_name] = component_obj
@@ -316,41 +335,61 @@ class BuildAndPublishContentAction(BaseAction):
         # ─────────────────────────────────────────────────────────────────────
         existing_elements = page_obj.elements.all()
         existing_elements_dict = {i.id: i for i in existing_elements}
-        to_keep_ids = []
+        to_update = []
+        to_create = []
+        update_fields = {"page", "order"}
 
         for meta in els_data:
             element_id = meta["element_id"]
             page_kwargs = meta["page_kwargs"]
-            idx = meta["content_index"]
+            update_fields.update(page_kwargs)
 
             if element_id and element_id in existing_elements_dict:
                 obj = existing_elements_dict[element_id]
                 for key, val in page_kwargs.items():
                     setattr(obj, key, val)
-                obj.save()
+                to_update.append(obj)
             else:
-                obj = LessonPageElement.objects.create(**page_kwargs)
-
-            element_id = obj.id
-            to_keep_ids.append(element_id)
-            new_formatted_content_data[idx]["data"]["element_id"] = element_id
-
-        new_formatted_content_data_dict = {
-            "date": formatted_content.get("date"),
-            "blocks": new_formatted_content_data,
-        }
+                obj = LessonPageElement(**page_kwargs)
+                to_create.append(obj)
+            meta["element"] = obj
+
+        with transaction.atomic():
+            LessonPageElement.objects.bulk_update(to_update, list(update_fields))
+            LessonPageElement.objects.bulk_create(to_create)
+            log_changes(LessonPageElement, [obj.pk for obj in to_update + to_create])
+
+            to_keep_ids = []
+            for meta in els_data:
+                element_id = meta["element"].id
+                to_keep_ids.append(element_id)
+                new_formatted_content_data[meta["content_index"]]["data"][
+                    "element_id"
+                ] = element_id
+
+            new_formatted_content_data_dict = {
+                "date": formatted_content.get("date"),
+                "blocks": new_formatted_content_data,
+            }
 
-        page_obj.elements.exclude(id__in=to_keep_ids).delete()
+            page_obj.elements.exclude(id__in=to_keep_ids).delete()
 
-        post_obj.content = json.dumps(new_formatted_content_data_dict)
-        post_obj.save()
+            post_obj.content = json.dumps(new_formatted_content_data_dict)
+            post_obj.save()
+        # bulk_update/bulk_create do not send signals
+        bump_versions(LessonPageElement)
+        # Element changes are bulk operations and do not trigger the offline pack rebuild.
+        # The pack build also renders the lesson static file (Lesson.render_url) after commit
+        schedule_lesson_packs_on_commit(Lesson, [page_obj.lesson_id])
 
         return {
             "success": 1,
             "data": {
                 "instance": PostSerializer(post_obj).data,
                 "elements": LessonPageElementSerializer(
-                    page_obj.elements.all(), many=True
+                    page_elements_with_components(page_obj),
+                    many=True,
+                    context={"video_links": video_links},
                 ).data,
                 "content": post_obj.content,
             },
@@ -382,19 +421,26 @@ class LoadContentObjDataAction(BaseAction):
                     "component_class": component_class,
                 }
             )
+        object_ids_by_type = {}
+        for i in items_data:
+            object_ids_by_type.setdefault(i.get("component_type"), []).append(
+                i.get("object_id")
+            )
+        try:
+            components = load_components(object_ids_by_type)
+        except Exception as e:
+            raise BaseActionException(str(e))
+        video_links = get_video_links(components.get("video", {}).values())
+
         items_response_data = []
         for i in items_data:
-            component_class = i.get("component_class")
             object_id = i.get("object_id")
-            try:
-                component_obj = component_class.objects.get(pk=object_id)
-            except component_class.DoesNotExist:
+            component_obj = components[i.get("component_type")].get(object_id)
+            if component_obj is None:
                 raise BaseActionException("`object_id` is invalid")
-            except Exception as e:
-                raise BaseActionException(str(e))
             serializer = get_serializer_class_by_component_type(
                 i.get("component_type")
-            )(component_obj)
+            )(component_obj, context={"video_links": video_links})
             items_response_data.append(
                 {
                     "component_type": i.get("component_type"),
@@ -1,3 +1,233 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from django_q.models import Failure, OrmQ, Schedule
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api_users.models import UserModel
+from backend.middleware import ReplicaRoutingMiddleware
+from backend.task_queues import (
+    QUEUE_BULK,
+    QUEUE_DEFAULT,
+    QUEUE_INTERACTIVE,
+    enqueue,
+    requeue_failed_tasks,
+    route_schedules,
+)
+
+from lms.apps.posts.models import Post
+from lms.apps.reports.api.views import ReportViewSet
+from lms.apps.reports.middleware import QueryInstrumentationMiddleware
+from lms.apps.reports.query_budget import QueryBudgetTestCase
+from lms.apps.reports.queue_stats import collect_queue_report, record_task
+from lms.apps.reports.startup import parse_import_time
+from lms.apps.resources.lesson_page_editor.api.views import ResourcesPostEditContentActionAPIView
+
+
+def first_post(dataset) -> Post:
+    return Post.objects.select_related("author").get(pk=dataset.post_ids[0])
+
+
+class LessonPageEditorQueryBudgetTest(QueryBudgetTestCase):
+    def test_build_and_publish_content(self):
+        def request_for(dataset):
+            post = first_post(dataset)
+            data = {"post_id": post.pk, "content": post.content}
+            return (
+                ResourcesPostEditContentActionAPIView,
+                "post",
+                data,
+                post.author,
+                "/?action=build-and-publish-content",
+            )
+
+        self.assertQueryBudget(29, request_for)
+
+    def test_publish_renders_lesson_after_commit(self):
+        post = first_post(self.small)
+        with mock.patch("api_lessons.packs.schedule_lesson_packs") as schedule_lesson_packs:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                response = self.call_view(
+                    ResourcesPostEditContentActionAPIView, "post", {"post_id": post.pk, "content": post.content},
+                    post.author, "/?action=build-and-publish-content",
+                )
+                self.assertEqual(response.status_code, 200)
+                # Nothing is rendered inside the request
+                self.assertFalse(schedule_lesson_packs.called)
+        self.assertTrue(callbacks)
+        self.assertTrue(schedule_lesson_packs.called)
+
+    def test_load_content_obj_data(self):
+        def request_for(dataset):
+            post = first_post(dataset)
+            items = [
+                {"component_type": block["type"], "object_id": block["data"]["obj"]["id"]}
+                for block in json.loads(post.content)["blocks"]
+            ]
+            return (
+                ResourcesPostEditContentActionAPIView,
+                "post",
+                {"post_id": post.pk, "items": items},
+                post.author,
+                "/?action=load-content-obj-data",
+            )
+
+        self.assertQueryBudget(15, request_for)
+
+
+class QueryInstrumentationTest(TestCase):
+    factory = APIRequestFactory()
+
+    def instrument(self, get_response):
+        request = self.factory.get("/reports/")
+        request.resolver_match = mock.Mock(route="reports/")
+        middleware = QueryInstrumentationMiddleware(get_response)
+        with mock.patch("lms.apps.reports.middleware.recorder.record") as record:
+            if iscoroutinefunction(middleware):
+                response = async_to_sync(middleware)(request)
+            else:
+                response = middleware(request)
+        self.assertEqual(response.status_code, 200)
+        route, latency, queries, status = record.call_args.args
+        return route, queries.count
+
+    def test_sync_view(self):
+        def view(request):
+            Post.objects.count()
+            return HttpResponse()
+
+        self.assertEqual(self.instrument(view), ("GET reports/", 1))
+
+    def test_async_view_stays_async(self):
+        async def view(request):
+            await Post.objects.acount()
+            await Post.objects.filter(post_type="report").acount()
+            return HttpResponse()
+
+        self.assertTrue(iscoroutinefunction(QueryInstrumentationMiddleware(view)))
+        self.assertEqual(self.instrument(view), ("GET reports/", 2))
+
+
+class ReportParamsTest(TestCase):
+    factory = APIRequestFactory()
+
+    def setUp(self):
+        self.admin = UserModel.objects.create(username="admin", email="admin@example.com", is_staff=True)
+
+    def call(self, action, params):
+        request = self.factory.get("/reports/", params)
+        force_authenticate(request, user=self.admin)
+        return ReportViewSet.as_view({"get": action})(request)
+
+    def test_invalid_params(self):
+        for action, params in (
+            ("performance", {"minutes": "abc"}),
+            ("performance", {"limit": "0"}),
+            ("performance", {"sort": "unknown"}),
+            ("task_queues", {"hours": "x"}),
+        ):
+            self.assertEqual(self.call(action, params).status_code, 400, params)
+
+    def test_valid_params(self):
+        self.assertEqual(self.call("performance", {"minutes": 5, "limit": 1, "sort": "latency"}).status_code, 200)
+        self.assertEqual(self.call("task_queues", {"hours": 2}).status_code, 200)
+
+    def test_only_read_actions_use_replica(self):
+        request = self.factory.get("/reports/")
+        for actions, expected in (
+            ({"get": "list"}, True),
+            ({"get": "retrieve"}, True),
+            ({"get": "performance"}, True),
+            ({"get": "task_queues"}, True),
+            ({"post": "record_start"}, False),
+        ):
+            request.method = list(actions)[0].upper()
+            view = ReportViewSet.as_view(actions)
+            self.assertEqual(ReplicaRoutingMiddleware.is_read_only(request, view), expected, actions)
+
+    def test_performance_sort_keeps_zero(self):
+        report = [
+            {"endpoint": "zero", "latency_p95_ms": 0},
+            {"endpoint": "slow", "latency_p95_ms": 50},
+            {"endpoint": "unknown", "latency_p95_ms": None},
+        ]
+        with mock.patch("lms.apps.reports.api.views.collect_report", return_value=report):
+            response = self.call("performance", {"sort": "latency"})
+        self.assertEqual([item["endpoint"] for item in response.data["endpoints"]], ["unknown", "slow", "zero"])
+
+
+class StartupProfileTest(SimpleTestCase):
+    def test_parse_import_time(self):
+        stderr = "\n".join([
+            "import time: self [us] | cumulative | imported package",
+            "import time:       120 |        120 |     django.utils.version",
+            "import time:       300 |        420 |   django",
+            "Firebase admin is initialized",
+        ])
+        self.assertEqual(parse_import_time(stderr), [
+            ("django.utils.version", 120, 120, 2),
+            ("django", 300, 420, 1),
+        ])
+
+
+@override_settings(TASK_QUEUES_ENABLED=[QUEUE_INTERACTIVE, QUEUE_BULK])
+class TaskQueuesTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_tasks_are_routed_to_queues(self):
+        enqueue("api_users.tasks.refresh_friend_suggestions", [1])
+        enqueue("api_users.tasks.check_for_strike")
+        enqueue("api_users.tasks.check_for_strike", queue=QUEUE_INTERACTIVE)
+        self.assertEqual(sorted(OrmQ.objects.values_list("key", flat=True)),
+                         sorted([QUEUE_BULK, QUEUE_DEFAULT, QUEUE_INTERACTIVE]))
+
+    @override_settings(TASK_QUEUES_ENABLED=[])
+    def test_disabled_queues_fall_back_to_main_cluster(self):
+        enqueue("api_users.tasks.refresh_friend_suggestions", [1])
+        enqueue("api_users.tasks.check_for_strike", queue=QUEUE_INTERACTIVE)
+        self.assertEqual(list(OrmQ.objects.values_list("key", flat=True)), [QUEUE_DEFAULT, QUEUE_DEFAULT])
+
+    def test_schedules_follow_enabled_queues(self):
+        Schedule.objects.create(name="flush", func="api_users.tasks.flush_last_login", cluster=QUEUE_INTERACTIVE)
+        with override_settings(TASK_QUEUES_ENABLED=[]):
+            route_schedules()
+            self.assertIsNone(Schedule.objects.get(name="flush").cluster)
+        with override_settings(TASK_QUEUES_ENABLED=[QUEUE_INTERACTIVE]):
+            route_schedules()
+            self.assertEqual(Schedule.objects.get(name="flush").cluster, QUEUE_INTERACTIVE)
+
+    def test_queue_report(self):
+        enqueue("api_users.tasks.refresh_friend_suggestions", [1])
+        started = timezone.now()
+        for success in (True, False):
+            record_task({
+                "cluster": QUEUE_BULK, "name": "task", "func": "api_users.tasks.refresh_friend_suggestions",
+                "started": started, "picked_at": started + timedelta(milliseconds=40),
+                "stopped": started + timedelta(milliseconds=240), "success": success,
+            })
+        report = {item["queue"]: item for item in collect_queue_report()}
+        self.assertEqual(report[QUEUE_BULK]["queue_size"], 1)
+        self.assertEqual((report[QUEUE_BULK]["processed"], report[QUEUE_BULK]["failed"]), (2, 1))
+        self.assertEqual(report[QUEUE_BULK]["wait"]["p95_ms"], 50)
+        self.assertEqual(report[QUEUE_BULK]["run"]["p50_ms"], 250)
+        self.assertEqual(report[QUEUE_INTERACTIVE]["processed"], 0)
+
+    def test_requeue_failed_tasks(self):
+        now = timezone.now()
+        Failure.objects.create(id="failed-bulk", name="failed-bulk", func="api_users.tasks.refresh_friend_suggestions",
+                               args=([1],), kwargs={}, cluster=QUEUE_BULK, started=now, stopped=now, success=False)
+        Failure.objects.create(id="failed-default", name="failed-default", func="api_users.tasks.check_for_strike",
+                               args=(), kwargs={}, cluster=None, started=now, stopped=now, success=False)
+        report = {item["queue"]: item for item in collect_queue_report()}
+        self.assertEqual((report[QUEUE_BULK]["failed_tasks"], report[QUEUE_DEFAULT]["failed_tasks"]), (1, 1))
+
+        self.assertEqual(requeue_failed_tasks(QUEUE_DEFAULT), 1)
+        self.assertEqual(list(OrmQ.objects.values_list("key", flat=True)), [QUEUE_DEFAULT])
+        self.assertEqual(list(Failure.objects.values_list("id", flat=True)), ["failed-bulk"])